@@ -8,11 +8,11 @@
 
 import torch
 from diffusers import DiffusionPipeline
-import imageio
-import numpy as np
 from pathlib import Path
 import time
 
+from encoder import encode_frames
+
 # ──────────────────────────────────────────────
 #  SETTINGS – tune these if needed
 # ──────────────────────────────────────────────
@@ -78,9 +78,8 @@ def main():
 
         print("Generation finished. Saving video...")
 
-        # Convert to numpy & save mp4
-        frames_np = [np.array(f) for f in video_frames]
-        imageio.mimsave(OUTPUT_MP4, frames_np, fps=FPS, codec='libx264', quality=8)
+        # Stream the frames straight into ffmpeg & save mp4
+        encode_frames(video_frames, mp4_path=OUTPUT_MP4, fps=FPS)
 
         duration = time.time() - start_time
         print(f"\nDone! Video saved: {Path(OUTPUT_MP4).resolve()}")
@@ -4,32 +4,41 @@ import tempfile
 from gatekeeper import validate_prompt, sanitize_prompt
 from prompt_builder import build_prompt
 from video_engine import VideoGenerator
+from generation_service import GenerationService
 from postprocess import frames_to_video
-from cache import cache_key, get_cached_video, store_video
+from cache import get_cache
 
 
-engine = VideoGenerator()
+# One worker owns the pipeline; concurrent identical requests share a job
+service = GenerationService(VideoGenerator)
 
+# What VideoGenerator.generate produces with its defaults (part of the cache key)
+ENGINE_CONFIG = {"model": "cerspense/zeroscope_v2_576w", "num_frames": 16, "num_inference_steps": 25}
+SEED = 42
 
-def generate_video(prompt, era, camera):
+
+def generate_video(prompt, era, camera, progress=gr.Progress()):
     if not validate_prompt(prompt):
         return None, "Prompt rejected. Only vintage motorcycle content allowed."
 
     clean_prompt = sanitize_prompt(prompt)
     final_prompt = build_prompt(clean_prompt, era, camera)
 
-    key = cache_key(final_prompt)
-    cached = get_cached_video(key)
+    cached = get_cache().lookup("video", clean_prompt, era, camera, SEED, ENGINE_CONFIG)
     if cached:
-        return cached, "Served from cache."
+        return cached["files"]["mp4"], "Served from cache."
 
-    frames = engine.generate(final_prompt)
+    job = service.submit(
+        "video", final_prompt, seed=SEED,
+        on_progress=lambda job: progress(job.progress, desc=f"Step {job.step}/{job.total_steps}")
+    )
+    frames, _ = job.get()
 
     tmp = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
     frames_to_video(frames, tmp.name)
 
-    final_path = store_video(key, tmp.name)
-    return final_path, "Generated successfully."
+    files = get_cache().store("video", clean_prompt, era, camera, SEED, ENGINE_CONFIG, {"mp4": tmp.name}, move=True)
+    return files["mp4"], "Generated successfully."
 
 
 with gr.Blocks() as demo:
@@ -5,7 +5,7 @@ Optimized for RTX 3050 6GB
 
 import streamlit as st
 import os
-import time
+import random
 import torch
 
 # Page Configuration - MUST be first Streamlit command
@@ -17,9 +17,13 @@ st.set_page_config(
 )
 
 # Import our modules AFTER streamlit config
-from config import ERA_DESCRIPTIONS, CAMERA_STYLES, PRESET_PROMPTS, VIDEO_CONFIG
-from utils import validate_prompt, build_prompt, save_image, save_video, list_outputs
+from config import ERA_DESCRIPTIONS, CAMERA_STYLES, PRESET_PROMPTS, VIDEO_CONFIG, VARIATIONS_CONFIG, INTERPOLATION_CONFIG
+from cache import get_cache
+from interpolate import output_length
+from utils import validate_prompt, build_prompt, save_image, save_variations, save_video, list_outputs
 from generator import get_generator, clear_memory
+from generation_service import get_service, GenerationCancelled
+from telemetry import get_sampler
 
 # Custom CSS
 st.markdown("""
@@ -83,6 +87,14 @@ if 'last_output' not in st.session_state:
     st.session_state.last_output = None
 if 'generation_mode' not in st.session_state:
     st.session_state.generation_mode = "image"
+if 'job' not in st.session_state:
+    st.session_state.job = None
+
+# Cancel was clicked while a job ran: the click stopped that script run, the job
+# itself keeps going on the service worker until cancelled here
+if st.session_state.get("cancel_job") and st.session_state.job is not None:
+    st.session_state.job.cancel()
+    st.session_state.job = None
 
 # Header
 st.markdown('<h1 class="main-title">🏍️ Vintage Bike Generator</h1>', unsafe_allow_html=True)
@@ -141,6 +153,11 @@ with st.sidebar:
         mem_pct = gpu_mem_used / gpu_mem_total
         st.progress(mem_pct)
         
+        sampler = get_sampler()
+        sample = sampler.fresh() if sampler is not None else None
+        if sample is not None and sample["temp"] is not None:
+            st.info(f"🌡️ {sample['temp']:.0f}°C (avg {sampler.average('temp'):.0f}°C) | Load: {sample['utilization'] or 0:.0f}%")
+        
         if mem_pct > 0.8:
             st.warning("⚠️ High VRAM usage")
             if st.button("🧹 Clear Memory"):
@@ -154,11 +171,21 @@ with st.sidebar:
     with st.expander("📊 Current Config"):
         if st.session_state.generation_mode == "video":
             st.write(f"Resolution: {VIDEO_CONFIG['width']}x{VIDEO_CONFIG['height']}")
-            st.write(f"Frames: {VIDEO_CONFIG['num_frames']}")
+            if INTERPOLATION_CONFIG["enabled"]:
+                output_frames = output_length(VIDEO_CONFIG["num_frames"], INTERPOLATION_CONFIG["factor"])
+                st.write(f"Frames: {VIDEO_CONFIG['num_frames']} diffused → {output_frames} "
+                         f"@ {INTERPOLATION_CONFIG['output_fps']} fps")
+            else:
+                st.write(f"Frames: {VIDEO_CONFIG['num_frames']}")
             st.write(f"Steps: {VIDEO_CONFIG['num_inference_steps']}")
         else:
             st.write("Resolution: 512x512")
             st.write("Steps: 20")
+        
+        metrics = get_generator().get_metrics()
+        if metrics["base_load_s"] is not None:
+            st.write(f"Base load: {metrics['base_load_s']}s | Video build: {metrics['video_build_s'] or '-'}s")
+            st.write(f"Last mode switch: {metrics['last_switch_s']}s ({metrics['switches']} switches)")
 
 # Main Content
 col1, col2 = st.columns([1, 1])
@@ -194,7 +221,7 @@ with col1:
             st.error(message)
     
     # Generate button
-    generate_col1, generate_col2 = st.columns([2, 1])
+    generate_col1, generate_col2, generate_col3 = st.columns([2, 1, 1])
     with generate_col1:
         generate_btn = st.button(
             f"🎨 Generate {'Image' if st.session_state.generation_mode == 'image' else 'Video'}",
@@ -202,6 +229,13 @@ with col1:
             use_container_width=True
         )
     with generate_col2:
+        variations_btn = st.button(
+            f"🎲 {VARIATIONS_CONFIG['count']} Variations",
+            disabled=st.session_state.generation_mode != "image",
+            help="Several seeds of the same prompt in one batched run",
+            use_container_width=True
+        )
+    with generate_col3:
         if st.button("🧹 Clear", use_container_width=True):
             clear_memory()
             st.rerun()
@@ -220,7 +254,7 @@ with col2:
             output_placeholder.image(st.session_state.last_output)
 
 # Generation Logic
-if generate_btn:
+if generate_btn or variations_btn:
     if not prompt:
         st.error("❌ Please enter a prompt")
     else:
@@ -235,103 +269,179 @@ if generate_btn:
             with st.expander("📜 Enhanced Prompt"):
                 st.code(full_prompt)
             
-            # Generate
-            progress = st.progress(0)
-            status = st.empty()
+            mode_name = "variations" if variations_btn else st.session_state.generation_mode
+            # Includes the CPU profile and few-step settings, which change the output
+            mode_config = get_service().mode_config(mode_name)
+            generation_cache = get_cache()
             
-            try:
-                status.text("🔄 Loading model...")
-                progress.progress(10)
+            # A seeded request that was generated before is served from cache
+            cached = generation_cache.lookup(mode_name, prompt, era, camera, seed, mode_config) if seed is not None else None
+            if cached:
+                files = cached["files"]
+                output_path = files.get("png") or files.get("mp4") or files.get("gif")
+                st.session_state.last_output = output_path
+                if output_path.endswith(('.mp4', '.gif')):
+                    output_placeholder.video(output_path)
+                else:
+                    output_placeholder.image(output_path)
+                status_placeholder.success(f"⚡ Served from cache | Seed: {seed}")
+            else:
+                # Instant preview from the most similar cached prompt while this one generates
+                similar = generation_cache.nearest(mode_name, prompt, mode_config, era=era, camera=camera, limit=1)
+                if similar:
+                    files = similar[0]["files"]
+                    preview_path = files.get("png") or files.get("gif") or files.get("mp4")
+                    if preview_path.endswith(('.mp4', '.gif')):
+                        output_placeholder.video(preview_path)
+                    else:
+                        output_placeholder.image(preview_path)
+                    status_placeholder.info(f"⚡ Preview: similar cached result ({similar[0]['similarity']:.0%} match)")
                 
-                generator = get_generator()
+                # Generate
+                progress = st.progress(0)
+                status = st.empty()
+                st.button("⏹️ Cancel", key="cancel_job")
                 
-                if st.session_state.generation_mode == "image":
-                    # Generate image
-                    status.text("🎨 Generating image...")
-                    progress.progress(30)
-                    
-                    start_time = time.time()
-                    image, used_seed = generator.generate_image(full_prompt, seed=seed)
-                    gen_time = time.time() - start_time
-                    
-                    progress.progress(80)
-                    status.text("💾 Saving...")
-                    
-                    # Save
-                    filepath = save_image(image, prompt, used_seed)
-                    
-                    progress.progress(100)
-                    
-                    # Display
-                    st.session_state.last_output = filepath
-                    output_placeholder.image(filepath)
-                    status_placeholder.success(f"✅ Generated in {gen_time:.1f}s | Seed: {used_seed}")
-                    
-                    # Download
-                    with open(filepath, "rb") as f:
-                        download_placeholder.download_button(
-                            "📥 Download Image",
-                            f,
-                            file_name=f"vintage_bike_{used_seed}.png",
-                            mime="image/png"
-                        )
+                def wait_for(job, first_frame=False):
+                    """Show queue position / step progress until the job finishes (or decodes its first frame)."""
+                    service = get_service()
+                    while not job.wait(0.25):
+                        if first_frame and job.frames:
+                            return None
+                        if job.status == "queued":
+                            status.text(f"⏳ Queued ({service.queue_position(job)} ahead)...")
+                        elif job.cooling_temp is not None:
+                            status.text(f"🌡️ Cooling down ({job.cooling_temp:.0f}°C), step {job.step}/{job.total_steps}...")
+                        else:
+                            status.text(f"🎨 Step {job.step}/{job.total_steps}...")
+                            progress.progress(min(job.progress, 0.95))
+                    st.session_state.job = None
+                    return job.get(), job.finished_at - job.started_at
                 
-                else:
-                    # Generate video
-                    status.text("🎬 Generating video (this takes longer)...")
-                    progress.progress(30)
+                try:
+                    # Jobs run one at a time on the service worker; identical requests
+                    # from other sessions (same prompt and seed) share one generation
+                    # The seed is fixed up front so the video can be saved while it is still decoding
+                    job_seed = seed if seed is not None else random.randrange(2**32)
+                    job = get_service().submit(mode_name, full_prompt, seed=job_seed, camera=camera)
+                    st.session_state.job = job
                     
-                    start_time = time.time()
-                    frames, used_seed = generator.generate_video(full_prompt, seed=seed)
-                    gen_time = time.time() - start_time
-                    
-                    progress.progress(80)
-                    status.text("💾 Saving video...")
-                    
-                    # Save
-                    mp4_path, gif_path = save_video(frames, prompt, used_seed)
-                    
-                    progress.progress(100)
-                    
-                    # Display (prefer GIF as it always works)
-                    output_path = mp4_path if mp4_path and os.path.exists(mp4_path) else gif_path
-                    st.session_state.last_output = output_path
-                    
-                    if output_path:
-                        output_placeholder.video(output_path)
-                    
-                    status_placeholder.success(f"✅ Generated in {gen_time:.1f}s | Seed: {used_seed} | Frames: {len(frames)}")
-                    
-                    # Downloads
-                    dl_cols = download_placeholder.columns(2)
-                    if gif_path and os.path.exists(gif_path):
-                        with open(gif_path, "rb") as f:
-                            dl_cols[0].download_button(
-                                "📥 GIF",
+                    if mode_name == "image":
+                        # Generate image
+                        (image, used_seed), gen_time = wait_for(job)
+                        
+                        progress.progress(80)
+                        status.text("💾 Saving...")
+                        
+                        # Save
+                        filepath = save_image(image, prompt, used_seed)
+                        generation_cache.store(mode_name, prompt, era, camera, used_seed, mode_config, {"png": filepath})
+                        
+                        progress.progress(100)
+                        
+                        # Display
+                        st.session_state.last_output = filepath
+                        output_placeholder.image(filepath)
+                        status_placeholder.success(f"✅ Generated in {gen_time:.1f}s | Seed: {used_seed}")
+                        
+                        # Download
+                        with open(filepath, "rb") as f:
+                            download_placeholder.download_button(
+                                "📥 Download Image",
                                 f,
-                                file_name=f"vintage_bike_{used_seed}.gif",
-                                mime="image/gif"
+                                file_name=f"vintage_bike_{used_seed}.png",
+                                mime="image/png"
                             )
-                    if mp4_path and os.path.exists(mp4_path):
-                        with open(mp4_path, "rb") as f:
-                            dl_cols[1].download_button(
-                                "📥 MP4",
+                    
+                    elif mode_name == "variations":
+                        # Generate all seeds in batched passes
+                        ((images, contact_sheet, seeds), used_seed), gen_time = wait_for(job)
+                        
+                        progress.progress(90)
+                        status.text("💾 Saving...")
+                        
+                        # Save every variation plus the contact sheet (cached under the first seed)
+                        paths, sheet_path = save_variations(images, contact_sheet, prompt, seeds)
+                        generation_cache.store(mode_name, prompt, era, camera, used_seed, mode_config, {"png": sheet_path})
+                        
+                        progress.progress(100)
+                        
+                        # Display
+                        st.session_state.last_output = sheet_path
+                        output_placeholder.image(sheet_path)
+                        status_placeholder.success(
+                            f"✅ {len(images)} variations in {gen_time:.1f}s ({gen_time / len(images):.1f}s each) | "
+                            f"Seeds: {', '.join(map(str, seeds))}"
+                        )
+                        
+                        # Download
+                        with open(sheet_path, "rb") as f:
+                            download_placeholder.download_button(
+                                "📥 Download Contact Sheet",
                                 f,
-                                file_name=f"vintage_bike_{used_seed}.mp4",
-                                mime="video/mp4"
+                                file_name=f"vintage_bike_{used_seed}_variations.png",
+                                mime="image/png"
                             )
+                    
+                    else:
+                        # Generate video
+                        wait_for(job, first_frame=True)
+                        
+                        progress.progress(80)
+                        status.text("💾 Saving video...")
+                        
+                        # Save (frames are encoded as the VAE decodes them)
+                        mp4_path, gif_path = save_video(job.iter_frames, prompt, job_seed)
+                        (frames, used_seed), gen_time = wait_for(job)
+                        generation_cache.store(mode_name, prompt, era, camera, used_seed, mode_config,
+                                               {"mp4": mp4_path, "gif": gif_path})
+                        
+                        progress.progress(100)
+                        
+                        # Display (prefer GIF as it always works)
+                        output_path = mp4_path if mp4_path and os.path.exists(mp4_path) else gif_path
+                        st.session_state.last_output = output_path
+                        
+                        if output_path:
+                            output_placeholder.video(output_path)
+                        
+                        status_placeholder.success(f"✅ Generated in {gen_time:.1f}s | Seed: {used_seed} | Frames: {len(frames)}")
+                        
+                        # Downloads
+                        dl_cols = download_placeholder.columns(2)
+                        if gif_path and os.path.exists(gif_path):
+                            with open(gif_path, "rb") as f:
+                                dl_cols[0].download_button(
+                                    "📥 GIF",
+                                    f,
+                                    file_name=f"vintage_bike_{used_seed}.gif",
+                                    mime="image/gif"
+                                )
+                        if mp4_path and os.path.exists(mp4_path):
+                            with open(mp4_path, "rb") as f:
+                                dl_cols[1].download_button(
+                                    "📥 MP4",
+                                    f,
+                                    file_name=f"vintage_bike_{used_seed}.mp4",
+                                    mime="video/mp4"
+                                )
+                    
+                    status.empty()
+                    progress.empty()
+                    
+                except GenerationCancelled:
+                    st.warning("⏹️ Generation cancelled")
+                    status.empty()
+                    progress.empty()
                 
-                status.empty()
-                progress.empty()
-                
-            except Exception as e:
-                st.error(f"❌ Generation failed: {str(e)}")
-                import traceback
-                with st.expander("Error Details"):
-                    st.code(traceback.format_exc())
-                
-                # Clear memory on error
-                clear_memory()
+                except Exception as e:
+                    st.error(f"❌ Generation failed: {str(e)}")
+                    import traceback
+                    with st.expander("Error Details"):
+                        st.code(traceback.format_exc())
+                    
+                    # Clear memory on error
+                    clear_memory()
 
 # Gallery Section
 st.markdown("---")
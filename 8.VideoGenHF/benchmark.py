@@ -0,0 +1,87 @@
+"""
+Generation Benchmark - seconds per denoising step for each execution profile
+On CPU every profile in CPU_PROFILES is compared (or the ones named with
+--profiles); on a GPU the regular offload setup is measured.
+
+    python benchmark.py
+    python benchmark.py --profiles baseline lcm --runs 3 --mode video
+"""
+
+import argparse
+import json
+import time
+
+from config import DEVICE, CPU_PROFILES, EMBEDDING_CACHE_CONFIG
+from generator import VintageGenerator, clear_memory
+
+BENCHMARK_PROMPT = "1970s vintage motorcycle, cafe racer, chrome exhaust pipes, parked on street"
+
+
+def benchmark_profile(profile, mode: str = "image", runs: int = 2, seed: int = 42) -> dict:
+    """Load the models with one profile and time `runs` generations step by step"""
+    generator = VintageGenerator(cpu_profile=profile)
+
+    start = time.perf_counter()
+    if mode == "image":
+        generator.load_image_model()
+    else:
+        generator.load_video_model()
+    load_s = time.perf_counter() - start
+
+    generate = getattr(generator, f"generate_{mode}")
+    first_steps, steady_steps, totals = [], [], []
+    for _ in range(runs):
+        stamps = []
+        start = time.perf_counter()
+        generate(BENCHMARK_PROMPT, seed=seed, on_step=lambda step, total: stamps.append(time.perf_counter()))
+        totals.append(time.perf_counter() - start)
+        # The first step also pays for setup (and compilation on the first run)
+        first_steps.append(stamps[0] - start)
+        steady_steps += [b - a for a, b in zip(stamps, stamps[1:])]
+
+    result = {
+        "profile": profile or DEVICE,
+        "mode": mode,
+        "few_step": generator.few_step,
+        "steps": len(stamps),
+        "load_s": round(load_s, 2),
+        "first_step_s": round(first_steps[-1], 3),
+        "s_per_step": round(sum(steady_steps) / len(steady_steps), 3) if steady_steps else None,
+        "s_per_output": round(min(totals), 2),
+    }
+    generator.unload()
+    clear_memory()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seconds per step for each execution profile")
+    parser.add_argument("--profiles", nargs="+", choices=list(CPU_PROFILES),
+                        help="CPU profiles to compare (default: all; ignored on a GPU)")
+    parser.add_argument("--mode", choices=["image", "video"], default="image")
+    parser.add_argument("--runs", type=int, default=2, help="Generations per profile (the first one warms up)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    # Only the benchmark prompt is needed, skip encoding every preset
+    EMBEDDING_CACHE_CONFIG["precompute"] = False
+
+    profiles = (args.profiles or list(CPU_PROFILES)) if DEVICE == "cpu" else [None]
+    results = []
+    for profile in profiles:
+        print(f"\n⏱️ Benchmarking {profile or DEVICE} ({args.mode}, {args.runs} runs)...")
+        results.append(benchmark_profile(profile, args.mode, args.runs))
+
+    print(f"\n{'profile':<14}{'steps':>6}{'s/step':>9}{'1st step':>10}{'s/output':>10}{'load s':>9}")
+    for r in results:
+        s_per_step = "-" if r["s_per_step"] is None else r["s_per_step"]
+        print(f"{r['profile']:<14}{r['steps']:>6}{s_per_step:>9}{r['first_step_s']:>10}"
+              f"{r['s_per_output']:>10}{r['load_s']:>9}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,214 @@
-import hashlib
+"""
+Generation Cache - reuse finished images/videos
+Outputs (MP4/GIF/PNG) are stored under cache/ and indexed in SQLite by
+(mode, normalized prompt, era, camera, seed, config hash):
+- Prompts are normalized (case, punctuation, whitespace), so "Vintage bike"
+  and "vintage bike " hit the same entry; accents and non-Latin scripts are
+  kept, so "café" and "caf" do not
+- nearest() finds cached results for similar prompts by token-set
+  (Jaccard) similarity, for instant previews while a new one generates
+- Least recently used entries are evicted once the cache exceeds max_bytes
+"""
+
 import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
 
+from config import GENERATION_CACHE_CONFIG
 
-CACHE_DIR = "cache"
+CACHE_DIR = GENERATION_CACHE_CONFIG["cache_dir"]
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 
-def cache_key(text: str) -> str:
-    return hashlib.sha256(text.encode()).hexdigest()
+def normalize_prompt(prompt: str) -> str:
+    """Casefolded Unicode words: punctuation and extra whitespace do not change the output"""
+    return " ".join(re.findall(r"\w+", prompt.casefold()))
+
+
+def prompt_tokens(prompt: str) -> List[str]:
+    """Distinct ASCII tokens of a prompt (order-insensitive); lossy, only for nearest()"""
+    return sorted(set(re.findall(r"[a-z0-9]+", prompt.lower())))
+
+
+def config_hash(config: dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class GenerationCache:
+    """SQLite index + files, LRU evicted by total size"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = GENERATION_CACHE_CONFIG["max_bytes"]):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db_path = os.path.join(cache_dir, "generations.db")
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    key TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    era TEXT,
+                    camera TEXT,
+                    seed INTEGER NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    token_count INTEGER NOT NULL,
+                    files TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_generations_last_used ON generations(last_used);
+                CREATE TABLE IF NOT EXISTS generation_tokens (
+                    token TEXT NOT NULL,
+                    key TEXT NOT NULL REFERENCES generations(key) ON DELETE CASCADE,
+                    PRIMARY KEY (token, key)
+                ) WITHOUT ROWID;
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Connection for one transaction (committed on success, always closed)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(mode: str, prompt: str, era: str, camera: str, seed: int, config: dict) -> str:
+        payload = json.dumps([mode, normalize_prompt(prompt), era, camera, seed, config_hash(config)])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _entry(row: sqlite3.Row, **extra) -> Dict:
+        entry = dict(row)
+        entry["files"] = json.loads(entry["files"])
+        entry.update(extra)
+        return entry
+
+    def lookup(self, mode: str, prompt: str, era: str, camera: str, seed: int, config: dict) -> Optional[Dict]:
+        """Exact match (after normalization); None if missing or its files are gone"""
+        key = self.key(mode, prompt, era, camera, seed, config)
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = self._entry(row)
+            if not all(os.path.exists(path) for path in entry["files"].values()):
+                self._delete(conn, [entry])
+                return None
+            conn.execute("UPDATE generations SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                         (time.time(), key))
+        return entry
+
+    def store(self, mode: str, prompt: str, era: str, camera: str, seed: int, config: dict,
+              files: Dict[str, str], move: bool = False) -> Dict[str, str]:
+        """
+        Copy (or move) output files into the cache and index them.
+        files maps extension -> path, e.g. {"mp4": ..., "gif": ...}. Returns the cached paths.
+        """
+        key = self.key(mode, prompt, era, camera, seed, config)
+        cached = {}
+        for ext, path in files.items():
+            if not path or not os.path.exists(path):
+                continue
+            target = os.path.join(self.cache_dir, f"{key}.{ext}")
+            (shutil.move if move else shutil.copyfile)(path, target)
+            cached[ext] = target
+        if not cached:
+            return cached
+
+        tokens = prompt_tokens(prompt)
+        now = time.time()
+        size = sum(os.path.getsize(path) for path in cached.values())
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM generations WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO generations (key, mode, prompt, era, camera, seed, config_hash, token_count, "
+                "files, size_bytes, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, mode, normalize_prompt(prompt), era, camera, seed, config_hash(config), len(tokens),
+                 json.dumps(cached), size, now, now)
+            )
+            conn.executemany("INSERT INTO generation_tokens (token, key) VALUES (?, ?)",
+                             [(token, key) for token in tokens])
+            self._evict(conn, keep=key)
+        return cached
+
+    def nearest(self, mode: str, prompt: str, config: dict, era: Optional[str] = None,
+                camera: Optional[str] = None, limit: int = 3, min_similarity: float = GENERATION_CACHE_CONFIG["min_similarity"]) -> List[Dict]:
+        """
+        Cached results for similar prompts, best first, with a "similarity"
+        (Jaccard over prompt tokens; era/camera matches break ties)
+        """
+        tokens = prompt_tokens(prompt)
+        if not tokens:
+            return []
+        placeholders = ",".join("?" * len(tokens))
+        with self._lock, self._connect() as conn:
+            # Only entries sharing at least one token are considered (token index)
+            rows = conn.execute(f"""
+                SELECT g.*, COUNT(*) AS shared
+                FROM generation_tokens t JOIN generations g ON g.key = t.key
+                WHERE t.token IN ({placeholders}) AND g.mode = ? AND g.config_hash = ?
+                GROUP BY g.key
+            """, (*tokens, mode, config_hash(config))).fetchall()
+
+        results = []
+        for row in rows:
+            similarity = row["shared"] / (len(tokens) + row["token_count"] - row["shared"])
+            if similarity >= min_similarity:
+                entry = self._entry(row, similarity=round(similarity, 3))
+                del entry["shared"]
+                if all(os.path.exists(path) for path in entry["files"].values()):
+                    results.append(entry)
+        results.sort(key=lambda entry: (
+            entry["similarity"], (entry["era"] == era) + (entry["camera"] == camera), entry["last_used"]
+        ), reverse=True)
+        return results[:limit]
+
+    def size_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM generations").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection, keep: str):
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for row in conn.execute("SELECT * FROM generations WHERE key != ? ORDER BY last_used", (keep,)):
+            if total <= self.max_bytes:
+                break
+            victims.append(self._entry(row))
+            total -= row["size_bytes"]
+        self._delete(conn, victims)
 
+    def _delete(self, conn: sqlite3.Connection, entries: List[Dict]):
+        for entry in entries:
+            for path in entry["files"].values():
+                if os.path.exists(path):
+                    os.remove(path)
+        conn.executemany("DELETE FROM generations WHERE key = ?", [(entry["key"],) for entry in entries])
 
-def get_cached_video(key: str):
-    path = os.path.join(CACHE_DIR, f"{key}.mp4")
-    return path if os.path.exists(path) else None
 
+# Singleton instance
+_cache = None
 
-def store_video(key: str, path: str):
-    final_path = os.path.join(CACHE_DIR, f"{key}.mp4")
-    os.replace(path, final_path)
-    return final_path
+def get_cache() -> GenerationCache:
+    """Get or create the generation cache"""
+    global _cache
+    if _cache is None:
+        _cache = GenerationCache()
+    return _cache
@@ -3,19 +3,45 @@ Configuration for Vintage Bike Video Generator
 Optimized for RTX 3050 6GB VRAM - LAPTOP SAFE MODE
 """
 
+import os
 import torch
 
 # Device Configuration
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 DTYPE = torch.float16 if DEVICE == "cuda" else torch.float32
 
+# CPU Execution Profiles (used when no GPU is available)
+# Pick one with VINTAGE_CPU_PROFILE=<name>; benchmark.py compares them.
+# The lcm profiles change the output (LCM-LoRA, 4 steps, no guidance), so they are opt-in
+CPU_PROFILES = {
+    "baseline": {"bf16_autocast": False, "channels_last": False, "few_step": False, "compile": False},
+    "fast": {"bf16_autocast": True, "channels_last": True, "few_step": False, "compile": False},
+    "lcm": {"bf16_autocast": True, "channels_last": True, "few_step": True, "compile": False},
+    "lcm_compiled": {"bf16_autocast": True, "channels_last": True, "few_step": True, "compile": True},
+}
+CPU_PROFILE = os.environ.get("VINTAGE_CPU_PROFILE", "fast")
+CPU_NUM_THREADS = None  # None = every core this process may use
+
+# Few-step sampling (CPU profiles with few_step): LCM-LoRA fused into the SD 1.5 UNet
+FEW_STEP_CONFIG = {
+    "lora": "latent-consistency/lcm-lora-sdv1-5",
+    "num_inference_steps": 4,
+    "guidance_scale": 1.0,   # <= 1 turns classifier-free guidance off (one UNet pass per step)
+}
+
 # ============================================
 # THERMAL PROTECTION (Laptop Safe Mode)
 # ============================================
 THERMAL_CONFIG = {
     "max_temp_celsius": 80,      # Pause if GPU hits 80°C (well below throttle point)
     "cool_down_temp": 70,        # Resume when cooled to 70°C
-    "check_interval_seconds": 5, # Check temp every 5 seconds during generation
+    "cpu_max_temp_celsius": 95,  # CPU backend: packages run hotter than GPUs by design
+    "cpu_cool_down_temp": 85,    # CPU backend: resume below this
+    "sample_interval_seconds": 1.0,  # Background sampler rate (see telemetry.py)
+    "history_size": 300,         # Samples kept in the ring buffer (5 min at 1/s)
+    "average_window_seconds": 5, # Window for averaged readings
+    "max_cooldown_seconds": 300, # Resume anyway after pausing this long
+    "backend": "auto",           # auto, nvml, nvidia-smi, cpu, fake
     "delay_between_generations": 3,  # Wait 3 seconds between generations
     "enable_monitoring": True,   # Enable thermal monitoring
 }
@@ -40,6 +66,15 @@ VIDEO_CONFIG = {
     "fps": 6
 }
 
+# Frame interpolation (see interpolate.py): only keyframes are diffused,
+# the frames in between come from optical flow
+INTERPOLATION_CONFIG = {
+    "enabled": True,
+    "factor": 4,          # 8 diffused frames -> 29 output frames
+    "method": "dis",      # "dis" (fast) or "farneback"
+    "output_fps": 12,     # Playback rate of interpolated videos (~2.4s instead of ~1.3s)
+}
+
 # Image Generation Settings (for fallback)
 IMAGE_CONFIG = {
     "height": 512,
@@ -48,6 +83,33 @@ IMAGE_CONFIG = {
     "guidance_scale": 7.5,
 }
 
+# Seed variations: several seeds of one prompt in batched passes (image settings)
+VARIATIONS_CONFIG = {
+    "count": 4,                 # Seeds per request (seed, seed+1, ...)
+    "max_batch_size": 4,        # Upper bound on images per denoising pass
+    "mb_per_sample": 900,       # Estimated VRAM per image at 512x512 (UNet activations with CFG)
+    "memory_budget_mb": None,   # None = free VRAM at request time minus reserve_mb
+    "reserve_mb": 768,
+}
+
+# Standard negative prompts (their embeddings are precomputed at startup)
+IMAGE_NEGATIVE_PROMPT = "blurry, low quality, distorted, ugly"
+VIDEO_NEGATIVE_PROMPT = "blurry, low quality, distorted, static, still"
+
+# Prompt embedding cache (skips the CLIP text encoder for repeated prompts)
+EMBEDDING_CACHE_CONFIG = {
+    "max_entries": 128,                 # Embeddings kept in memory (~120 KB each in fp16)
+    "cache_dir": "cache/embeddings",    # On-disk copy, survives restarts ("" = memory only)
+    "precompute": True,                 # Encode presets x eras x camera styles at startup
+}
+
+# Generation cache (see cache.py)
+GENERATION_CACHE_CONFIG = {
+    "cache_dir": "cache",
+    "max_bytes": 2 * 1024**3,   # LRU eviction above 2 GB of cached outputs
+    "min_similarity": 0.5,      # Token-set similarity for "nearest cached result" previews
+}
+
 # Vintage Bike Context Keywords
 ALLOWED_KEYWORDS = {
     "vintage", "classic", "motorcycle", "bike", "cafe racer",
@@ -80,6 +142,19 @@ CAMERA_STYLES = {
     "Wide": "wide establishing shot, full view"
 }
 
+# Camera motion of the image-based fallback animation (see camera_motion.py)
+# zoom: (start, end) scale; pan/tilt: (start, end) view offset as a fraction of width/height
+CAMERA_MOTIONS = {
+    "Static": {"zoom": (1.0, 1.06)},                       # barely-there push-in
+    "Pan": {"zoom": (1.15, 1.15), "pan": (-0.06, 0.06)},   # left to right
+    "Detail": {"zoom": (1.0, 1.35), "tilt": (0.0, 0.04)},  # slow push-in, drifting down
+    "Wide": {"zoom": (1.25, 1.0)},                         # pull back to the full view
+}
+
+CAMERA_MOTION_CONFIG = {
+    "easing": "ease_in_out",   # linear, ease_in, ease_out, ease_in_out, ease_in_out_sine
+}
+
 # Base Style (simplified for better results)
 BASE_STYLE = "cinematic, professional photography, natural lighting, high quality, detailed"
 
@@ -0,0 +1,114 @@
+"""
+Prompt Embedding Cache - skip the CLIP text encoder for repeated prompts
+Prompts are mostly built from small fixed sets (eras, camera styles, presets,
+standard negative prompts), so their embeddings are reused:
+- In-memory LRU of CPU tensors, backed by one .pt file per prompt on disk
+- Keyed by model id + text encoder dtype + CLIP token ids (after truncation
+  to 77 tokens), so prompts that tokenize the same share an entry
+- Always encoded with autocast off, at the text encoder's own precision: the
+  bf16 autocast of a CPU profile never leaks into the (disk) cache
+- The image and video pipelines share the SD 1.5 text encoder, so one entry serves both
+"""
+
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Iterable
+
+import torch
+
+
+class PromptEmbeddingCache:
+    """LRU + on-disk cache of text-encoder outputs (one prompt per entry)"""
+
+    def __init__(self, model_id: str, max_entries: int = 128, cache_dir: str = "cache/embeddings"):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, pipe, text: str) -> str:
+        """Cache key from the tokenized prompt (what the text encoder actually sees)"""
+        tokenizer = pipe.tokenizer
+        input_ids = tokenizer(
+            text,
+            padding="max_length",
+            max_length=tokenizer.model_max_length,
+            truncation=True
+        ).input_ids
+        payload = f"{self.model_id}:{pipe.text_encoder.dtype}:{','.join(map(str, input_ids))}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, pipe, text: str) -> torch.Tensor:
+        """Embeddings for one prompt, on the pipeline's execution device"""
+        key = self.key(pipe, text)
+        embeds = self._entries.get(key)
+        if embeds is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        else:
+            embeds = self._load(key)
+            if embeds is not None:
+                self.stats["disk_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                embeds = self._encode(pipe, text)
+                self._save(key, embeds)
+            self._remember(key, embeds)
+        return embeds.to(device=pipe._execution_device, dtype=pipe.text_encoder.dtype)
+
+    def get_pair(self, pipe, prompt: str, negative_prompt: str):
+        """(prompt_embeds, negative_prompt_embeds) for the pipeline call"""
+        return self.get(pipe, prompt), self.get(pipe, negative_prompt or "")
+
+    def warm(self, pipe, texts: Iterable[str]) -> int:
+        """Precompute embeddings (e.g. presets at startup). Returns how many were encoded."""
+        misses = self.stats["misses"]
+        for text in texts:
+            self.get(pipe, text)
+        return self.stats["misses"] - misses
+
+    def _encode(self, pipe, text: str) -> torch.Tensor:
+        # Without classifier-free guidance encode_prompt returns (embeds, None);
+        # negative prompts are padded to the same 77 tokens, so they are encoded the same way
+        device = pipe._execution_device
+        with torch.inference_mode(), torch.autocast(device_type=device.type, enabled=False):
+            embeds, _ = pipe.encode_prompt(text, device, 1, False)
+        return embeds.detach().cpu()
+
+    def _remember(self, key: str, embeds: torch.Tensor):
+        self._entries[key] = embeds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def _load(self, key: str):
+        if not self.cache_dir:
+            return None
+        try:
+            return torch.load(self._path(key), map_location="cpu", weights_only=True)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable embedding cache entry {key[:8]}: {e}")
+            return None
+
+    def _save(self, key: str, embeds: torch.Tensor):
+        if not self.cache_dir:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            torch.save(embeds, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            print(f"⚠️ Could not store prompt embedding: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,172 @@
+"""
+Streaming Frame Encoder - MP4 and GIF from one pass over the frames
+Frames are piped to a single ffmpeg process as they are produced (e.g. while
+later frames are still being decoded by the VAE); no frame list is kept:
+- One rawvideo stdin pipe, split inside ffmpeg into an H.264 MP4 and a GIF
+- The GIF uses palettegen/paletteuse (a real palette instead of a fixed one)
+- A writer thread feeds the pipe, so the producer never waits on the encoder
+  unless max_pending frames are already queued
+"""
+
+import os
+import queue
+import threading
+import subprocess
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+Frame = Union[Image.Image, np.ndarray]
+
+# GIF branch: palette from all frames (frame-difference stats suit slow camera motion)
+GIF_FILTER = "palettegen=stats_mode=diff[palette];[gif2][palette]paletteuse=dither=bayer:bayer_scale=3"
+
+
+class EncoderError(RuntimeError):
+    """ffmpeg is missing, failed or rejected a frame (errors of the frame source are not wrapped)"""
+
+
+def get_ffmpeg() -> str:
+    """Path of the ffmpeg binary bundled with imageio-ffmpeg"""
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def to_rgb_array(frame: Frame) -> np.ndarray:
+    """HxWx3 uint8 RGB view of a PIL image or float/uint8 array"""
+    if isinstance(frame, Image.Image):
+        frame = np.asarray(frame.convert("RGB"))
+    if frame.dtype != np.uint8:
+        frame = (np.clip(frame, 0, 1) * 255).round().astype(np.uint8)
+    return np.ascontiguousarray(frame[..., :3])
+
+
+class StreamingEncoder:
+    """
+    Persistent ffmpeg pipe writing an MP4 and/or a GIF.
+    The frame size is taken from the first frame.
+
+        with StreamingEncoder("out.mp4", "out.gif", fps=6) as encoder:
+            for frame in frames:
+                encoder.write(frame)
+    """
+
+    def __init__(self, mp4_path: Optional[str] = None, gif_path: Optional[str] = None,
+                 fps: int = 8, crf: int = 20, max_pending: int = 8):
+        if not mp4_path and not gif_path:
+            raise ValueError("StreamingEncoder needs an MP4 and/or a GIF path")
+        self.mp4_path = mp4_path
+        self.gif_path = gif_path
+        self.fps = fps
+        self.crf = crf
+        self.frames_written = 0
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._process = None
+        self._writer = None
+        self._error = None
+
+    def _command(self, width: int, height: int) -> list:
+        outputs = []
+        if self.mp4_path:
+            outputs.append("mp4")
+        if self.gif_path:
+            outputs.append("gif")
+        graph = f"[0:v]split={len(outputs)}" + "".join(f"[{name}]" for name in outputs)
+        if self.mp4_path:
+            # libx264 + yuv420p need even dimensions
+            graph += ";[mp4]pad=ceil(iw/2)*2:ceil(ih/2)*2[mp4out]"
+        if self.gif_path:
+            graph += f";[gif]split[gif1][gif2];[gif1]{GIF_FILTER}[gifout]"
+
+        command = [
+            get_ffmpeg(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+            "-filter_complex", graph,
+        ]
+        if self.mp4_path:
+            command += ["-map", "[mp4out]", "-c:v", "libx264", "-pix_fmt", "yuv420p",
+                        "-crf", str(self.crf), "-movflags", "+faststart", self.mp4_path]
+        if self.gif_path:
+            command += ["-map", "[gifout]", "-loop", "0", self.gif_path]
+        return command
+
+    def _start(self, width: int, height: int):
+        self.size = (width, height)
+        try:
+            self._process = subprocess.Popen(
+                self._command(width, height), stdin=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except (ImportError, OSError, RuntimeError) as e:
+            # imageio-ffmpeg missing, no bundled binary, or ffmpeg would not start
+            raise EncoderError(f"Could not start ffmpeg: {e}") from e
+        self._writer = threading.Thread(target=self._write_loop, name="ffmpeg-writer", daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            data = self._pending.get()
+            if data is None:
+                break
+            try:
+                self._process.stdin.write(data)
+            except (BrokenPipeError, OSError) as e:
+                self._error = e
+                # Keep draining so write() never blocks on a dead encoder
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+
+    def write(self, frame: Frame):
+        """Queue one frame (blocks only when max_pending frames are waiting)"""
+        if self._error is not None:
+            raise EncoderError(f"ffmpeg stopped accepting frames: {self._error}")
+        rgb = to_rgb_array(frame)
+        height, width = rgb.shape[:2]
+        if self._process is None:
+            self._start(width, height)
+        elif (width, height) != self.size:
+            raise EncoderError(f"Frame size {width}x{height} differs from {self.size[0]}x{self.size[1]}")
+        self._pending.put(rgb.tobytes())
+        self.frames_written += 1
+
+    def close(self) -> Tuple[Optional[str], Optional[str]]:
+        """Flush, wait for ffmpeg and return (mp4_path, gif_path)"""
+        if self._process is None:
+            raise EncoderError("No frames were written")
+        self._pending.put(None)
+        self._writer.join()
+        stderr = self._process.stderr.read().decode(errors="replace")
+        if self._process.wait() != 0 or self._error is not None:
+            raise EncoderError(f"ffmpeg failed: {stderr.strip()[-500:] or self._error}")
+        return self.mp4_path, self.gif_path
+
+    def abort(self):
+        """Stop ffmpeg and remove the unfinished files"""
+        if self._process is not None:
+            self._process.kill()
+            self._pending.put(None)
+            self._writer.join()
+            self._process.wait()
+            for path in (self.mp4_path, self.gif_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def encode_frames(frames: Iterable[Frame], mp4_path: Optional[str] = None, gif_path: Optional[str] = None,
+                  fps: int = 8) -> Tuple[Optional[str], Optional[str]]:
+    """Encode frames (any iterable, e.g. a generator) to MP4 and/or GIF in one pass"""
+    with StreamingEncoder(mp4_path, gif_path, fps=fps) as encoder:
+        for frame in frames:
+            encoder.write(frame)
+    return mp4_path, gif_path
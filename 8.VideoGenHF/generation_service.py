@@ -0,0 +1,316 @@
+"""
+Generation Service - one model-owning worker behind a job queue
+Concurrent UI sessions submit jobs instead of calling the pipeline directly:
+- Jobs run one at a time on a single worker thread (the only thread that touches the model)
+- Lower priority value runs first, FIFO within a priority
+- Identical in-flight requests (same mode, final prompt, negative prompt, seed, config)
+  share one job instead of running twice
+- Per-step progress and cancellation (between diffusion steps)
+- Video frames are streamed to waiting callers as they are decoded (iter_frames)
+- Optional thermal throttling: the worker pauses between steps while the device is hot
+"""
+
+import json
+import queue
+import hashlib
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import (
+    IMAGE_CONFIG, VIDEO_CONFIG, VARIATIONS_CONFIG, INTERPOLATION_CONFIG, CAMERA_MOTIONS, CAMERA_MOTION_CONFIG
+)
+
+# Settings that determine each mode's output (request and cache keys, together
+# with the generator's execution settings - see GenerationService.mode_config)
+MODE_CONFIGS = {
+    "image": IMAGE_CONFIG,
+    "video": {**VIDEO_CONFIG, "interpolation": INTERPOLATION_CONFIG,
+              "camera_motions": CAMERA_MOTIONS, "camera_motion": CAMERA_MOTION_CONFIG},
+    "variations": {**IMAGE_CONFIG, **VARIATIONS_CONFIG},
+}
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+
+class GenerationCancelled(Exception):
+    """Raised inside the denoising loop to stop a cancelled job."""
+
+
+class GenerationJob:
+    """
+    A queued generation, shared by every caller that submitted the same request.
+    Status: queued -> running -> done | failed | cancelled
+    """
+
+    def __init__(self, key: str, mode: str, prompt: str, negative_prompt: Optional[str],
+                 seed: Optional[int], priority: int, camera: Optional[str] = None):
+        self.key = key
+        self.mode = mode
+        self.prompt = prompt
+        self.negative_prompt = negative_prompt
+        self.seed = seed
+        self.camera = camera
+        self.priority = priority
+        self.status = "queued"
+        self.step = 0
+        self.total_steps = MODE_CONFIGS.get(mode, {}).get("num_inference_steps", 0)
+        self.result = None  # (image, seed), (frames, seed) or ((images, contact_sheet, seeds), seed)
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = 1
+        self.cooling_temp = None  # set while the worker is paused for cooling
+        self.frames = []  # video frames decoded so far
+        self._frames_changed = threading.Condition()
+        self._progress_callbacks: List[Callable[["GenerationJob"], None]] = []
+        self._cancel_requested = False
+        self._done = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        """Fraction of denoising steps completed (0-1)."""
+        if self.status == "done":
+            return 1.0
+        return self.step / self.total_steps if self.total_steps else 0.0
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def get(self, timeout: Optional[float] = None):
+        """Wait and return the result; raises the job's error (or GenerationCancelled)."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.key[:8]} still {self.status}")
+        if self.status == "cancelled":
+            raise GenerationCancelled("Generation cancelled")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def iter_frames(self, timeout: Optional[float] = None):
+        """
+        Yield video frames as the worker decodes them, then raise like get()
+        if the job did not succeed. Every subscriber gets every frame.
+        """
+        index = 0
+        while True:
+            with self._frames_changed:
+                if index >= len(self.frames) and not self.done():
+                    self._frames_changed.wait(timeout)
+                frames, finished = self.frames[index:], self.done()
+            for frame in frames:
+                yield frame
+            index += len(frames)
+            if finished and index >= len(self.frames):
+                self.get(0)
+                return
+
+    def cancel(self):
+        """
+        Withdraw one subscriber. The job itself stops (before its next
+        diffusion step) only once every caller that shares it has cancelled.
+        """
+        with _service_lock:
+            self.subscribers = max(0, self.subscribers - 1)
+            if self.subscribers == 0 and not self.done():
+                self._cancel_requested = True
+
+    def _on_step(self, step: int, total_steps: int):
+        if self._cancel_requested:
+            raise GenerationCancelled("Generation cancelled")
+        self.step, self.total_steps = step, total_steps
+        for callback in list(self._progress_callbacks):
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"⚠️ Progress callback failed: {e}")
+
+    def _on_cooling(self, temp: float):
+        self.cooling_temp = temp
+
+    def _on_frame(self, frame):
+        if self._cancel_requested:
+            raise GenerationCancelled("Generation cancelled")
+        with self._frames_changed:
+            self.frames.append(frame)
+            self._frames_changed.notify_all()
+
+    def _finish(self, status: str, result=None, error: Optional[BaseException] = None):
+        with self._frames_changed:
+            self.status, self.result, self.error = status, result, error
+            self.finished_at = time.time()
+            self._done.set()
+            self._frames_changed.notify_all()
+
+
+# Guards job sharing and subscriber counts across submitting threads
+_service_lock = threading.Lock()
+
+
+def request_key(mode: str, prompt: str, negative_prompt: Optional[str], seed: Optional[int],
+                camera: Optional[str] = None, config: Optional[dict] = None) -> str:
+    """Coalescing key: everything that determines the output (config defaults to MODE_CONFIGS[mode])."""
+    payload = json.dumps(
+        [mode, prompt, negative_prompt, seed, camera, MODE_CONFIGS.get(mode) if config is None else config],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class GenerationService:
+    """
+    Single-worker job queue in front of a generator.
+    The generator must provide generate_<mode>(prompt, negative_prompt=..., seed=..., on_step=...)
+    (generate_video also on_frame=... and camera=...) returning (output, seed), like VintageGenerator - a stub works for CPU testing.
+    """
+
+    def __init__(self, generator_factory: Callable[[], object], throttle=None):
+        self._generator_factory = generator_factory
+        # Called before every step; blocks while too hot (telemetry.ThermalThrottle)
+        self._throttle = throttle
+        self._generator = None
+        self._generator_lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._in_flight: Dict[str, GenerationJob] = {}
+        self._worker = None
+        self.current_job: Optional[GenerationJob] = None
+
+    @property
+    def generator(self):
+        """The generator, created on first use (constructing it does not load any model)"""
+        with self._generator_lock:
+            if self._generator is None:
+                self._generator = self._generator_factory()
+            return self._generator
+
+    def mode_config(self, mode: str) -> dict:
+        """
+        MODE_CONFIGS[mode] plus the generator's execution settings (CPU profile,
+        few-step sampling), for request and cache keys.
+        """
+        execution_config = getattr(self.generator, "execution_config", None)
+        return {**MODE_CONFIGS[mode], **(execution_config() if execution_config else {})}
+
+    def submit(
+        self,
+        mode: str,
+        prompt: str,
+        negative_prompt: Optional[str] = None,
+        seed: Optional[int] = None,
+        priority: int = PRIORITY_NORMAL,
+        on_progress: Optional[Callable[[GenerationJob], None]] = None,
+        camera: Optional[str] = None
+    ) -> GenerationJob:
+        """
+        Queue a generation. Returns the existing job when an identical request
+        is already queued or running. Random-seed requests (seed=None) are never shared.
+        on_progress(job) runs on the worker thread after every step.
+        camera (a CAMERA_STYLES key) drives the motion of the image-based video fallback.
+        """
+        if mode not in MODE_CONFIGS:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {', '.join(MODE_CONFIGS)}")
+        key = request_key(mode, prompt, negative_prompt, seed, camera, self.mode_config(mode))
+
+        with _service_lock:
+            job = self._in_flight.get(key) if seed is not None else None
+            if job is not None and not job._cancel_requested:
+                job.subscribers += 1
+                # A waiting higher-priority caller cannot reorder the queue entry;
+                # the shared job keeps its original position
+            else:
+                job = GenerationJob(key, mode, prompt, negative_prompt, seed, priority, camera)
+                if seed is not None:
+                    self._in_flight[key] = job
+                self._queue.put((priority, next(self._order), job))
+            if on_progress is not None:
+                job._progress_callbacks.append(on_progress)
+            self._ensure_worker()
+        return job
+
+    def queue_position(self, job: GenerationJob) -> int:
+        """Jobs ahead of this one (0 = running or next)."""
+        if job.status != "queued":
+            return 0
+        with self._queue.mutex:
+            entries = [entry for entry in self._queue.queue if not entry[2]._cancel_requested]
+        mine = next((entry for entry in entries if entry[2] is job), None)
+        return sum(entry < mine for entry in entries) if mine else 0
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="generation-worker", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                self._execute(job)
+            finally:
+                with _service_lock:
+                    if self._in_flight.get(job.key) is job:
+                        del self._in_flight[job.key]
+                self._queue.task_done()
+
+    def _step_hook(self, job: GenerationJob) -> Callable[[int, int], None]:
+        if self._throttle is None:
+            return job._on_step
+
+        def on_step(step: int, total_steps: int):
+            # Pausing between steps keeps the scheduler state intact
+            self._throttle(should_stop=lambda: job._cancel_requested, on_cooling=job._on_cooling)
+            job.cooling_temp = None
+            job._on_step(step, total_steps)
+
+        return on_step
+
+    def _execute(self, job: GenerationJob):
+        if job._cancel_requested:
+            job._finish("cancelled")
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        self.current_job = job
+        try:
+            generate = getattr(self.generator, f"generate_{job.mode}")
+            # Without a negative prompt the generator's own default applies
+            kwargs = {"negative_prompt": job.negative_prompt} if job.negative_prompt is not None else {}
+            if job.mode == "video":
+                kwargs["on_frame"] = job._on_frame
+                if job.camera is not None:
+                    kwargs["camera"] = job.camera
+            result = generate(job.prompt, seed=job.seed, on_step=self._step_hook(job), **kwargs)
+            job._finish("done", result)
+        except GenerationCancelled:
+            job._finish("cancelled")
+        except Exception as e:
+            print(f"❌ Generation failed: {e}")
+            job._finish("failed", error=e)
+        finally:
+            self.current_job = None
+
+
+# Singleton instance
+_service = None
+
+def get_service() -> GenerationService:
+    """Get or create the service around the shared VintageGenerator"""
+    global _service
+    if _service is None:
+        from generator import get_generator
+        from telemetry import get_throttle
+        _service = GenerationService(get_generator, throttle=get_throttle())
+    return _service
@@ -7,8 +7,10 @@ import torch
 import gc
 import numpy as np
 from PIL import Image
-from typing import List, Optional, Tuple
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import os
+import time
+from contextlib import nullcontext
 
 # Set memory-efficient settings BEFORE importing diffusers
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "max_split_size_mb:128"
@@ -18,13 +20,19 @@ from diffusers import (
     AnimateDiffPipeline,
     MotionAdapter,
     DDIMScheduler,
-    DPMSolverMultistepScheduler
+    DPMSolverMultistepScheduler,
+    LCMScheduler
 )
 from diffusers.utils import export_to_gif, export_to_video
 
 from config import (
-    DEVICE, DTYPE, MODEL_CONFIG, VIDEO_CONFIG, IMAGE_CONFIG
+    DEVICE, DTYPE, MODEL_CONFIG, VIDEO_CONFIG, IMAGE_CONFIG, EMBEDDING_CACHE_CONFIG,
+    VARIATIONS_CONFIG, INTERPOLATION_CONFIG, IMAGE_NEGATIVE_PROMPT, VIDEO_NEGATIVE_PROMPT,
+    CPU_PROFILES, CPU_PROFILE, CPU_NUM_THREADS, FEW_STEP_CONFIG
 )
+from embedding_cache import PromptEmbeddingCache
+from interpolate import FlowInterpolator, output_length
+from camera_motion import animate
 
 
 def clear_memory():
@@ -35,16 +43,83 @@ def clear_memory():
         torch.cuda.synchronize()
 
 
+def step_callback(on_step: Optional[Callable[[int, int], None]], total_steps: int):
+    """
+    Wrap on_step(step, total_steps) as a diffusers callback_on_step_end.
+    on_step may raise to abort the denoising loop (used for cancellation).
+    """
+    if on_step is None:
+        return None
+
+    def callback(pipe, step, timestep, callback_kwargs):
+        on_step(step + 1, total_steps)
+        return callback_kwargs
+
+    return callback
+
+
+def cpu_bf16_supported() -> bool:
+    """True if oneDNN has fast bfloat16 kernels on this CPU (AVX512-BF16 / AMX)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def cpu_threads() -> int:
+    """Intra-op threads for the CPU profile (CPU_NUM_THREADS or every usable core)"""
+    if CPU_NUM_THREADS:
+        return CPU_NUM_THREADS
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def variation_seeds(seed: int, count: int) -> List[int]:
+    """Seeds of a variations request: seed, seed+1, ... (wrapping at 2**32)"""
+    return [(seed + i) % 2**32 for i in range(count)]
+
+
 class VintageGenerator:
     """
     Lightweight generator for RTX 3050 6GB
     Supports both image and video generation
+    
+    Both pipelines share one set of SD 1.5 components (text encoder,
+    tokenizer, VAE): the base is loaded once, the AnimateDiff pipeline is
+    built from it with from_pipe() plus the motion adapter. Switching modes
+    afterwards only changes which pipeline is used - nothing is reloaded.
+    
+    Without a GPU a CPU profile (CPU_PROFILES) replaces the offload/slicing
+    setup: bfloat16 autocast, channels-last UNet/VAE, optional few-step LCM
+    sampling and optional torch.compile.
     """
     
-    def __init__(self):
+    def __init__(self, cpu_profile: Optional[str] = None):
+        # CPU profile settings, None when running on the GPU
+        self.cpu_profile = (cpu_profile or CPU_PROFILE) if DEVICE == "cpu" else None
+        if self.cpu_profile is not None and self.cpu_profile not in CPU_PROFILES:
+            raise ValueError(f"Unknown CPU profile '{self.cpu_profile}', expected one of {', '.join(CPU_PROFILES)}")
+        self.profile = CPU_PROFILES[self.cpu_profile] if self.cpu_profile else None
+        self.few_step = False  # LCM-LoRA fused and LCM scheduler active
         self.image_pipe = None
         self.video_pipe = None
+        self.motion_adapter = None
         self.current_mode = None
+        # Text-encoder outputs, shared by both pipelines (same text encoder)
+        self.embeddings = PromptEmbeddingCache(
+            MODEL_CONFIG["sd_model"],
+            max_entries=EMBEDDING_CACHE_CONFIG["max_entries"],
+            cache_dir=EMBEDDING_CACHE_CONFIG["cache_dir"]
+        )
+        # Load/switch timings in seconds (see get_metrics)
+        self.metrics = {
+            "base_load_s": None,
+            "adapter_load_s": None,
+            "video_build_s": None,
+            "last_switch_s": None,
+            "switches": 0,
+        }
         
     def _get_scheduler(self):
         """Get memory-efficient scheduler"""
@@ -56,16 +131,69 @@ class VintageGenerator:
             steps_offset=1
         )
     
-    def load_image_model(self):
-        """Load SD 1.5 for image generation (smallest SD model)"""
-        if self.current_mode == "image":
+    def _apply_memory_optimizations(self, pipe):
+        if self.profile is not None:
+            self._apply_cpu_profile(pipe)
+            return
+        pipe.enable_attention_slicing(1)  # Most aggressive
+        pipe.enable_vae_slicing()
+        pipe.enable_vae_tiling()
+        # Use sequential CPU offload for minimal VRAM
+        pipe.enable_sequential_cpu_offload()
+    
+    def _offload_image_pipe(self):
+        """(Re-)install the image pipeline's offload hooks (GPU only)"""
+        if self.profile is None:
+            self.image_pipe.enable_sequential_cpu_offload()
+    
+    def _apply_cpu_profile(self, pipe):
+        """CPU replacement for the offload setup: no slicing (it only slows a CPU down)"""
+        pipe.to("cpu")
+        if self.profile["channels_last"]:
+            # NHWC convolutions are the fast path in oneDNN
+            pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae.to(memory_format=torch.channels_last)
+        if self.profile["compile"]:
+            # In place, so the UNet keeps its class and can still be shared with from_pipe
+            pipe.unet.compile()
+    
+    def _enable_few_step(self, pipe) -> bool:
+        """Fuse the LCM-LoRA into the UNet and switch to the LCM scheduler; False if unavailable"""
+        try:
+            pipe.load_lora_weights(FEW_STEP_CONFIG["lora"])
+            pipe.fuse_lora()
+            # Keep the fused weights but drop the LoRA layers (a plain UNet for from_pipe)
+            pipe.unload_lora_weights()
+        except Exception as e:
+            print(f"⚠️ Few-step LCM weights unavailable, keeping {type(pipe.scheduler).__name__}: {e}")
+            return False
+        pipe.scheduler = LCMScheduler.from_config(pipe.scheduler.config)
+        return True
+    
+    def _autocast(self):
+        """bfloat16 autocast for CPU profiles that use it (when the CPU supports it)"""
+        if self.profile is not None and self.profile["bf16_autocast"] and cpu_bf16_supported():
+            return torch.autocast("cpu", dtype=torch.bfloat16)
+        return nullcontext()
+    
+    def _sampling(self, config: dict) -> Tuple[int, float]:
+        """(num_inference_steps, guidance_scale) for the active scheduler"""
+        if self.few_step:
+            return FEW_STEP_CONFIG["num_inference_steps"], FEW_STEP_CONFIG["guidance_scale"]
+        return config["num_inference_steps"], config["guidance_scale"]
+    
+    def _load_base(self):
+        """Load the shared SD 1.5 components once (as the image pipeline)"""
+        if self.image_pipe is not None:
             return
-            
-        # Unload any existing model first
-        self.unload()
-        clear_memory()
         
-        print("🔄 Loading image model (SD 1.5)...")
+        clear_memory()
+        print("🔄 Loading base model (SD 1.5)...")
+        start = time.perf_counter()
+        if self.profile is not None:
+            torch.set_num_threads(cpu_threads())
+            print(f"🧮 CPU profile '{self.cpu_profile}' ({torch.get_num_threads()} threads, "
+                  f"bf16 autocast: {self.profile['bf16_autocast'] and cpu_bf16_supported()})")
         
         self.image_pipe = StableDiffusionPipeline.from_pretrained(
             MODEL_CONFIG["sd_model"],
@@ -74,79 +202,127 @@ class VintageGenerator:
             requires_safety_checker=False,
             variant="fp16" if DTYPE == torch.float16 else None
         )
-        
-        # Apply memory optimizations
         self.image_pipe.scheduler = self._get_scheduler()
-        self.image_pipe.enable_attention_slicing(1)  # Most aggressive
-        self.image_pipe.enable_vae_slicing()
-        self.image_pipe.enable_vae_tiling()
+        if self.profile is not None and self.profile["few_step"]:
+            self.few_step = self._enable_few_step(self.image_pipe)
+        self._apply_memory_optimizations(self.image_pipe)
         
-        # Use sequential CPU offload for minimal VRAM
-        self.image_pipe.enable_sequential_cpu_offload()
+        self.metrics["base_load_s"] = round(time.perf_counter() - start, 2)
+        print(f"✅ Base model ready! ({self.metrics['base_load_s']}s)")
+        
+        if EMBEDDING_CACHE_CONFIG["precompute"]:
+            self._precompute_embeddings()
+    
+    def _precompute_embeddings(self):
+        """Encode presets (every era x camera style) and the standard negative prompts"""
+        from utils import standard_prompts
+        
+        start = time.perf_counter()
+        texts = [IMAGE_NEGATIVE_PROMPT, VIDEO_NEGATIVE_PROMPT, *standard_prompts()]
+        encoded = self.embeddings.warm(self.image_pipe, texts)
+        print(f"✅ Prompt embeddings ready ({len(texts)} prompts, {encoded} encoded, "
+              f"{time.perf_counter() - start:.1f}s)")
+    
+    def _build_video_pipe(self):
+        """AnimateDiff pipeline on top of the already loaded SD 1.5 components"""
+        if self.motion_adapter is None:
+            start = time.perf_counter()
+            self.motion_adapter = MotionAdapter.from_pretrained(
+                MODEL_CONFIG["motion_module"],
+                torch_dtype=DTYPE
+            )
+            self.metrics["adapter_load_s"] = round(time.perf_counter() - start, 2)
+        
+        start = time.perf_counter()
+        # Sequential offload keeps weights on the meta device behind hooks;
+        # removing the hooks puts the real weights back so they can be shared
+        self.image_pipe.remove_all_hooks()
+        self.video_pipe = AnimateDiffPipeline.from_pipe(self.image_pipe, motion_adapter=self.motion_adapter)
+        self.video_pipe.scheduler = DDIMScheduler.from_pretrained(
+            MODEL_CONFIG["sd_model"],
+            subfolder="scheduler",
+            clip_sample=False,
+            timestep_spacing="linspace",
+            beta_schedule="linear",
+            steps_offset=1,
+        )
+        if self.few_step:
+            # The LCM-LoRA is already fused into the shared UNet weights
+            self.video_pipe.scheduler = LCMScheduler.from_config(self.video_pipe.scheduler.config)
+        self._apply_memory_optimizations(self.video_pipe)
+        # Re-hook the image pipeline (its UNet and the shared components)
+        self._offload_image_pipe()
+        self.metrics["video_build_s"] = round(time.perf_counter() - start, 2)
+    
+    def _switch(self, mode: str):
+        if self.current_mode != mode:
+            self.metrics["switches"] += 1
+        self.current_mode = mode
+    
+    def load_image_model(self):
+        """Load SD 1.5 for image generation (smallest SD model)"""
+        if self.current_mode == "image":
+            return
         
-        self.current_mode = "image"
+        start = time.perf_counter()
+        self._load_base()
+        self._switch("image")
+        self.metrics["last_switch_s"] = round(time.perf_counter() - start, 3)
         print("✅ Image model ready!")
         
     def load_video_model(self):
         """Load AnimateDiff for video generation"""
         if self.current_mode == "video":
             return
-            
-        # Unload any existing model first
-        self.unload()
-        clear_memory()
-        
-        print("🔄 Loading video model (AnimateDiff)...")
         
+        start = time.perf_counter()
         try:
-            # Load motion adapter
-            adapter = MotionAdapter.from_pretrained(
-                MODEL_CONFIG["motion_module"],
-                torch_dtype=DTYPE
-            )
+            self._load_base()
+            if self.video_pipe is None:
+                print("🔄 Building video model (AnimateDiff on shared SD 1.5)...")
+                self._build_video_pipe()
             
-            # Load AnimateDiff pipeline
-            self.video_pipe = AnimateDiffPipeline.from_pretrained(
-                MODEL_CONFIG["sd_model"],
-                motion_adapter=adapter,
-                torch_dtype=DTYPE,
-                safety_checker=None,
-                requires_safety_checker=False
-            )
-            
-            # Apply aggressive memory optimizations
-            self.video_pipe.scheduler = DDIMScheduler.from_pretrained(
-                MODEL_CONFIG["sd_model"],
-                subfolder="scheduler",
-                clip_sample=False,
-                timestep_spacing="linspace",
-                beta_schedule="linear",
-                steps_offset=1,
-            )
-            
-            self.video_pipe.enable_attention_slicing(1)
-            self.video_pipe.enable_vae_slicing()
-            self.video_pipe.enable_vae_tiling()
-            
-            # Use sequential CPU offload
-            self.video_pipe.enable_sequential_cpu_offload()
-            
-            self.current_mode = "video"
+            self._switch("video")
+            self.metrics["last_switch_s"] = round(time.perf_counter() - start, 3)
             print("✅ Video model ready!")
             
         except Exception as e:
             print(f"⚠️ Could not load video model: {e}")
             print("📝 Falling back to image-based animation...")
+            self.video_pipe = None
+            if self.image_pipe is not None:
+                # A failed from_pipe can leave the image pipeline unhooked
+                self._offload_image_pipe()
             self.load_image_model()
             self.current_mode = "image_fallback"
     
+    def execution_config(self) -> dict:
+        """
+        Execution settings that change the output, for request and cache keys.
+        Before the models load, few_step is what the profile asks for.
+        """
+        if self.profile is None:
+            return {"cpu_profile": None, "few_step": False}
+        few_step = self.few_step if self.image_pipe is not None else self.profile["few_step"]
+        config = {"cpu_profile": self.cpu_profile, "few_step": few_step}
+        if few_step:
+            config["few_step_config"] = FEW_STEP_CONFIG
+        return config
+    
+    def get_metrics(self) -> dict:
+        """Model load and mode switch timings"""
+        return dict(self.metrics, current_mode=self.current_mode,
+                    video_loaded=self.video_pipe is not None,
+                    cpu_profile=self.cpu_profile, few_step=self.few_step)
+    
     def generate_image(
         self,
         prompt: str,
-        negative_prompt: str = "blurry, low quality, distorted, ugly",
-        seed: Optional[int] = None
+        negative_prompt: str = IMAGE_NEGATIVE_PROMPT,
+        seed: Optional[int] = None,
+        on_step: Optional[Callable[[int, int], None]] = None
     ) -> Tuple[Image.Image, int]:
-        """Generate a single image"""
+        """Generate a single image (on_step(step, total) is called after each denoising step)"""
         self.load_image_model()
         clear_memory()
         
@@ -154,18 +330,21 @@ class VintageGenerator:
             seed = torch.randint(0, 2**32, (1,)).item()
         
         generator = torch.Generator(device="cpu").manual_seed(seed)
+        steps, guidance_scale = self._sampling(IMAGE_CONFIG)
         
         print(f"🎨 Generating image (seed: {seed})...")
         
-        with torch.inference_mode():
+        with torch.inference_mode(), self._autocast():
+            prompt_embeds, negative_prompt_embeds = self.embeddings.get_pair(self.image_pipe, prompt, negative_prompt)
             result = self.image_pipe(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
+                prompt_embeds=prompt_embeds,
+                negative_prompt_embeds=negative_prompt_embeds,
                 height=IMAGE_CONFIG["height"],
                 width=IMAGE_CONFIG["width"],
-                num_inference_steps=IMAGE_CONFIG["num_inference_steps"],
-                guidance_scale=IMAGE_CONFIG["guidance_scale"],
-                generator=generator
+                num_inference_steps=steps,
+                guidance_scale=guidance_scale,
+                generator=generator,
+                callback_on_step_end=step_callback(on_step, steps)
             )
         
         image = result.images[0]
@@ -174,13 +353,107 @@ class VintageGenerator:
         print("✅ Image generated!")
         return image, seed
     
+    def variation_batch_size(self, count: int, height: int = IMAGE_CONFIG["height"],
+                             width: int = IMAGE_CONFIG["width"]) -> int:
+        """Images per denoising pass that fit the memory budget (at least 1)"""
+        per_sample = VARIATIONS_CONFIG["mb_per_sample"] * (height * width) / (512 * 512)
+        budget = VARIATIONS_CONFIG["memory_budget_mb"]
+        if budget is None and torch.cuda.is_available():
+            free, _ = torch.cuda.mem_get_info()
+            budget = free / 2**20 - VARIATIONS_CONFIG["reserve_mb"]
+        fits = VARIATIONS_CONFIG["max_batch_size"] if budget is None else int(budget // per_sample)
+        return max(1, min(count, VARIATIONS_CONFIG["max_batch_size"], fits))
+    
+    def generate_variations(
+        self,
+        prompt: str,
+        negative_prompt: str = IMAGE_NEGATIVE_PROMPT,
+        seed: Optional[int] = None,
+        count: int = VARIATIONS_CONFIG["count"],
+        on_step: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[Tuple[List[Image.Image], Image.Image, List[int]], int]:
+        """
+        Generate count images of one prompt (seeds seed, seed+1, ...) in batched passes.
+        Returns ((images, contact_sheet, seeds), seed).
+        
+        The prompt is encoded once and every pass runs several seeds, so the
+        offloaded UNet weights are streamed to the GPU once per step for the
+        whole batch instead of once per image. Each sample has its own
+        generator, so a variation is identical to generate_image with its seed.
+        The batch is split into chunks that fit the memory budget, and halved
+        again if a chunk still runs out of memory.
+        """
+        from utils import make_contact_sheet
+        
+        self.load_image_model()
+        clear_memory()
+        
+        if seed is None:
+            seed = torch.randint(0, 2**32, (1,)).item()
+        seeds = variation_seeds(seed, count)
+        steps, guidance_scale = self._sampling(IMAGE_CONFIG)
+        batch_size = self.variation_batch_size(count)
+        
+        print(f"🎨 Generating {count} variations (seeds {seeds[0]}-{seeds[-1]}, batch {batch_size})...")
+        start = time.perf_counter()
+        
+        images = []
+        with torch.inference_mode(), self._autocast():
+            prompt_embeds, negative_prompt_embeds = self.embeddings.get_pair(self.image_pipe, prompt, negative_prompt)
+            while len(images) < count:
+                chunk = seeds[len(images):len(images) + batch_size]
+                
+                chunk_step = None
+                if on_step is not None:
+                    # Progress over all variations: steps done so far, weighted by images
+                    def chunk_step(step, _total, done=len(images), size=len(chunk)):
+                        on_step(done * steps + step * size, count * steps)
+                
+                try:
+                    result = self.image_pipe(
+                        prompt_embeds=prompt_embeds.repeat(len(chunk), 1, 1),
+                        negative_prompt_embeds=negative_prompt_embeds.repeat(len(chunk), 1, 1),
+                        height=IMAGE_CONFIG["height"],
+                        width=IMAGE_CONFIG["width"],
+                        num_inference_steps=steps,
+                        guidance_scale=guidance_scale,
+                        generator=[torch.Generator(device="cpu").manual_seed(s) for s in chunk],
+                        callback_on_step_end=step_callback(chunk_step, steps)
+                    )
+                except torch.cuda.OutOfMemoryError:
+                    if batch_size == 1:
+                        raise
+                    batch_size //= 2
+                    clear_memory()
+                    print(f"⚠️ Out of memory, retrying with batch {batch_size}")
+                    continue
+                
+                images.extend(result.images)
+        
+        contact_sheet = make_contact_sheet(images, [f"seed {s}" for s in seeds])
+        clear_memory()
+        
+        elapsed = time.perf_counter() - start
+        print(f"✅ {count} variations generated! ({elapsed / count:.1f}s per image)")
+        return (images, contact_sheet, seeds), seed
+    
     def generate_video(
         self,
         prompt: str,
-        negative_prompt: str = "blurry, low quality, distorted, static, still",
-        seed: Optional[int] = None
+        negative_prompt: str = VIDEO_NEGATIVE_PROMPT,
+        seed: Optional[int] = None,
+        on_step: Optional[Callable[[int, int], None]] = None,
+        on_frame: Optional[Callable[[Image.Image], None]] = None,
+        camera: str = "Static"
     ) -> Tuple[List[Image.Image], int]:
-        """Generate video frames"""
+        """
+        Generate video frames (on_step(step, total) is called after each denoising step).
+        Only VIDEO_CONFIG["num_frames"] keyframes are diffused; with INTERPOLATION_CONFIG
+        enabled the frames between them are synthesized from optical flow.
+        on_frame(frame) receives every frame as soon as it is ready, so encoding
+        can start while the VAE is still decoding the rest.
+        camera (a CAMERA_STYLES key) sets the motion of the image-based fallback.
+        """
         
         # Try video model first
         if self.current_mode != "image_fallback":
@@ -195,73 +468,85 @@ class VintageGenerator:
             seed = torch.randint(0, 2**32, (1,)).item()
         
         generator = torch.Generator(device="cpu").manual_seed(seed)
+        steps, guidance_scale = self._sampling(VIDEO_CONFIG)
         
         if self.current_mode == "video" and self.video_pipe is not None:
             # Use AnimateDiff
             print(f"🎬 Generating video (seed: {seed})...")
             
-            with torch.inference_mode():
+            with torch.inference_mode(), self._autocast():
+                prompt_embeds, negative_prompt_embeds = self.embeddings.get_pair(self.video_pipe, prompt, negative_prompt)
                 result = self.video_pipe(
-                    prompt=prompt,
-                    negative_prompt=negative_prompt,
+                    prompt_embeds=prompt_embeds,
+                    negative_prompt_embeds=negative_prompt_embeds,
                     num_frames=VIDEO_CONFIG["num_frames"],
                     height=VIDEO_CONFIG["height"],
                     width=VIDEO_CONFIG["width"],
-                    num_inference_steps=VIDEO_CONFIG["num_inference_steps"],
-                    guidance_scale=VIDEO_CONFIG["guidance_scale"],
-                    generator=generator
+                    num_inference_steps=steps,
+                    guidance_scale=guidance_scale,
+                    generator=generator,
+                    callback_on_step_end=step_callback(on_step, steps),
+                    output_type="latent"  # decoded below, one frame at a time
                 )
-            
-            frames = result.frames[0]  # List of PIL Images
+                
+                frames = []
+                for frame in self._interpolate(self._decode_frames(self.video_pipe, result.frames)):
+                    frames.append(frame)
+                    if on_frame is not None:
+                        on_frame(frame)
             
         else:
             # Fallback: Generate single image, create simple animation
             print(f"🎨 Generating animated image (seed: {seed})...")
-            self.load_image_model()
+            self._load_base()
             
-            with torch.inference_mode():
+            with torch.inference_mode(), self._autocast():
+                prompt_embeds, negative_prompt_embeds = self.embeddings.get_pair(self.image_pipe, prompt, negative_prompt)
                 result = self.image_pipe(
-                    prompt=prompt,
-                    negative_prompt=negative_prompt,
+                    prompt_embeds=prompt_embeds,
+                    negative_prompt_embeds=negative_prompt_embeds,
                     height=VIDEO_CONFIG["height"],
                     width=VIDEO_CONFIG["width"],
-                    num_inference_steps=VIDEO_CONFIG["num_inference_steps"],
-                    guidance_scale=VIDEO_CONFIG["guidance_scale"],
-                    generator=generator
+                    num_inference_steps=steps,
+                    guidance_scale=guidance_scale,
+                    generator=generator,
+                    callback_on_step_end=step_callback(on_step, steps)
                 )
             
             base_image = result.images[0]
             
-            # Create simple zoom/pan animation from single image
-            frames = self._create_animation_from_image(base_image)
+            # Animate the single image with the camera style's zoom/pan, rendered
+            # directly at the interpolated frame count (same length and fps as a real video)
+            num_frames = VIDEO_CONFIG["num_frames"]
+            if INTERPOLATION_CONFIG["enabled"]:
+                num_frames = output_length(num_frames, INTERPOLATION_CONFIG["factor"])
+            frames = [Image.fromarray(frame) for frame in animate(base_image, camera, num_frames)]
+            if on_frame is not None:
+                for frame in frames:
+                    on_frame(frame)
         
         clear_memory()
         print(f"✅ Generated {len(frames)} frames!")
         
         return frames, seed
     
-    def _create_animation_from_image(self, image: Image.Image, num_frames: int = 8) -> List[Image.Image]:
-        """Create simple animation from a single image (fallback)"""
-        frames = []
-        w, h = image.size
-        
-        # Simple zoom effect
-        for i in range(num_frames):
-            # Calculate zoom factor (subtle: 1.0 to 1.1)
-            zoom = 1.0 + (i / num_frames) * 0.1
-            
-            # Calculate crop box for zoom
-            new_w = int(w / zoom)
-            new_h = int(h / zoom)
-            left = (w - new_w) // 2
-            top = (h - new_h) // 2
-            
-            # Crop and resize back
-            cropped = image.crop((left, top, left + new_w, top + new_h))
-            resized = cropped.resize((w, h), Image.Resampling.LANCZOS)
-            frames.append(resized)
-        
-        return frames
+    def _decode_frames(self, pipe, latents: torch.Tensor):
+        """Decode (1, C, F, H, W) video latents with the VAE, yielding one PIL frame at a time"""
+        latents = latents / pipe.vae.config.scaling_factor
+        for index in range(latents.shape[2]):
+            image = pipe.vae.decode(latents[:, :, index]).sample
+            image = (image[0] / 2 + 0.5).clamp(0, 1).permute(1, 2, 0).float().cpu().numpy()
+            yield Image.fromarray((image * 255).round().astype(np.uint8))
+    
+    def _interpolate(self, keyframes: Iterable[Image.Image]) -> Iterator[Image.Image]:
+        """Keyframes plus optical-flow in-betweens (pass-through when interpolation is off)"""
+        if not INTERPOLATION_CONFIG["enabled"] or INTERPOLATION_CONFIG["factor"] <= 1:
+            yield from keyframes
+            return
+        interpolator = FlowInterpolator(INTERPOLATION_CONFIG["factor"], INTERPOLATION_CONFIG["method"])
+        for keyframe in keyframes:
+            for frame in interpolator.push(keyframe):
+                yield Image.fromarray(frame)
     
     def unload(self):
         """Unload all models to free memory"""
@@ -272,7 +557,8 @@ class VintageGenerator:
         if self.video_pipe is not None:
             del self.video_pipe
             self.video_pipe = None
-            
+        
+        self.motion_adapter = None
         self.current_mode = None
         clear_memory()
         print("✅ Models unloaded")
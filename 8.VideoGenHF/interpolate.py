@@ -0,0 +1,122 @@
+"""
+Frame Interpolation - smooth in-between frames from optical flow
+Diffusion cost grows with every frame, so only keyframes are diffused and
+the frames between them are synthesized:
+- Dense flow in both directions per keyframe pair (OpenCV DIS or Farneback)
+- Every in-between of a pair is built at once: the sampling maps for all
+  time steps are one (K, H, W, 2) array, the blend is one NumPy operation
+- Streaming (FlowInterpolator.push) or whole stacks (interpolate_frames),
+  written into a preallocated (T, H, W, 3) uint8 array
+"""
+
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+
+from encoder import to_rgb_array
+
+
+def output_length(num_keyframes: int, factor: int) -> int:
+    """Frames after interpolation: factor - 1 new frames between each keyframe pair"""
+    return (num_keyframes - 1) * factor + 1 if num_keyframes else 0
+
+
+class FlowInterpolator:
+    """
+    Inserts factor - 1 frames between consecutive frames pushed into it.
+
+        interpolator = FlowInterpolator(factor=4)
+        for keyframe in keyframes:
+            for frame in interpolator.push(keyframe):
+                ...
+    """
+
+    def __init__(self, factor: int = 4, method: str = "dis"):
+        if factor < 1:
+            raise ValueError("Interpolation factor must be at least 1")
+        if method not in ("dis", "farneback"):
+            raise ValueError(f"Unknown optical flow method '{method}', expected 'dis' or 'farneback'")
+        self.factor = factor
+        self.method = method
+        # Time of each in-between frame, shaped to broadcast over (K, H, W, C)
+        self._t = (np.arange(1, factor, dtype=np.float32) / factor)[:, None, None, None]
+        self._dis = cv2.DISOpticalFlow_create(cv2.DISOPTICAL_FLOW_PRESET_MEDIUM) if method == "dis" else None
+        self._grid = None
+        self._previous = None
+        self._previous_gray = None
+
+    def flow(self, gray0: np.ndarray, gray1: np.ndarray) -> np.ndarray:
+        """Dense (H, W, 2) flow from gray0 to gray1"""
+        if self._dis is not None:
+            return self._dis.calc(gray0, gray1, None)
+        return cv2.calcOpticalFlowFarneback(gray0, gray1, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+
+    def between(self, frame0: np.ndarray, frame1: np.ndarray, gray0: Optional[np.ndarray] = None,
+                gray1: Optional[np.ndarray] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """The factor - 1 frames between two RGB uint8 frames, as a (K, H, W, 3) stack"""
+        height, width = frame0.shape[:2]
+        if gray0 is None:
+            gray0 = cv2.cvtColor(frame0, cv2.COLOR_RGB2GRAY)
+        if gray1 is None:
+            gray1 = cv2.cvtColor(frame1, cv2.COLOR_RGB2GRAY)
+        if out is None:
+            out = np.empty((self.factor - 1, height, width, 3), dtype=np.uint8)
+        if self.factor == 1:
+            return out
+
+        if self._grid is None or self._grid.shape[:2] != (height, width):
+            xs, ys = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+            self._grid = np.stack([xs, ys], axis=-1)
+
+        flow01 = self.flow(gray0, gray1)
+        flow10 = self.flow(gray1, gray0)
+        # Backward warping for every time step at once: the frame at t samples
+        # frame0 at x - t * F01(x) and frame1 at x - (1 - t) * F10(x)
+        t = self._t
+        maps0 = self._grid - t * flow01
+        maps1 = self._grid - (1 - t) * flow10
+
+        warped0 = np.empty(out.shape, dtype=np.uint8)
+        warped1 = np.empty(out.shape, dtype=np.uint8)
+        for k in range(self.factor - 1):
+            cv2.remap(frame0, maps0[k], None, cv2.INTER_LINEAR, dst=warped0[k], borderMode=cv2.BORDER_REPLICATE)
+            cv2.remap(frame1, maps1[k], None, cv2.INTER_LINEAR, dst=warped1[k], borderMode=cv2.BORDER_REPLICATE)
+
+        blended = (1 - t) * warped0 + t * warped1
+        np.rint(blended, out=blended)
+        out[...] = blended
+        return out
+
+    def push(self, frame) -> np.ndarray:
+        """
+        Add the next keyframe. Returns the frames it completes: the
+        in-betweens since the previous keyframe followed by the keyframe itself.
+        """
+        frame = to_rgb_array(frame)
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        if self._previous is None:
+            frames = frame[None]
+        else:
+            frames = np.empty((self.factor,) + frame.shape, dtype=np.uint8)
+            self.between(self._previous, frame, self._previous_gray, gray, out=frames[:-1])
+            frames[-1] = frame
+        self._previous, self._previous_gray = frame, gray
+        return frames
+
+
+def interpolate_frames(frames: Iterable, factor: int = 4, method: str = "dis") -> np.ndarray:
+    """Interpolate a whole sequence (PIL images or arrays) into a (T, H, W, 3) uint8 array"""
+    keyframes = [to_rgb_array(frame) for frame in frames]
+    if not keyframes:
+        return np.empty((0, 0, 0, 3), dtype=np.uint8)
+
+    interpolator = FlowInterpolator(factor, method)
+    out = np.empty((output_length(len(keyframes), factor),) + keyframes[0].shape, dtype=np.uint8)
+    grays = [cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) for frame in keyframes]
+    for i, frame in enumerate(keyframes):
+        out[i * factor] = frame
+        if i + 1 < len(keyframes):
+            interpolator.between(frame, keyframes[i + 1], grays[i], grays[i + 1],
+                                 out=out[i * factor + 1:(i + 1) * factor])
+    return out
@@ -1,13 +1,9 @@
-import imageio
 import os
-from typing import List
+from typing import Iterable
 import numpy as np
 
+from encoder import encode_frames
 
-def frames_to_video(frames: List[np.ndarray], output_path: str, fps: int = 8):
-    imageio.mimsave(
-        output_path,
-        frames,
-        fps=fps,
-        codec="libx264"
-    )
+
+def frames_to_video(frames: Iterable[np.ndarray], output_path: str, fps: int = 8):
+    encode_frames(frames, mp4_path=output_path, fps=fps)
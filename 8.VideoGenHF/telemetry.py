@@ -0,0 +1,337 @@
+"""
+Telemetry - background temperature/utilization sampling
+One daemon thread polls a backend at a fixed rate into a ring buffer, so
+readers never wait on the hardware:
+- Backends: NVML (GPU), nvidia-smi (GPU, without nvidia-ml-py),
+  CPU package sensors from /sys/class/thermal or psutil (CPU hosts), and a fake one for tests
+- latest() / average() read the buffer without blocking
+- ThermalThrottle pauses the generation worker between diffusion steps
+  while the device is too hot (see GenerationService)
+"""
+
+import os
+import glob
+import time
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config import THERMAL_CONFIG
+
+# Every sample is a dict with these keys (None when the backend cannot read it)
+SAMPLE_KEYS = ("time", "name", "temp", "utilization", "memory_used", "memory_total")
+
+# Thermal zone types (/sys/class/thermal/*/type) and psutil sensor chips that
+# measure the CPU package, not the chipset, battery, Wi-Fi or SSD
+CPU_ZONE_TYPES = ("x86_pkg_temp", "cpu-thermal", "cpu_thermal", "tcpu", "soc_thermal")
+CPU_SENSOR_NAMES = ("coretemp", "k10temp", "zenpower", "cpu_thermal", "cpu-thermal")
+
+# A sample this many intervals old means reads are failing or the sampler stopped
+STALE_AFTER_INTERVALS = 3
+
+
+class NvmlBackend:
+    """NVIDIA GPU through NVML (nvidia-ml-py): one handle, microsecond reads"""
+
+    name = "nvml"
+
+    def __init__(self, index: int = 0):
+        import pynvml
+        pynvml.nvmlInit()
+        self._nvml = pynvml
+        self._handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+        device_name = pynvml.nvmlDeviceGetName(self._handle)
+        self.device = device_name.decode() if isinstance(device_name, bytes) else device_name
+
+    def read(self) -> Dict:
+        nvml = self._nvml
+        memory = nvml.nvmlDeviceGetMemoryInfo(self._handle)
+        return {
+            "name": self.device,
+            "temp": float(nvml.nvmlDeviceGetTemperature(self._handle, nvml.NVML_TEMPERATURE_GPU)),
+            "utilization": float(nvml.nvmlDeviceGetUtilizationRates(self._handle).gpu),
+            "memory_used": memory.used / 1024**3,
+            "memory_total": memory.total / 1024**3,
+        }
+
+
+class NvidiaSmiBackend:
+    """NVIDIA GPU through nvidia-smi (one process per sample, on the sampler thread only)"""
+
+    name = "nvidia-smi"
+
+    def __init__(self):
+        self.read()  # Fails here when nvidia-smi is missing
+
+    def read(self) -> Dict:
+        result = subprocess.run(
+            ['nvidia-smi', '--query-gpu=name,temperature.gpu,memory.used,memory.total,utilization.gpu',
+             '--format=csv,noheader,nounits'],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True
+        )
+        parts = result.stdout.strip().splitlines()[0].split(', ')
+        return {
+            "name": parts[0],
+            "temp": float(parts[1]),
+            "memory_used": float(parts[2]) / 1024,  # MiB -> GB
+            "memory_total": float(parts[3]) / 1024,
+            "utilization": float(parts[4]),
+        }
+
+
+def _zone_type(zone: str) -> str:
+    try:
+        with open(os.path.join(zone, "type")) as f:
+            return f.read().strip().lower()
+    except OSError:
+        return ""
+
+
+class CpuBackend:
+    """CPU hosts: hottest CPU package zone in /sys/class/thermal (or psutil sensors), psutil load and memory"""
+
+    name = "cpu"
+
+    def __init__(self):
+        try:
+            import psutil
+            psutil.cpu_percent(None)  # First call only starts the measurement
+        except ImportError:
+            psutil = None
+        self._psutil = psutil
+        self._zones = [os.path.join(zone, "temp") for zone in glob.glob("/sys/class/thermal/thermal_zone*")
+                       if _zone_type(zone) in CPU_ZONE_TYPES]
+        if not self._zones and psutil is None:
+            raise RuntimeError("Neither /sys/class/thermal nor psutil is available")
+
+    def _temperature(self) -> Optional[float]:
+        temps = []
+        for path in self._zones:
+            try:
+                with open(path) as f:
+                    temps.append(int(f.read()) / 1000)  # millidegrees
+            except (OSError, ValueError):
+                continue
+        if not temps and self._psutil is not None and hasattr(self._psutil, "sensors_temperatures"):
+            temps = [entry.current for chip, entries in self._psutil.sensors_temperatures().items()
+                     if chip in CPU_SENSOR_NAMES for entry in entries]
+        return max(temps) if temps else None
+
+    def read(self) -> Dict:
+        sample = {"name": "CPU", "temp": self._temperature(), "utilization": None,
+                  "memory_used": None, "memory_total": None}
+        if self._psutil is not None:
+            memory = self._psutil.virtual_memory()
+            sample.update(
+                utilization=self._psutil.cpu_percent(None),
+                memory_used=(memory.total - memory.available) / 1024**3,
+                memory_total=memory.total / 1024**3,
+            )
+        elif hasattr(os, "getloadavg"):
+            sample["utilization"] = min(100.0, os.getloadavg()[0] / (os.cpu_count() or 1) * 100)
+        return sample
+
+
+class FakeBackend:
+    """Scripted temperatures for tests; the last one repeats"""
+
+    name = "fake"
+
+    def __init__(self, temps: Iterable[float] = (50.0,)):
+        self._temps = list(temps)
+        self._index = 0
+
+    def read(self) -> Dict:
+        temp = self._temps[min(self._index, len(self._temps) - 1)]
+        self._index += 1
+        return {"name": "Fake GPU", "temp": float(temp), "utilization": 0.0,
+                "memory_used": 0.0, "memory_total": 6.0}
+
+
+BACKENDS = {
+    "nvml": NvmlBackend,
+    "nvidia-smi": NvidiaSmiBackend,
+    "cpu": CpuBackend,
+    "fake": FakeBackend,
+}
+
+
+def detect_backend(name: str = "auto"):
+    """The named backend, or for "auto" the first one that works on this host (None if none does)"""
+    names = ["nvml", "nvidia-smi", "cpu"] if name == "auto" else [name]
+    for candidate in names:
+        try:
+            return BACKENDS[candidate]()
+        except Exception as e:
+            if name != "auto":
+                raise
+            last_error = e
+    print(f"⚠️ No telemetry backend available: {last_error}")
+    return None
+
+
+class TelemetrySampler:
+    """Polls a backend every `interval` seconds on a daemon thread into a ring buffer"""
+
+    def __init__(self, backend, interval: float = THERMAL_CONFIG["sample_interval_seconds"],
+                 history: int = THERMAL_CONFIG["history_size"]):
+        self.backend = backend
+        self.interval = interval
+        self._samples = deque(maxlen=history)
+        self._sampled = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = 0
+
+    def start(self) -> "TelemetrySampler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def sample_now(self) -> Optional[Dict]:
+        """Read the backend once and add the sample to the buffer"""
+        try:
+            sample = dict.fromkeys(SAMPLE_KEYS)
+            sample.update(self.backend.read(), time=time.time())
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1:
+                print(f"⚠️ Telemetry read failed ({self.backend.name}): {e}")
+            return None
+        with self._sampled:
+            self._samples.append(sample)
+            self._sampled.notify_all()
+        return sample
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.sample_now()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Most recent sample (None before the first one, or when older than max_age seconds)"""
+        with self._sampled:
+            sample = self._samples[-1] if self._samples else None
+        if sample is not None and max_age is not None and time.time() - sample["time"] > max_age:
+            return None
+        return sample
+
+    def fresh(self) -> Optional[Dict]:
+        """Most recent sample unless it is stale (see STALE_AFTER_INTERVALS)"""
+        return self.latest(max_age=self.interval * STALE_AFTER_INTERVALS)
+
+    def samples(self, window: Optional[float] = None) -> List[Dict]:
+        """Buffered samples, oldest first (only the last `window` seconds if given)"""
+        with self._sampled:
+            samples = list(self._samples)
+        if window is not None:
+            cutoff = time.time() - window
+            samples = [sample for sample in samples if sample["time"] >= cutoff]
+        return samples
+
+    def average(self, key: str = "temp", window: float = THERMAL_CONFIG["average_window_seconds"]) -> Optional[float]:
+        """Mean of one reading over the last `window` seconds (None without data)"""
+        values = [sample[key] for sample in self.samples(window) if sample[key] is not None]
+        return sum(values) / len(values) if values else None
+
+    def wait_for_sample(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until the next sample arrives (or timeout) and return the latest one"""
+        with self._sampled:
+            last = self._samples[-1] if self._samples else None
+            self._sampled.wait_for(lambda: bool(self._samples) and self._samples[-1] is not last, timeout)
+            return self._samples[-1] if self._samples else None
+
+
+class ThermalThrottle:
+    """
+    Step hook for the generation worker: between diffusion steps, pause while
+    the temperature is at or above max_temp until it drops to cool_down_temp.
+    A paused step costs nothing but waiting; the check itself only reads the buffer.
+    Without a fresh reading the throttle never pauses (or stops pausing).
+    Thresholds default to the GPU ones, or the cpu_* ones for the CPU backend.
+    """
+
+    def __init__(self, sampler: TelemetrySampler, max_temp: Optional[float] = None,
+                 cool_down_temp: Optional[float] = None,
+                 max_wait: Optional[float] = THERMAL_CONFIG["max_cooldown_seconds"]):
+        prefix = "cpu_" if sampler.backend.name == "cpu" else ""
+        self.sampler = sampler
+        self.max_temp = THERMAL_CONFIG[f"{prefix}max_temp_celsius"] if max_temp is None else max_temp
+        self.cool_down_temp = THERMAL_CONFIG[f"{prefix}cool_down_temp"] if cool_down_temp is None else cool_down_temp
+        self.max_wait = max_wait
+        self.throttled_seconds = 0.0
+        self.cooling = False
+
+    def temperature(self) -> Optional[float]:
+        sample = self.sampler.fresh()
+        return sample["temp"] if sample else None
+
+    def __call__(self, should_stop: Callable[[], bool] = lambda: False,
+                 on_cooling: Optional[Callable[[float], None]] = None) -> float:
+        """
+        Wait here (only if too hot) until cooled, should_stop() is true or
+        max_wait passes. on_cooling(temp) is called with every new reading
+        while waiting. Returns the seconds spent waiting.
+        """
+        temp = self.temperature()
+        if temp is None or temp < self.max_temp:
+            return 0.0
+
+        print(f"🌡️ Device is hot ({temp:.0f}°C)! Pausing until {self.cool_down_temp}°C...")
+        self.cooling = True
+        start = time.monotonic()
+        try:
+            while temp is not None and temp > self.cool_down_temp and not should_stop():
+                if self.max_wait is not None and time.monotonic() - start >= self.max_wait:
+                    print(f"⚠️ Still {temp:.0f}°C after {self.max_wait:.0f}s, resuming anyway")
+                    break
+                if on_cooling is not None:
+                    on_cooling(temp)
+                self.sampler.wait_for_sample(timeout=self.sampler.interval * 2)
+                temp = self.temperature()
+        finally:
+            self.cooling = False
+            waited = time.monotonic() - start
+            self.throttled_seconds += waited
+        if temp is None:
+            print(f"⚠️ No fresh temperature reading after {waited:.0f}s, resuming")
+        elif temp <= self.cool_down_temp:
+            print(f"✅ Cooled to {temp:.0f}°C after {waited:.0f}s. Resuming...")
+        return waited
+
+
+# Singleton instances
+_sampler = None
+_sampler_detected = False
+_sampler_lock = threading.Lock()
+
+def get_sampler() -> Optional[TelemetrySampler]:
+    """Get or start the shared sampler (None when no backend works on this host)"""
+    global _sampler, _sampler_detected
+    with _sampler_lock:
+        if not _sampler_detected:
+            _sampler_detected = True
+            backend = detect_backend(THERMAL_CONFIG["backend"])
+            if backend is not None:
+                _sampler = TelemetrySampler(backend).start()
+        return _sampler
+
+
+def get_throttle() -> Optional[ThermalThrottle]:
+    """Throttle around the shared sampler (None if monitoring is off or unavailable)"""
+    if not THERMAL_CONFIG["enable_monitoring"]:
+        return None
+    sampler = get_sampler()
+    return ThermalThrottle(sampler) if sampler is not None else None
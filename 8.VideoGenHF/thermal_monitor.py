@@ -1,65 +1,41 @@
 """
 GPU Thermal Monitor - Keeps your laptop safe!
+Readings come from the shared telemetry sampler (see telemetry.py)
 """
 
-import time
-import subprocess
-import re
+from telemetry import get_sampler, ThermalThrottle
+
 
 def get_gpu_temperature() -> float:
-    """Get current GPU temperature using nvidia-smi"""
-    try:
-        result = subprocess.run(
-            ['nvidia-smi', '--query-gpu=temperature.gpu', '--format=csv,noheader,nounits'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        temp = float(result.stdout.strip())
-        return temp
-    except Exception as e:
-        print(f"⚠️ Could not read GPU temp: {e}")
+    """Latest temperature from the background sampler (no subprocess, never blocks)"""
+    sampler = get_sampler()
+    sample = sampler.fresh() if sampler is not None else None
+    if sample is None or sample["temp"] is None:
         return 0.0  # Return 0 if we can't read (assume safe)
+    return sample["temp"]
 
 
 def get_gpu_info() -> dict:
-    """Get GPU information"""
-    try:
-        result = subprocess.run(
-            ['nvidia-smi', '--query-gpu=name,temperature.gpu,memory.used,memory.total,utilization.gpu', 
-             '--format=csv,noheader,nounits'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        parts = result.stdout.strip().split(', ')
-        return {
-            "name": parts[0],
-            "temp": float(parts[1]),
-            "memory_used": float(parts[2]) / 1024,  # Convert to GB
-            "memory_total": float(parts[3]) / 1024,
-            "utilization": float(parts[4])
-        }
-    except Exception as e:
+    """Get GPU information (latest sample)"""
+    sampler = get_sampler()
+    sample = sampler.fresh() if sampler is not None else None
+    if sample is None:
         return {"name": "Unknown", "temp": 0, "memory_used": 0, "memory_total": 6, "utilization": 0}
+    return {key: sample[key] if sample[key] is not None else 0 for key in
+            ("name", "temp", "memory_used", "memory_total", "utilization")}
 
 
 def wait_for_cooldown(max_temp: float = 80, target_temp: float = 70):
-    """Wait for GPU to cool down if too hot"""
-    current_temp = get_gpu_temperature()
-    
-    if current_temp >= max_temp:
-        print(f"🌡️ GPU is hot ({current_temp}°C)! Waiting for cooldown...")
-        
-        while current_temp > target_temp:
-            print(f"   Temperature: {current_temp}°C (waiting for {target_temp}°C)")
-            time.sleep(5)
-            current_temp = get_gpu_temperature()
-        
-        print(f"✅ GPU cooled to {current_temp}°C. Resuming...")
-        return True
+    """
+    Wait for GPU to cool down if too hot (woken by new samples instead of polling).
+    Gives up after THERMAL_CONFIG["max_cooldown_seconds"] or when readings stop.
+    """
+    sampler = get_sampler()
+    if sampler is None:
+        return False
     
-    return False
+    throttle = ThermalThrottle(sampler, max_temp=max_temp, cool_down_temp=target_temp)
+    return throttle(on_cooling=lambda temp: print(f"   Temperature: {temp}°C (waiting for {target_temp}°C)")) > 0
 
 
 def is_safe_to_generate(max_temp: float = 80) -> tuple:
@@ -80,6 +56,9 @@ def is_safe_to_generate(max_temp: float = 80) -> tuple:
 
 if __name__ == "__main__":
     # Test the monitor
+    sampler = get_sampler()
+    if sampler is not None:
+        sampler.wait_for_sample(timeout=2)
     print("🖥️ GPU Status:")
     info = get_gpu_info()
     print(f"   GPU: {info['name']}")
@@ -4,11 +4,12 @@ Utility functions for video/image processing and caching
 
 import os
 import hashlib
-from PIL import Image
-from typing import List
+from PIL import Image, ImageDraw
+from typing import Callable, Iterable, List, Optional, Sequence, Union
 import imageio
 
-from config import VIDEO_CONFIG
+from config import VIDEO_CONFIG, INTERPOLATION_CONFIG
+from encoder import EncoderError, encode_frames, to_rgb_array
 
 # Output directories
 OUTPUT_DIR = "outputs"
@@ -35,30 +36,71 @@ def save_image(image: Image.Image, prompt: str, seed: int) -> str:
     return filepath
 
 
-def save_video(frames: List[Image.Image], prompt: str, seed: int) -> tuple:
-    """Save frames as MP4 and GIF"""
+def make_contact_sheet(
+    images: Sequence[Image.Image],
+    labels: Optional[Sequence[str]] = None,
+    columns: Optional[int] = None,
+    thumb_size: int = 256,
+    padding: int = 8
+) -> Image.Image:
+    """Grid of thumbnails with an optional caption (e.g. the seed) under each"""
+    columns = columns or min(len(images), 4)
+    rows = -(-len(images) // columns)
+    label_height = 16 if labels else 0
+    cell_w, cell_h = thumb_size + padding, thumb_size + label_height + padding
+    
+    sheet = Image.new("RGB", (columns * cell_w + padding, rows * cell_h + padding), (26, 26, 46))
+    draw = ImageDraw.Draw(sheet)
+    for index, image in enumerate(images):
+        x = padding + (index % columns) * cell_w
+        y = padding + (index // columns) * cell_h
+        thumb = image.convert("RGB")
+        thumb.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS)
+        sheet.paste(thumb, (x + (thumb_size - thumb.width) // 2, y + (thumb_size - thumb.height) // 2))
+        if labels:
+            draw.text((x, y + thumb_size + 2), str(labels[index]), fill=(232, 213, 183))
+    return sheet
+
+
+def save_variations(images: Sequence[Image.Image], contact_sheet: Image.Image,
+                    prompt: str, seeds: Sequence[int]) -> tuple:
+    """Save each variation (same name as a single image with that seed) and the contact sheet"""
+    paths = [save_image(image, prompt, seed) for image, seed in zip(images, seeds)]
+    sheet_path = os.path.join(IMAGES_DIR, generate_filename(prompt, f"{seeds[0]}x{len(seeds)}", "png"))
+    contact_sheet.save(sheet_path, "PNG")
+    return paths, sheet_path
+
+
+def save_video(frames: Union[Sequence[Image.Image], Callable[[], Iterable[Image.Image]]],
+               prompt: str, seed: int) -> tuple:
+    """
+    Save frames as MP4 and GIF in one ffmpeg pass.
+    frames is a sequence or a callable returning a fresh iterable (e.g.
+    GenerationJob.iter_frames), so encoding starts while later frames are still
+    being decoded and the GIF fallback can replay them without a copy.
+    One-shot iterators are rejected: the fallback could not replay them.
+    Only encoder failures fall back to GIF; errors of the frame source propagate.
+    """
+    if not callable(frames) and iter(frames) is frames:
+        raise TypeError("save_video needs a sequence or a callable returning the frames, not an iterator")
+    
     base_name = generate_filename(prompt, seed, "")
     
     mp4_path = os.path.join(VIDEOS_DIR, base_name + "mp4")
     gif_path = os.path.join(VIDEOS_DIR, base_name + "gif")
     
-    fps = VIDEO_CONFIG["fps"]
-    
-    # Convert PIL Images to numpy arrays
-    frame_arrays = [
-        imageio.core.util.Array(frame.convert("RGB"))
-        for frame in frames
-    ]
+    fps = INTERPOLATION_CONFIG["output_fps"] if INTERPOLATION_CONFIG["enabled"] else VIDEO_CONFIG["fps"]
+    source = frames if callable(frames) else lambda: frames
     
-    # Save MP4
     try:
-        imageio.mimsave(mp4_path, frame_arrays, fps=fps, codec="libx264", quality=8)
-    except Exception as e:
+        encode_frames(source(), mp4_path, gif_path, fps=fps)
+    except EncoderError as e:
         print(f"⚠️ Could not save MP4: {e}")
         mp4_path = None
-    
-    # Save GIF (always works)
-    imageio.mimsave(gif_path, frame_arrays, fps=fps, loop=0)
+        # Save GIF (always works), one frame at a time
+        with imageio.get_writer(gif_path, mode="I", fps=fps, loop=0) as writer:
+            for frame in source():
+                writer.append_data(to_rgb_array(frame))
     
     return mp4_path, gif_path
 
@@ -110,6 +152,18 @@ def validate_prompt(prompt: str) -> tuple:
     return True, "✅ Prompt validated"
 
 
+def standard_prompts() -> List[str]:
+    """Every preset prompt built for every era and camera style"""
+    from config import ERA_DESCRIPTIONS, CAMERA_STYLES, PRESET_PROMPTS
+    
+    return [
+        build_prompt(preset, era, camera)
+        for preset in PRESET_PROMPTS.values()
+        for era in ERA_DESCRIPTIONS
+        for camera in CAMERA_STYLES
+    ]
+
+
 def build_prompt(user_prompt: str, era: str, camera: str) -> str:
     """Build enhanced prompt with context"""
     from config import ERA_DESCRIPTIONS, CAMERA_STYLES, BASE_STYLE
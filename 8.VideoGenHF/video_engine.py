@@ -2,6 +2,8 @@ import torch
 from diffusers import DiffusionPipeline
 import numpy as np
 
+from generator import step_callback
+
 
 class VideoGenerator:
     def __init__(self):
@@ -19,8 +21,31 @@ class VideoGenerator:
         self,
         prompt: str,
         num_frames: int = 16,
-        seed: int = 42
+        seed: int = 42,
+        num_inference_steps: int = 25,
+        negative_prompt: str = None,
+        on_step=None
     ) -> list:
         self.load()
 
-        generator = torch.Generator("cuda").manual_seed_
+        generator = torch.Generator("cuda").manual_seed(seed)
+        with torch.inference_mode():
+            result = self.pipe(
+                prompt,
+                negative_prompt=negative_prompt,
+                num_frames=num_frames,
+                num_inference_steps=num_inference_steps,
+                generator=generator,
+                callback_on_step_end=step_callback(on_step, num_inference_steps)
+            )
+        return [np.asarray(frame) for frame in result.frames[0]]
+
+    def generate_video(self, prompt: str, negative_prompt: str = None, seed: int = None, on_step=None, on_frame=None):
+        """Same interface as VintageGenerator.generate_video (for GenerationService)."""
+        if seed is None:
+            seed = torch.randint(0, 2**32, (1,)).item()
+        frames = self.generate(prompt, seed=seed, negative_prompt=negative_prompt, on_step=on_step)
+        if on_frame is not None:
+            for frame in frames:
+                on_frame(frame)
+        return frames, seed
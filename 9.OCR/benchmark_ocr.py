@@ -0,0 +1,267 @@
+"""
+Offline OCR Benchmark Harness
+==============================
+Runs the Approach 1 pipeline in-process (no server) over a labeled corpus:
+
+    decode -> ImagePreprocessor.preprocess -> Tesseract -> parse_from_raw_text
+
+and writes a JSON report with:
+- per-stage latency percentiles (p50 / p95 / p99, mean)
+- end-to-end throughput at several worker counts
+- memory (peak traced Python allocations, process max RSS)
+- field accuracy against ground truth (AccuracyCalculator, bulk mode)
+
+The corpus is real images from --images whose file names match keys in
+ground_truth.json, or synthetic licences rendered with PIL fonts.
+
+Usage:
+    python benchmark_ocr.py                                  # synthetic corpus
+    python benchmark_ocr.py --copies 5 --workers 1,2,4,8 --output results/bench.json
+    python benchmark_ocr.py --output results/bench_new.json --compare results/bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from ocr_engines import create_traditional_engine, parse_from_raw_text
+from synthetic_licenses import load_labeled_corpus
+from utils import DecodedImage, ImagePreprocessor, calculate_accuracy_bulk
+
+STAGES = ("decode", "preprocess", "recognize", "parse", "total")
+FIELDS = (
+    "name", "date_of_birth", "issued_by", "date_of_issue", "date_of_expiry",
+    "license_number", "address", "blood_group", "vehicle_class"
+)
+
+# Metrics shown by --compare, and whether higher is better
+COMPARE_METRICS = {
+    "stages.total.p50_ms": False,
+    "stages.total.p95_ms": False,
+    "stages.recognize.p50_ms": False,
+    "stages.preprocess.p50_ms": False,
+    "memory.peak_traced_mb": False,
+    "accuracy.overall_similarity": True,
+    "accuracy.overall_cer": False,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def max_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Pipeline:
+    """Approach 1 with each stage timed separately."""
+
+    def __init__(self, backend: str):
+        self.preprocessor = ImagePreprocessor()
+        self.engine = create_traditional_engine(backend)
+
+    def run(self, file_bytes: bytes) -> Dict:
+        timings = {}
+        start = time.perf_counter()
+        image = DecodedImage.from_bytes(file_bytes)
+        timings["decode"] = time.perf_counter()
+
+        preprocessed, original = self.preprocessor.preprocess(image)
+        timings["preprocess"] = time.perf_counter()
+
+        raw_text = self.engine.recognize(original)
+        timings["recognize"] = time.perf_counter()
+
+        fields = parse_from_raw_text(raw_text)
+        timings["parse"] = time.perf_counter()
+
+        previous, latencies = start, {}
+        for stage in STAGES[:-1]:
+            latencies[stage] = (timings[stage] - previous) * 1000
+            previous = timings[stage]
+        latencies["total"] = (previous - start) * 1000
+        return {"fields": fields, "latencies": latencies}
+
+    def close(self):
+        if hasattr(self.engine, "close"):
+            self.engine.close()
+
+
+def measure_latency(pipeline: Pipeline, corpus: list, runs: int):
+    """Sequential passes over the corpus; returns (stage latencies, first-pass fields)."""
+    latencies = {stage: [] for stage in STAGES}
+    predictions = []
+    for run in range(runs):
+        for _, file_bytes, _ in corpus:
+            result = pipeline.run(file_bytes)
+            for stage, value in result["latencies"].items():
+                latencies[stage].append(value)
+            if run == 0:
+                predictions.append(result["fields"])
+    return latencies, predictions
+
+
+def measure_throughput(pipeline: Pipeline, corpus: list, runs: int, workers: int) -> float:
+    batch = [file_bytes for _, file_bytes, _ in corpus] * runs
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(pipeline.run, batch))
+    return len(batch) / (time.perf_counter() - start)
+
+
+def score(corpus: list, predictions: List[Dict]) -> Dict:
+    results = calculate_accuracy_bulk(
+        [(prediction, truth) for prediction, (_, _, truth) in zip(predictions, corpus)]
+    )
+    per_field = {}
+    for field in FIELDS:
+        scores = [r["per_field"][field]["similarity"] for r in results
+                  if field in r["per_field"] and r["per_field"][field]["ground_truth"]]
+        if scores:
+            per_field[field] = round(statistics.mean(scores), 4)
+    return {
+        "overall_similarity": round(statistics.mean(r["overall_similarity"] for r in results), 4),
+        "overall_cer": round(statistics.mean(r["overall_cer"] for r in results), 4),
+        "per_field_similarity": per_field,
+    }
+
+
+def run_benchmark(args) -> Dict:
+    corpus, source = load_labeled_corpus(args.images, args.ground_truth, synthetic_copies=args.copies)
+    pipeline = Pipeline(args.backend)
+
+    # Warm-up: model load / handle creation, and fail early without Tesseract
+    pipeline.run(corpus[0][1])
+
+    tracemalloc.start()
+    latencies, predictions = measure_latency(pipeline, corpus, args.runs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    throughput = {}
+    for workers in args.workers:
+        throughput[str(workers)] = round(measure_throughput(pipeline, corpus, args.runs, workers), 3)
+    pipeline.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "backend": args.backend,
+            "source": source,
+            "images": len(corpus),
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": {stage: summarize(values) for stage, values in latencies.items()},
+        "throughput_ips": throughput,
+        "memory": {
+            "peak_traced_mb": round(peak / (1024 * 1024), 2),
+            "max_rss_mb": max_rss_mb(),
+        },
+        "accuracy": score(corpus, predictions),
+    }
+
+
+def lookup(report: Dict, dotted: str):
+    value = report
+    for key in dotted.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(current: Dict, previous: Dict):
+    """Print metric changes versus a previous report."""
+    metrics = dict(COMPARE_METRICS)
+    for workers in current.get("throughput_ips", {}):
+        metrics[f"throughput_ips.{workers}"] = True
+
+    print(f"\nCompared with {previous['meta']['timestamp']} ({previous['meta']['backend']}, "
+          f"{previous['meta']['images']} images)")
+    print(f"{'metric':<30} {'before':>10} {'after':>10} {'change':>9}")
+    for metric, higher_is_better in metrics.items():
+        before, after = lookup(previous, metric), lookup(current, metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        better = change > 0 if higher_is_better else change < 0
+        flag = "" if abs(change) < 2 else (" +" if better else " -")
+        print(f"{metric:<30} {before:>10.3f} {after:>10.3f} {change:>8.1f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the traditional OCR pipeline")
+    parser.add_argument("--images", default="samples", help="Directory of labeled licence images")
+    parser.add_argument("--ground-truth", default=os.path.join("samples", "ground_truth.json"))
+    parser.add_argument("--copies", type=int, default=3, help="Synthetic renders per ground-truth entry")
+    parser.add_argument("--backend", default=os.environ.get("TESSERACT_BACKEND", "pytesseract"),
+                        choices=("pytesseract", "tesserocr"))
+    parser.add_argument("--runs", type=int, default=3, help="Passes over the corpus")
+    parser.add_argument("--workers", default="1,2,4",
+                        type=lambda value: [int(w) for w in value.split(",") if w],
+                        help="Comma-separated worker counts for the throughput test")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmark(args)
+    except Exception as e:
+        print(f"Benchmark failed: {e}")
+        sys.exit(1)
+
+    meta = report["meta"]
+    print(f"{meta['backend']} | {meta['images']} {meta['source']} images | runs: {meta['runs']}\n")
+    print(f"{'stage':<12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<12} {stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    print("\nThroughput: " + ", ".join(f"{w} workers {ips:.2f} img/s"
+                                       for w, ips in report["throughput_ips"].items()))
+    print(f"Memory: peak traced {report['memory']['peak_traced_mb']} MB, "
+          f"max RSS {report['memory']['max_rss_mb']} MB")
+    accuracy = report["accuracy"]
+    print(f"Accuracy: similarity {accuracy['overall_similarity']:.4f}, CER {accuracy['overall_cer']:.4f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
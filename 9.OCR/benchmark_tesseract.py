@@ -0,0 +1,98 @@
+"""
+Tesseract Backend Benchmark
+============================
+Compares per-image latency of the pytesseract backend (one process per
+image) against the tesserocr backend (persistent API handles).
+
+Usage:
+    python benchmark_tesseract.py                      # synthetic licences
+    python benchmark_tesseract.py --images samples --runs 20 --workers 4
+"""
+
+import os
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from ocr_engines import create_traditional_engine
+from synthetic_licenses import IMAGE_EXTENSIONS, load_ground_truth, render_synthetic_license
+
+
+def load_images(images_dir: str) -> list:
+    """Load images from a directory, or render synthetic ones from ground truth."""
+    images = []
+    if os.path.isdir(images_dir):
+        for name in sorted(os.listdir(images_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                image = cv2.imread(os.path.join(images_dir, name), cv2.IMREAD_COLOR)
+                if image is not None:
+                    images.append(image)
+    if images:
+        return images
+
+    print(f"No images in '{images_dir}', rendering synthetic licences")
+    return [render_synthetic_license(fields) for fields in load_ground_truth().values()]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def benchmark_backend(backend: str, images: list, runs: int, workers: int) -> dict:
+    engine = create_traditional_engine(backend)
+    warmup = engine.extract(None, images[0])  # model load / handle creation
+    if warmup.get("error"):
+        raise RuntimeError(warmup["error"])
+
+    latencies = []
+    for _ in range(runs):
+        for image in images:
+            start = time.perf_counter()
+            engine.extract(None, image)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    batch = images * runs
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda image: engine.extract(None, image), batch))
+    elapsed = time.perf_counter() - start
+
+    if hasattr(engine, "close"):
+        engine.close()
+
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "throughput_ips": len(batch) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Tesseract backends")
+    parser.add_argument("--images", default="samples", help="Directory of licence images")
+    parser.add_argument("--runs", type=int, default=10, help="Passes over the image set")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Threads for the throughput test")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    print(f"Images: {len(images)} | runs: {args.runs} | workers: {args.workers}\n")
+    print(f"{'Backend':<12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>9}")
+
+    for backend in ("pytesseract", "tesserocr"):
+        try:
+            stats = benchmark_backend(backend, images, args.runs, args.workers)
+        except (ImportError, RuntimeError) as e:
+            print(f"{backend:<12} skipped ({e})")
+            continue
+        print(f"{backend:<12} {stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['throughput_ips']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
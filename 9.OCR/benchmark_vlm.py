@@ -0,0 +1,110 @@
+"""
+Florence-2 Quantization Benchmark
+==================================
+CPU load time, per-image latency, peak RSS and field accuracy of the
+Florence-2 engine in float32 versus int8 (dynamic quantization).
+
+Each mode runs in a fresh subprocess so peak RSS is not shared between them.
+
+Usage:
+    python benchmark_vlm.py                    # synthetic licences
+    python benchmark_vlm.py --images samples --runs 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+from benchmark_ocr import max_rss_mb, percentile
+
+MODES = ("fp32", "int8")
+
+
+def run_mode(mode: str, images_dir: str, runs: int) -> dict:
+    """Benchmark one mode in this process and return its stats."""
+    # CPU only - the comparison is about the CPU path
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    from ocr_engines import VLMOCREngine
+    from synthetic_licenses import load_labeled_corpus
+    from utils import DecodedImage, ImagePreprocessor, calculate_accuracy_bulk, format_dl_fields
+
+    corpus, source = load_labeled_corpus(images_dir)
+    preprocessor = ImagePreprocessor()
+    images = [preprocessor.preprocess_for_vlm(DecodedImage.from_bytes(data)) for _, data, _ in corpus]
+    rss_before = max_rss_mb()
+
+    start = time.perf_counter()
+    engine = VLMOCREngine(quantize=(mode == "int8"))
+    load_seconds = time.perf_counter() - start
+    if engine.model == "ERROR":
+        raise RuntimeError("Florence-2 failed to load")
+    if mode == "int8" and not engine.quantized:
+        raise RuntimeError("int8 quantization is not available")
+
+    engine.extract(images[0])  # warm-up
+
+    latencies, predictions = [], []
+    for run in range(runs):
+        for image in images:
+            start = time.perf_counter()
+            fields = engine.extract(image)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if run == 0:
+                predictions.append(format_dl_fields(fields))
+
+    scores = calculate_accuracy_bulk([(p, truth) for p, (_, _, truth) in zip(predictions, corpus)])
+    return {
+        "mode": mode,
+        "source": source,
+        "images": len(images),
+        "load_s": round(load_seconds, 2),
+        "mean_ms": round(statistics.mean(latencies), 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "model_rss_mb": round(max_rss_mb() - rss_before, 1),
+        "peak_rss_mb": max_rss_mb(),
+        "similarity": round(statistics.mean(s["overall_similarity"] for s in scores), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Florence-2 fp32 vs int8 on CPU")
+    parser.add_argument("--images", default="samples", help="Directory of labeled licence images")
+    parser.add_argument("--runs", type=int, default=2, help="Passes over the image set")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)  # child process
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.images, args.runs)))
+        return
+
+    results = []
+    for mode in MODES:
+        print(f"Running {mode}...")
+        child = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--images", args.images, "--runs", str(args.runs)],
+            capture_output=True, text=True
+        )
+        lines = child.stdout.strip().splitlines()
+        try:
+            results.append(json.loads(lines[-1]))
+        except (IndexError, json.JSONDecodeError):
+            print(f"  {mode} failed:\n{child.stderr.strip()[-2000:]}")
+
+    if not results:
+        return
+    print(f"\n{results[0]['images']} {results[0]['source']} images, {args.runs} runs\n")
+    print(f"{'mode':<6} {'load s':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'model MB':>9} {'peak MB':>9} {'similarity':>11}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['load_s']:>7.1f} {r['mean_ms']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['model_rss_mb']:>9.1f} {r['peak_rss_mb']:>9.1f} {r['similarity']:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
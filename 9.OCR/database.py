@@ -3,27 +3,69 @@ Database Module for DL OCR Project
 ====================================
 Handles storage of OCR results in both SQLite and JSON formats.
 Provides persistence and querying of past uploads.
+
+Storage layer:
+- WAL journaling, so readers never block the writer (and vice versa)
+- A small pool of long-lived aiosqlite connections for reads
+- One writer connection on a dedicated thread; inserts are queued
+  (write-behind) and committed in batches - one fsync per batch
+- SQL statements are module constants, so each long-lived connection
+  reuses its cached prepared statements
+- The JSON mirror is an append-only NDJSON log written by the writer
+  thread after each commit (OCR_JSON_MIRROR=ndjson|files|off)
+
+Querying:
+- Keyset pagination on (timestamp, id) - no OFFSET scans
+  (idx_timestamp already ends in the rowid, so it covers the keyset)
+- Summary projection by default; full rows (raw JSON) on demand
+- Large JSON columns are stored zlib-compressed and decoded on read
+- FTS5 trigram index over image names, extracted names and licence numbers
+  (substring search without a table scan; needs SQLite 3.34+)
+- Accuracy statistics are maintained by triggers (all-time totals plus
+  per-day rollups), so /stats never scans ocr_results
 """
 
 import sqlite3
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import zlib
+import base64
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
 import aiosqlite
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Paths
 DB_PATH = "./results/ocr_results.db"
 JSON_RESULTS_DIR = "./results/json"
+NDJSON_LOG_PATH = "./results/results.ndjson"
+
+# Storage settings
+READ_POOL_SIZE = int(os.environ.get("OCR_DB_POOL_SIZE", "4"))
+WRITE_BATCH_SIZE = int(os.environ.get("OCR_DB_BATCH_SIZE", "64"))
+JSON_MIRROR = os.environ.get("OCR_JSON_MIRROR", "ndjson").lower()
+
+_directories_ready = False
 
 
 def ensure_directories():
-    """Ensure required directories exist."""
+    """Ensure required directories exist (checked once per process)."""
+    global _directories_ready
+    if _directories_ready:
+        return
     Path("./results").mkdir(exist_ok=True)
     Path(JSON_RESULTS_DIR).mkdir(exist_ok=True)
     Path("./uploads").mkdir(exist_ok=True)
+    _directories_ready = True
+
+
+def _configure_connection(conn: sqlite3.Connection):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
 
 
 def init_database():
@@ -31,6 +73,7 @@ def init_database():
     ensure_directories()
     
     conn = sqlite3.connect(DB_PATH)
+    _configure_connection(conn)
     cursor = conn.cursor()
     
     # Create main results table
@@ -76,7 +119,12 @@ def init_database():
             -- Metadata
             processing_time_ms INTEGER,
             image_size_bytes INTEGER,
-            error_message TEXT
+            error_message TEXT,
+            
+            -- Re-extraction inputs (see image_store.py / reprocess.py)
+            image_sha256 TEXT,
+            approach1_raw_text TEXT,
+            approach2_raw_text TEXT
         )
     ''')
     
@@ -89,10 +137,485 @@ def init_database():
         CREATE INDEX IF NOT EXISTS idx_image_name ON ocr_results(image_name)
     ''')
     
+    # Full-text index (external content - rows are not duplicated)
+    cursor.execute(CREATE_FTS_TABLE)
+    cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS ocr_results_fts_insert AFTER INSERT ON ocr_results BEGIN
+            INSERT INTO ocr_results_fts(rowid, image_name, approach1_name, approach2_name,
+                                        approach1_license_number, approach2_license_number)
+            VALUES (new.id, new.image_name, new.approach1_name, new.approach2_name,
+                    new.approach1_license_number, new.approach2_license_number);
+        END;
+        CREATE TRIGGER IF NOT EXISTS ocr_results_fts_delete AFTER DELETE ON ocr_results BEGIN
+            INSERT INTO ocr_results_fts(ocr_results_fts, rowid, image_name, approach1_name, approach2_name,
+                                        approach1_license_number, approach2_license_number)
+            VALUES ('delete', old.id, old.image_name, old.approach1_name, old.approach2_name,
+                    old.approach1_license_number, old.approach2_license_number);
+        END;
+    ''')
+    
+    _create_stats_tables(cursor)
+    
+    _migrate(conn)
+    
     conn.commit()
     conn.close()
 
 
+# Aggregates over successful results (error_message IS NULL). Accuracy counts
+# track non-NULL values separately so averages match AVG() semantics.
+STATS_COLUMNS = (
+    'total', 'approach1_count', 'approach1_sum', 'approach2_count', 'approach2_sum',
+    'approach1_wins', 'approach2_wins', 'ties', 'processing_time_count', 'processing_time_sum'
+)
+
+
+def _stats_values(row: str) -> Dict[str, str]:
+    """SQL expression for each counter's contribution from one result row."""
+    return {
+        'total': "1",
+        'approach1_count': f"{row}.approach1_accuracy IS NOT NULL",
+        'approach1_sum': f"IFNULL({row}.approach1_accuracy, 0)",
+        'approach2_count': f"{row}.approach2_accuracy IS NOT NULL",
+        'approach2_sum': f"IFNULL({row}.approach2_accuracy, 0)",
+        'approach1_wins': f"IFNULL({row}.winner LIKE '%Approach 1%', 0)",
+        'approach2_wins': f"IFNULL({row}.winner LIKE '%Approach 2%', 0)",
+        'ties': f"IFNULL({row}.winner = 'Tie', 0)",
+        'processing_time_count': f"{row}.processing_time_ms IS NOT NULL",
+        'processing_time_sum': f"IFNULL({row}.processing_time_ms, 0)",
+    }
+
+
+def _create_stats_tables(cursor: sqlite3.Cursor):
+    """Materialized statistics, kept current by triggers in the insert/delete transaction."""
+    counters = ',\n            '.join(f"{c} REAL NOT NULL DEFAULT 0" for c in STATS_COLUMNS)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS ocr_stats_total (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            {counters}
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS ocr_stats_daily (
+            day TEXT PRIMARY KEY,
+            {counters}
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO ocr_stats_total (id) VALUES (1)')
+    
+    for event, row, sign in (('INSERT', 'new', '+'), ('DELETE', 'old', '-')):
+        updates = ', '.join(f"{c} = {c} {sign} ({expr})" for c, expr in _stats_values(row).items())
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS ocr_stats_{event.lower()} AFTER {event} ON ocr_results
+            WHEN {row}.error_message IS NULL BEGIN
+                UPDATE ocr_stats_total SET {updates} WHERE id = 1;
+                INSERT OR IGNORE INTO ocr_stats_daily (day) VALUES (substr({row}.timestamp, 1, 10));
+                UPDATE ocr_stats_daily SET {updates} WHERE day = substr({row}.timestamp, 1, 10);
+            END;
+        ''')
+
+
+SCHEMA_VERSION = 5
+
+# Columns covered by the full-text index
+FTS_COLUMNS = (
+    'image_name', 'approach1_name', 'approach2_name',
+    'approach1_license_number', 'approach2_license_number'
+)
+
+CREATE_FTS_TABLE = f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS ocr_results_fts USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        content='ocr_results', content_rowid='id', tokenize='trigram'
+    )
+'''
+
+# Columns added after the first release: (name, type)
+ADDED_COLUMNS = (
+    ('image_sha256', 'TEXT'),
+    ('approach1_raw_text', 'TEXT'),
+    ('approach2_raw_text', 'TEXT'),
+)
+
+
+def _migrate(conn: sqlite3.Connection):
+    """One-off upgrades of existing databases, tracked in PRAGMA user_version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    # Columns first: later steps may read them
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(ocr_results)")}
+    for name, column_type in ADDED_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE ocr_results ADD COLUMN {name} {column_type}")
+    
+    if version < 1:
+        # Compress JSON columns of rows written before compression existed,
+        # and index them for full-text search
+        rows = conn.execute(
+            f"SELECT id, {', '.join(COMPRESSED_COLUMNS)} FROM ocr_results"
+        ).fetchall()
+        for row_id, *values in rows:
+            packed = [pack_json_text(v) if isinstance(v, str) else v for v in values]
+            conn.execute(
+                f"UPDATE ocr_results SET {', '.join(f'{c} = ?' for c in COMPRESSED_COLUMNS)} WHERE id = ?",
+                (*packed, row_id)
+            )
+        conn.execute("INSERT INTO ocr_results_fts(ocr_results_fts) VALUES ('rebuild')")
+    
+    if version < 2:
+        # Backfill the materialized statistics from existing rows
+        sums = ', '.join(f"SUM({expr})" for expr in _stats_values('r').values())
+        columns = ', '.join(STATS_COLUMNS)
+        conn.execute('DELETE FROM ocr_stats_daily')
+        conn.execute(f'''
+            INSERT INTO ocr_stats_daily (day, {columns})
+            SELECT substr(r.timestamp, 1, 10), {sums}
+            FROM ocr_results r WHERE r.error_message IS NULL
+            GROUP BY substr(r.timestamp, 1, 10)
+        ''')
+        conn.execute(f'''
+            UPDATE ocr_stats_total SET ({columns}) = (
+                SELECT {', '.join(f'IFNULL(SUM({c}), 0)' for c in STATS_COLUMNS)} FROM ocr_stats_daily
+            ) WHERE id = 1
+        ''')
+    
+    if 1 <= version < 4:
+        # Word-tokenized index -> trigram index (substring search)
+        conn.execute("DROP TABLE IF EXISTS ocr_results_fts")
+        conn.execute(CREATE_FTS_TABLE)
+        conn.execute("INSERT INTO ocr_results_fts(ocr_results_fts) VALUES ('rebuild')")
+    
+    if version < 5:
+        # Re-extraction jobs and their versioned results (see reprocess.py).
+        # IF NOT EXISTS: reprocess.py used to create them itself
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS reprocess_jobs (
+                job_id TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                status TEXT NOT NULL,
+                checkpoint_id INTEGER NOT NULL DEFAULT 0,
+                processed INTEGER NOT NULL DEFAULT 0,
+                skipped INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS ocr_result_versions (
+                result_id INTEGER NOT NULL,
+                version TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                approach1_json BLOB,
+                approach2_json BLOB,
+                approach1_accuracy REAL,
+                approach2_accuracy REAL,
+                winner TEXT,
+                accuracy_details_json BLOB,
+                error_message TEXT,
+                PRIMARY KEY (result_id, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_versions_version ON ocr_result_versions(version);
+        ''')
+    
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+# Large JSON / text columns, stored as zlib-compressed BLOBs
+COMPRESSED_COLUMNS = (
+    'approach1_raw_json', 'approach2_raw_json', 'accuracy_details_json',
+    'approach1_raw_text', 'approach2_raw_text'
+)
+
+# Columns returned by list queries unless full details are requested
+SUMMARY_COLUMNS = (
+    'id', 'image_name', 'timestamp',
+    'approach1_name', 'approach1_license_number', 'approach1_accuracy',
+    'approach2_name', 'approach2_license_number', 'approach2_accuracy',
+    'winner', 'processing_time_ms', 'image_size_bytes', 'error_message'
+)
+
+
+def pack_json_text(text: Optional[str]) -> Optional[bytes]:
+    """Compress a JSON (or raw OCR text) string for storage."""
+    if text is None:
+        return None
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def unpack_row(row) -> Dict:
+    """Row -> dict, decompressing JSON columns back to strings (legacy TEXT passes through)."""
+    result = dict(row)
+    for column in COMPRESSED_COLUMNS:
+        value = result.get(column)
+        if isinstance(value, bytes):
+            result[column] = zlib.decompress(value).decode('utf-8')
+    return result
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque pagination cursor for the position after this row."""
+    return base64.urlsafe_b64encode(f"{row['timestamp']}|{row['id']}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor -> (timestamp, id). Raises ValueError if malformed."""
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return timestamp, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 phrase query ("a.jpeg" -> "a.jpeg").
+    With the trigram tokenizer this is a case-insensitive substring match.
+    """
+    return '"' + text.replace('"', '""') + '"'
+
+
+def like_pattern(text: str) -> str:
+    """LIKE pattern for a substring match (escape character: backslash)."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+class ResultStore:
+    """
+    Long-lived connections to the results database.
+
+    Reads borrow an aiosqlite connection from a pool. All writes run on a
+    single writer thread with its own sqlite3 connection; inserts submitted
+    through insert() are grouped into batches and committed together.
+    """
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = READ_POOL_SIZE, batch_size: int = WRITE_BATCH_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+
+        self._readers = None
+        self._opened = 0
+        self._open_lock = None
+        self._writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-db-writer")
+        self._writer_conn = None
+        self._write_queue = None
+        self._writer_task = None
+        self._ndjson = None
+
+    # ---------- reads ----------
+
+    async def _open_reader(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path)
+        db.row_factory = aiosqlite.Row
+        await db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    @asynccontextmanager
+    async def read(self):
+        """Borrow a pooled read connection."""
+        if self._readers is None:
+            self._readers = asyncio.Queue()
+            self._open_lock = asyncio.Lock()
+        try:
+            db = self._readers.get_nowait()
+        except asyncio.QueueEmpty:
+            async with self._open_lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            db = await self._open_reader() if can_open else await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    # ---------- writes ----------
+
+    def _get_writer_conn(self) -> sqlite3.Connection:
+        # Only ever touched from the single writer thread
+        if self._writer_conn is None:
+            self._writer_conn = sqlite3.connect(self.path, check_same_thread=False)
+            _configure_connection(self._writer_conn)
+        return self._writer_conn
+
+    async def run_write(self, fn: Callable[[sqlite3.Connection], object]):
+        """Run fn(conn) on the writer thread and commit; returns fn's result."""
+        def task():
+            conn = self._get_writer_conn()
+            try:
+                result = fn(conn)
+                conn.commit()
+                return result
+            except Exception:
+                conn.rollback()
+                raise
+        return await asyncio.get_running_loop().run_in_executor(self._writer_pool, task)
+
+    async def insert(self, sql: str, params: tuple, mirror: Optional[Dict] = None) -> int:
+        """
+        Queue an INSERT for the next batch and wait for its commit.
+
+        Args:
+            mirror: Record to append to the JSON mirror once committed
+                    (its "id" is filled in with the new row id)
+
+        Returns:
+            The new row id
+        """
+        if self._write_queue is None:
+            self._write_queue = asyncio.Queue()
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.ensure_future(self._writer_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((sql, params, mirror, future))
+        return await future
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._write_queue.get()
+            if item is None:
+                return
+            batch, stop = [item], False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._write_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                results = await loop.run_in_executor(self._writer_pool, self._write_batch, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (*_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            if stop:
+                return
+
+    def _write_batch(self, batch: list) -> list:
+        """
+        Insert and commit a batch. Returns the row id of each item, or the
+        exception it raised: when the batch transaction fails, every item is
+        retried in its own transaction so one bad row fails only its caller.
+        """
+        conn = self._get_writer_conn()
+        try:
+            results = self._insert(conn, batch)
+        except Exception as e:
+            if len(batch) == 1:
+                return [e]
+            results = []
+            for item in batch:
+                try:
+                    results += self._insert(conn, [item])
+                except Exception as item_error:
+                    results.append(item_error)
+
+        records = []
+        for (_, _, mirror, _), result in zip(batch, results):
+            if mirror is not None and not isinstance(result, Exception):
+                records.append(dict(mirror, id=result))
+        if records:
+            try:
+                self._write_mirror(records)
+            except OSError as e:
+                print(f"Error writing JSON mirror: {e}")
+        return results
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, items: list) -> List[int]:
+        """Run the inserts of `items` in one transaction and return their row ids."""
+        try:
+            ids = [conn.execute(sql, params).lastrowid for sql, params, _, _ in items]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return ids
+
+    def _write_mirror(self, records: List[Dict]):
+        """Append committed results to the JSON mirror (writer thread)."""
+        if JSON_MIRROR == "ndjson":
+            if self._ndjson is None:
+                self._ndjson = open(NDJSON_LOG_PATH, 'a', encoding='utf-8')
+            for record in records:
+                self._ndjson.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._ndjson.flush()
+        elif JSON_MIRROR == "files":
+            for record in records:
+                write_result_json_file(record)
+
+    async def close(self):
+        """Flush queued writes and close every connection."""
+        if self._writer_task is not None:
+            # Sentinel: the writer commits everything queued before it, then exits
+            await self._write_queue.put(None)
+            await self._writer_task
+            self._writer_task = None
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
+            self._opened = 0
+
+        def close_writer():
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+            if self._ndjson is not None:
+                self._ndjson.close()
+                self._ndjson = None
+        await asyncio.get_running_loop().run_in_executor(self._writer_pool, close_writer)
+
+
+_store = None
+
+
+def get_store() -> ResultStore:
+    global _store
+    if _store is None:
+        _store = ResultStore()
+    return _store
+
+
+async def close_database():
+    """Flush pending writes and close connections (call on shutdown)."""
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
+
+
+INSERT_RESULT_SQL = '''
+    INSERT INTO ocr_results (
+        image_name, timestamp,
+        approach1_name, approach1_dob, approach1_issued_by,
+        approach1_doi, approach1_doe, approach1_license_number,
+        approach1_address, approach1_blood_group, approach1_vehicle_class,
+        approach1_raw_json,
+        approach2_name, approach2_dob, approach2_issued_by,
+        approach2_doi, approach2_doe, approach2_license_number,
+        approach2_address, approach2_blood_group, approach2_vehicle_class,
+        approach2_raw_json,
+        approach1_accuracy, approach2_accuracy, winner,
+        accuracy_details_json, ground_truth_json,
+        processing_time_ms, image_size_bytes, error_message,
+        image_sha256, approach1_raw_text, approach2_raw_text
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
 async def save_result_async(
     image_name: str,
     approach1_fields: Dict[str, str],
@@ -101,10 +624,18 @@ async def save_result_async(
     ground_truth: Optional[Dict[str, str]] = None,
     processing_time_ms: int = 0,
     image_size_bytes: int = 0,
-    error_message: Optional[str] = None
+    error_message: Optional[str] = None,
+    image_sha256: Optional[str] = None,
+    raw_texts: Optional[Dict[str, str]] = None
 ) -> int:
     """
     Save OCR result to database asynchronously.
+    The insert is batched with concurrent saves; returns once committed.
+    
+    Args:
+        image_sha256: Key of the upload in the image store, if it was stored
+        raw_texts: Raw OCR text per approach ({"approach1": ..., "approach2": ...}),
+                   kept so results can be re-parsed later
     
     Returns:
         Record ID of the saved result
@@ -113,85 +644,43 @@ async def save_result_async(
     
     timestamp = datetime.now().isoformat()
     
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('''
-            INSERT INTO ocr_results (
-                image_name, timestamp,
-                approach1_name, approach1_dob, approach1_issued_by,
-                approach1_doi, approach1_doe, approach1_license_number,
-                approach1_address, approach1_blood_group, approach1_vehicle_class,
-                approach1_raw_json,
-                approach2_name, approach2_dob, approach2_issued_by,
-                approach2_doi, approach2_doe, approach2_license_number,
-                approach2_address, approach2_blood_group, approach2_vehicle_class,
-                approach2_raw_json,
-                approach1_accuracy, approach2_accuracy, winner,
-                accuracy_details_json, ground_truth_json,
-                processing_time_ms, image_size_bytes, error_message
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            image_name, timestamp,
-            approach1_fields.get('name', ''),
-            approach1_fields.get('date_of_birth', ''),
-            approach1_fields.get('issued_by', ''),
-            approach1_fields.get('date_of_issue', ''),
-            approach1_fields.get('date_of_expiry', ''),
-            approach1_fields.get('license_number', ''),
-            approach1_fields.get('address', ''),
-            approach1_fields.get('blood_group', ''),
-            approach1_fields.get('vehicle_class', ''),
-            json.dumps(approach1_fields),
-            approach2_fields.get('name', ''),
-            approach2_fields.get('date_of_birth', ''),
-            approach2_fields.get('issued_by', ''),
-            approach2_fields.get('date_of_issue', ''),
-            approach2_fields.get('date_of_expiry', ''),
-            approach2_fields.get('license_number', ''),
-            approach2_fields.get('address', ''),
-            approach2_fields.get('blood_group', ''),
-            approach2_fields.get('vehicle_class', ''),
-            json.dumps(approach2_fields),
-            accuracy_result.get('approach1', {}).get('accuracy_percent', 0),
-            accuracy_result.get('approach2', {}).get('accuracy_percent', 0),
-            accuracy_result.get('comparison', {}).get('winner', 'Unknown'),
-            json.dumps(accuracy_result),
-            json.dumps(ground_truth) if ground_truth else None,
-            processing_time_ms,
-            image_size_bytes,
-            error_message
-        ))
-        
-        await db.commit()
-        result_id = cursor.lastrowid
-    
-    # Also save to JSON file
-    await save_result_json(
-        result_id=result_id,
-        image_name=image_name,
-        timestamp=timestamp,
-        approach1_fields=approach1_fields,
-        approach2_fields=approach2_fields,
-        accuracy_result=accuracy_result,
-        ground_truth=ground_truth
+    params = (
+        image_name, timestamp,
+        approach1_fields.get('name', ''),
+        approach1_fields.get('date_of_birth', ''),
+        approach1_fields.get('issued_by', ''),
+        approach1_fields.get('date_of_issue', ''),
+        approach1_fields.get('date_of_expiry', ''),
+        approach1_fields.get('license_number', ''),
+        approach1_fields.get('address', ''),
+        approach1_fields.get('blood_group', ''),
+        approach1_fields.get('vehicle_class', ''),
+        pack_json_text(json.dumps(approach1_fields)),
+        approach2_fields.get('name', ''),
+        approach2_fields.get('date_of_birth', ''),
+        approach2_fields.get('issued_by', ''),
+        approach2_fields.get('date_of_issue', ''),
+        approach2_fields.get('date_of_expiry', ''),
+        approach2_fields.get('license_number', ''),
+        approach2_fields.get('address', ''),
+        approach2_fields.get('blood_group', ''),
+        approach2_fields.get('vehicle_class', ''),
+        pack_json_text(json.dumps(approach2_fields)),
+        accuracy_result.get('approach1', {}).get('accuracy_percent', 0),
+        accuracy_result.get('approach2', {}).get('accuracy_percent', 0),
+        accuracy_result.get('comparison', {}).get('winner', 'Unknown'),
+        pack_json_text(json.dumps(accuracy_result)),
+        json.dumps(ground_truth) if ground_truth else None,
+        processing_time_ms,
+        image_size_bytes,
+        error_message,
+        image_sha256,
+        pack_json_text((raw_texts or {}).get('approach1') or None),
+        pack_json_text((raw_texts or {}).get('approach2') or None)
     )
     
-    return result_id
-
-
-async def save_result_json(
-    result_id: int,
-    image_name: str,
-    timestamp: str,
-    approach1_fields: Dict[str, str],
-    approach2_fields: Dict[str, str],
-    accuracy_result: Dict,
-    ground_truth: Optional[Dict[str, str]] = None
-):
-    """Save result as individual JSON file."""
-    ensure_directories()
-    
-    result = {
-        "id": result_id,
+    # Mirrored to JSON by the writer thread after commit
+    mirror = {
         "image_name": image_name,
         "timestamp": timestamp,
         "approach1": approach1_fields,
@@ -200,51 +689,66 @@ async def save_result_json(
         "ground_truth": ground_truth
     }
     
-    # Create filename with timestamp
-    safe_name = "".join(c for c in image_name if c.isalnum() or c in "._-")
-    filename = f"{result_id}_{safe_name}_{timestamp.replace(':', '-')[:19]}.json"
+    return await get_store().insert(INSERT_RESULT_SQL, params, mirror if JSON_MIRROR != "off" else None)
+
+
+def write_result_json_file(result: Dict):
+    """Save result as individual pretty-printed JSON file (OCR_JSON_MIRROR=files)."""
+    safe_name = "".join(c for c in result["image_name"] if c.isalnum() or c in "._-")
+    filename = f"{result['id']}_{safe_name}_{result['timestamp'].replace(':', '-')[:19]}.json"
     filepath = os.path.join(JSON_RESULTS_DIR, filename)
     
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(result, f, indent=2, ensure_ascii=False)
 
 
-async def get_all_results(limit: int = 100, offset: int = 0) -> List[Dict]:
+async def get_all_results(
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    detail: bool = False
+) -> List[Dict]:
     """
-    Retrieve all OCR results from database.
+    Retrieve OCR results from database, newest first.
     
     Args:
         limit: Maximum number of results to return
-        offset: Number of results to skip
+        offset: Number of results to skip (ignored when a cursor is given)
+        cursor: Value from encode_cursor() of the last row of the previous page
+        detail: Return every column (raw JSON included) instead of the summary
         
     Returns:
         List of result dictionaries
     """
-    ensure_directories()
+    columns = '*' if detail else ', '.join(SUMMARY_COLUMNS)
     
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute('''
-            SELECT * FROM ocr_results
-            ORDER BY timestamp DESC
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor)
+        query = f'''
+            SELECT {columns} FROM ocr_results
+            WHERE (timestamp, id) < (?, ?)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        '''
+        params = (timestamp, last_id, limit)
+    else:
+        query = f'''
+            SELECT {columns} FROM ocr_results
+            ORDER BY timestamp DESC, id DESC
             LIMIT ? OFFSET ?
-        ''', (limit, offset))
-        
-        rows = await cursor.fetchall()
-        
-        results = []
-        for row in rows:
-            results.append(dict(row))
+        '''
+        params = (limit, offset)
+    
+    async with get_store().read() as db:
+        cursor_ = await db.execute(query, params)
+        rows = await cursor_.fetchall()
         
-        return results
+        return [unpack_row(row) for row in rows]
 
 
 async def get_result_by_id(result_id: int) -> Optional[Dict]:
-    """Get a specific result by ID."""
-    ensure_directories()
-    
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Get a specific result by ID (all columns)."""
+    async with get_store().read() as db:
         cursor = await db.execute(
             'SELECT * FROM ocr_results WHERE id = ?',
             (result_id,)
@@ -253,24 +757,34 @@ async def get_result_by_id(result_id: int) -> Optional[Dict]:
         row = await cursor.fetchone()
         
         if row:
-            return dict(row)
+            return unpack_row(row)
         return None
 
 
 async def search_results(
     image_name: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    limit: int = 100,
+    detail: bool = False
 ) -> List[Dict]:
-    """Search results with filters."""
-    ensure_directories()
-    
-    query = "SELECT * FROM ocr_results WHERE 1=1"
+    """
+    Search results with filters.
+    image_name is a substring match against image names, extracted names
+    and licence numbers: through the trigram index, or with LIKE for
+    queries shorter than three characters (too short for a trigram).
+    """
+    columns = '*' if detail else ', '.join(SUMMARY_COLUMNS)
+    query = f"SELECT {columns} FROM ocr_results WHERE 1=1"
     params = []
     
-    if image_name:
-        query += " AND image_name LIKE ?"
-        params.append(f"%{image_name}%")
+    image_name = image_name.strip() if image_name else None
+    if image_name and len(image_name) >= 3:
+        query += " AND id IN (SELECT rowid FROM ocr_results_fts WHERE ocr_results_fts MATCH ?)"
+        params.append(fts_query(image_name))
+    elif image_name:
+        query += " AND (" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in FTS_COLUMNS) + ")"
+        params += [like_pattern(image_name)] * len(FTS_COLUMNS)
     
     if start_date:
         query += " AND timestamp >= ?"
@@ -280,65 +794,71 @@ async def search_results(
         query += " AND timestamp <= ?"
         params.append(end_date)
     
-    query += " ORDER BY timestamp DESC"
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit)
     
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_store().read() as db:
         cursor = await db.execute(query, params)
         rows = await cursor.fetchall()
         
-        return [dict(row) for row in rows]
+        return [unpack_row(row) for row in rows]
 
 
-async def get_accuracy_stats() -> Dict:
-    """Get aggregate accuracy statistics."""
-    ensure_directories()
+def _format_stats(row: Dict) -> Dict:
+    def average(total_key: str, count_key: str) -> float:
+        return round(row[total_key] / row[count_key], 2) if row[count_key] else 0
     
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('''
-            SELECT 
-                COUNT(*) as total_processed,
-                AVG(approach1_accuracy) as avg_approach1,
-                AVG(approach2_accuracy) as avg_approach2,
-                SUM(CASE WHEN winner LIKE '%Approach 1%' THEN 1 ELSE 0 END) as approach1_wins,
-                SUM(CASE WHEN winner LIKE '%Approach 2%' THEN 1 ELSE 0 END) as approach2_wins,
-                SUM(CASE WHEN winner = 'Tie' THEN 1 ELSE 0 END) as ties,
-                AVG(processing_time_ms) as avg_processing_time
-            FROM ocr_results
-            WHERE error_message IS NULL
-        ''')
-        
-        row = await cursor.fetchone()
-        
-        if row:
-            return {
-                "total_processed": row[0] or 0,
-                "average_accuracy": {
-                    "approach1": round(row[1] or 0, 2),
-                    "approach2": round(row[2] or 0, 2)
-                },
-                "wins": {
-                    "approach1": row[3] or 0,
-                    "approach2": row[4] or 0,
-                    "ties": row[5] or 0
-                },
-                "average_processing_time_ms": round(row[6] or 0, 2)
-            }
+    return {
+        "total_processed": int(row['total']),
+        "average_accuracy": {
+            "approach1": average('approach1_sum', 'approach1_count'),
+            "approach2": average('approach2_sum', 'approach2_count')
+        },
+        "wins": {
+            "approach1": int(row['approach1_wins']),
+            "approach2": int(row['approach2_wins']),
+            "ties": int(row['ties'])
+        },
+        "average_processing_time_ms": average('processing_time_sum', 'processing_time_count')
+    }
+
+
+async def get_accuracy_stats(days: Optional[int] = None) -> Dict:
+    """
+    Get aggregate accuracy statistics from the materialized counters.
+    
+    Args:
+        days: Only include the last N calendar days (today included) and
+              add a per-day breakdown for trend charts. None = all time.
+    """
+    columns = ', '.join(STATS_COLUMNS)
+    
+    async with get_store().read() as db:
+        if days is None:
+            cursor = await db.execute(f'SELECT {columns} FROM ocr_stats_total WHERE id = 1')
+            row = await cursor.fetchone()
+            return _format_stats(dict(row) if row else dict.fromkeys(STATS_COLUMNS, 0))
         
-        return {
-            "average_processing_time_ms": 0
-        }
+        since = (datetime.now() - timedelta(days=days - 1)).date().isoformat()
+        cursor = await db.execute(
+            f'SELECT day, {columns} FROM ocr_stats_daily WHERE day >= ? AND total > 0 ORDER BY day',
+            (since,)
+        )
+        rows = [dict(row) for row in await cursor.fetchall()]
+    
+    totals = {c: sum(row[c] for row in rows) for c in STATS_COLUMNS}
+    stats = _format_stats(totals)
+    stats["since"] = since
+    stats["daily"] = [dict(_format_stats(row), day=row['day']) for row in rows]
+    return stats
 
 
 async def delete_result(result_id: int) -> bool:
     """Delete a result by ID."""
-    ensure_directories()
-    
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute('DELETE FROM ocr_results WHERE id = ?', (result_id,))
-            await db.commit()
-            return cursor.rowcount > 0
+        return await get_store().run_write(
+            lambda conn: conn.execute('DELETE FROM ocr_results WHERE id = ?', (result_id,)).rowcount > 0
+        )
     except Exception as e:
         print(f"Error deleting result {result_id}: {e}")
         return False
@@ -0,0 +1,187 @@
+"""
+Execution Layer for the OCR Request Path
+=========================================
+Keeps the FastAPI event loop free while uploads are processed.
+
+- CPU stages (decode, OpenCV preprocessing, Tesseract, JPEG encoding) run in a
+  bounded thread pool. OpenCV releases the GIL and pytesseract waits on a
+  subprocess, so threads give real parallelism here without pickling images.
+- The VLM stage runs in its own single-worker pool: the Florence-2 model is a
+  singleton and is not safe to call from several threads at once.
+- Backpressure: at most ``max_inflight`` uploads are processed at a time.
+  Further uploads wait ``queue_timeout`` seconds for a slot, then get rejected.
+- Per-stage timeouts and cancellation when the client disconnects.
+
+Configuration (environment variables):
+    OCR_CPU_WORKERS       - threads for CPU stages (default: cpu count)
+    OCR_MAX_INFLIGHT      - concurrent uploads (default: 4)
+    OCR_QUEUE_TIMEOUT_S   - seconds to wait for a free slot (default: 10)
+    OCR_STAGE_TIMEOUT_S   - default per-stage timeout (default: 60)
+    OCR_VLM_TIMEOUT_S     - timeout for the VLM stage (default: 180)
+"""
+
+import os
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Stages that run on the dedicated VLM pool
+VLM_STAGES = {"vlm"}
+
+
+class BackpressureError(Exception):
+    """Raised when no processing slot frees up within the queue timeout."""
+
+
+class StageTimeoutError(Exception):
+    """Raised when a pipeline stage exceeds its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client went away before processing finished."""
+
+
+class OCRExecutor:
+    """
+    Runs blocking pipeline stages off the event loop with bounded concurrency.
+    """
+
+    def __init__(
+        self,
+        cpu_workers: Optional[int] = None,
+        max_inflight: int = 4,
+        queue_timeout: float = 10.0,
+        default_timeout: float = 60.0,
+        stage_timeouts: Optional[Dict[str, float]] = None
+    ):
+        self.cpu_workers = cpu_workers or os.cpu_count() or 2
+        self.max_inflight = max_inflight
+        self.queue_timeout = queue_timeout
+        self.default_timeout = default_timeout
+        self.stage_timeouts = stage_timeouts or {}
+
+        self._cpu_pool = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="ocr-cpu")
+        self._vlm_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-vlm")
+        self._slots = None
+        self._inflight = 0
+
+    @classmethod
+    def from_env(cls) -> "OCRExecutor":
+        """Build an executor from OCR_* environment variables."""
+        cpu_workers = int(os.environ.get("OCR_CPU_WORKERS", "0")) or None
+        return cls(
+            cpu_workers=cpu_workers,
+            max_inflight=int(os.environ.get("OCR_MAX_INFLIGHT", "4")),
+            queue_timeout=float(os.environ.get("OCR_QUEUE_TIMEOUT_S", "10")),
+            default_timeout=float(os.environ.get("OCR_STAGE_TIMEOUT_S", "60")),
+            stage_timeouts={"vlm": float(os.environ.get("OCR_VLM_TIMEOUT_S", "180"))}
+        )
+
+    @property
+    def inflight(self) -> int:
+        """Number of uploads currently holding a processing slot."""
+        return self._inflight
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_inflight)
+        return self._slots
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Acquire a processing slot, waiting at most ``queue_timeout`` seconds.
+
+        Raises:
+            BackpressureError: If the server is saturated.
+        """
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise BackpressureError(
+                f"Server busy: {self.max_inflight} uploads already in progress"
+            )
+        self._inflight += 1
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            slots.release()
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` for the given stage in the matching pool.
+
+        The worker thread itself cannot be interrupted, but the awaiting
+        request is released on timeout/cancellation and later stages are
+        never scheduled.
+
+        Raises:
+            StageTimeoutError: If the stage exceeds its timeout.
+        """
+        pool = self._vlm_pool if stage in VLM_STAGES else self._cpu_pool
+        timeout = self.stage_timeouts.get(stage, self.default_timeout)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stage '{stage}' timed out after {timeout}s")
+            raise StageTimeoutError(stage, timeout)
+
+    def shutdown(self):
+        """Stop accepting work and release pool threads."""
+        self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self._vlm_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_until_disconnected(
+    is_disconnected: Callable[[], Awaitable[bool]],
+    coro: Awaitable[Any],
+    poll_interval: float = 0.5
+) -> Any:
+    """
+    Await ``coro`` while polling ``is_disconnected`` (e.g. ``request.is_disconnected``).
+
+    Raises:
+        ClientDisconnectedError: If the client disconnects first; ``coro`` is cancelled.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                raise ClientDisconnectedError("Client disconnected during processing")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+# Singleton instance
+_executor = None
+
+
+def get_executor() -> OCRExecutor:
+    global _executor
+    if _executor is None:
+        _executor = OCRExecutor.from_env()
+    return _executor
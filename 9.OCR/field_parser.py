@@ -0,0 +1,208 @@
+"""
+Licence Field Parser
+=====================
+Turns raw OCR text (from either engine) into licence fields.
+
+One pass of a single compiled tokenizer classifies every interesting token
+with its line number:
+- keyword anchors ("DL No", "DOB", "Valid Till", "Issued By", ...)
+- dates, licence numbers, blood groups
+- all-caps words (consecutive ones on a line form name candidates)
+
+Fields are then assigned from the token list:
+1. Anchored: each anchor owns the text up to the next anchor on its line
+   (or the following line when its own value is empty)
+2. Positional fallback for anything not anchored: dates in order are
+   DOB / issue / expiry (only when no date was anchored), first licence
+   number, first blood group, first name candidate = name, last = issuer
+
+parse_many() parses thousands of stored raw texts (re-scoring history):
+each chunk is joined and tokenized with one regex scan, and chunks can be
+spread over a process pool.
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Keyword anchors: (field, pattern). Order matters when two patterns overlap.
+FIELD_ANCHORS = [
+    ('license_number', r'\b(?:DL|LICEN[CS]E)\s*(?:NO|NUMBER|NUM)\b\.?'),
+    ('date_of_birth', r'\b(?:D\.?O\.?B|DATE\s+OF\s+BIRTH|BIRTH\s+DATE)\b\.?'),
+    # Bare "DOE" is also a surname: it only anchors when a date follows (same or next line)
+    ('date_of_expiry', r'\b(?:VALID\s+(?:TILL|UPTO|UP\s+TO)|VALIDITY|EXPIRY|D\.O\.E'
+                       r'|DOE(?=[ \t:.\-]*\n?[ \t]*\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}))\b\.?'),
+    ('date_of_issue', r'\b(?:D\.?O\.?I|DATE\s+OF\s+ISSUE|ISSUE\s+DATE|ISSUED\s+ON|ISSUE)\b\.?'),
+    ('blood_group', r'\b(?:BG|BLOOD\s+GROUP|BLOOD)\b\.?'),
+    ('vehicle_class', r'\b(?:COV|CLASS\s+OF\s+VEHICLES?|VEHICLE\s+CLASS)\b\.?'),
+    ('issued_by', r'\b(?:ISSUED\s+BY|LICENSING\s+AUTHORITY|AUTHORITY)\b\.?'),
+    ('address', r'\bADDRESS\b\.?'),
+    ('name', r'\bNAME\b\.?'),
+]
+ANCHOR_FIELDS = {field for field, _ in FIELD_ANCHORS}
+
+FIELDS = (
+    'name', 'date_of_birth', 'issued_by', 'date_of_issue', 'date_of_expiry',
+    'license_number', 'address', 'blood_group', 'vehicle_class'
+)
+DATE_FIELDS = ('date_of_birth', 'date_of_issue', 'date_of_expiry')
+
+# Separates documents in a parse_many() chunk
+_DOC_SEPARATOR = '\x00'
+
+
+def _same_line(pattern: str) -> str:
+    # Tokens never span lines, so line breaks can be tracked from newline tokens
+    return pattern.replace(r'\s', r'[ \t]')
+
+
+_ANCHORS = '|'.join(f'(?P<{field}>(?i:{_same_line(pattern)}))' for field, pattern in FIELD_ANCHORS)
+_ANCHOR_LOOKAHEAD = '|'.join(f'(?i:{_same_line(pattern)})' for _, pattern in FIELD_ANCHORS)
+_LICENSE = r'[A-Z]{2}[ \t\-]?[0-9]{2}[ \t\-]?[0-9]{4,}'
+
+# Anchors are case-insensitive, value patterns are not. Alternatives are
+# tried in order, so anchors win over plain caps words. Every token starts at
+# a word boundary: mid-word positions fail on the leading \b alone, instead
+# of trying each alternative. A run of caps words on one line is a single
+# token; the run stops before an anchor, a licence number or a blood group.
+_TOKEN_RE = re.compile(
+    r'(?P<newline>\n)'
+    + f'|(?P<doc>{_DOC_SEPARATOR})'
+    + r'|\b(?:(?=[A-Za-z])(?:'
+    + _ANCHORS
+    + f'|(?P<license>{_LICENSE})'
+    + r'|(?P<blood>[ABO]{1,2}[\+\-])'
+    + r'|(?P<caps>[A-Z]+\b(?:[ \t]+(?!' + _ANCHOR_LOOKAHEAD + '|' + _LICENSE + r')[A-Z]+\b(?![\+\-]))*))'
+    + r'|(?P<date>\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}))'
+)
+
+# Name candidates containing these are card headings, not people
+NAME_STOPWORDS = ('LICENCE', 'DATE', 'BLOOD', 'INDIA', 'TRANSPORT')
+
+VALUE_KINDS = {'license_number': 'license', 'blood_group': 'blood'}
+
+# (kind, start, end) - plain tuples, there are tens per document
+Token = Tuple[str, int, int]
+Document = Tuple[List[List[Token]], List[Tuple[int, int]]]
+
+
+def _tokenize(text: str) -> List[Document]:
+    """
+    Single regex scan over ``text``.
+
+    Returns, for each document in it, the tokens of every line and the
+    (start, end) span of every line.
+    """
+    documents, lines, spans, tokens = [], [], [], []
+    line_start = 0
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == 'newline' or kind == 'doc':
+            lines.append(tokens)
+            spans.append((line_start, start))
+            tokens, line_start = [], end
+            if kind == 'doc':
+                documents.append((lines, spans))
+                lines, spans = [], []
+        else:
+            tokens.append((kind, start, end))
+    lines.append(tokens)
+    spans.append((line_start, len(text)))
+    documents.append((lines, spans))
+    return documents
+
+
+def _value(field: str, text: str, start: int, end: int, tokens: List[Token]) -> str:
+    """Value of an anchored field within text[start:end]."""
+    kind = 'date' if field in DATE_FIELDS else VALUE_KINDS.get(field)
+    if kind is None:
+        return text[start:end].strip(' :-.|,\t\r')
+    for token_kind, token_start, token_end in tokens:
+        if token_kind == kind and start <= token_start and token_end <= end:
+            return text[token_start:token_end].strip()
+    return ''
+
+
+def _name_candidates(text: str, lines: List[List[Token]]) -> List[str]:
+    """Runs of all-caps words that look like a person or an authority."""
+    names = []
+    for tokens in lines:
+        for kind, start, end in tokens:
+            if kind == 'caps' and end - start > 5:
+                name = text[start:end]
+                if not any(word in name for word in NAME_STOPWORDS):
+                    names.append(name)
+    return names
+
+
+def _assign(text: str, document: Document) -> Dict[str, str]:
+    """Fields for one tokenized document of ``text``."""
+    lines, spans = document
+
+    anchored = {}
+    for index, tokens in enumerate(lines):
+        anchors = [token for token in tokens if token[0] in ANCHOR_FIELDS]
+        for i, (field, _, anchor_end) in enumerate(anchors):
+            if field in anchored:
+                continue
+            segment_end = anchors[i + 1][1] if i + 1 < len(anchors) else spans[index][1]
+            value = _value(field, text, anchor_end, segment_end, tokens)
+            if (not value and index + 1 < len(lines)
+                    and not any(token[0] in ANCHOR_FIELDS for token in lines[index + 1])):
+                value = _value(field, text, *spans[index + 1], lines[index + 1])
+            if value:
+                anchored[field] = value
+
+    fields = dict.fromkeys(FIELDS, '')
+    fields['raw_text'] = text[spans[0][0]:spans[-1][1]].strip()
+
+    # Positional fallback, in the order the fields appear on a licence
+    firsts = {}
+    dates = []
+    for tokens in lines:
+        for kind, start, end in tokens:
+            if kind == 'date':
+                dates.append(text[start:end])
+            elif kind not in firsts:
+                firsts[kind] = text[start:end]
+    if not any(field in anchored for field in DATE_FIELDS):
+        fields.update(zip(DATE_FIELDS, dates))
+    for field, kind in VALUE_KINDS.items():
+        fields[field] = firsts.get(kind, '').strip()
+    names = _name_candidates(text, lines)
+    if names:
+        fields['name'] = names[0]
+        if len(names) > 1:
+            fields['issued_by'] = names[-1]  # Last name-like entry might be authority
+
+    fields.update(anchored)
+    return fields
+
+
+def parse_fields(raw_text: str) -> Dict[str, str]:
+    """Parse licence fields (and raw_text) from one OCR output."""
+    raw_text = raw_text.replace(_DOC_SEPARATOR, ' ')
+    return _assign(raw_text, _tokenize(raw_text)[0])
+
+
+def _parse_chunk(texts: List[Optional[str]]) -> List[Dict[str, str]]:
+    joined = _DOC_SEPARATOR.join((text or '').replace(_DOC_SEPARATOR, ' ') for text in texts)
+    return [_assign(joined, document) for document in _tokenize(joined)]
+
+
+def parse_many(texts: Iterable[Optional[str]], workers: int = 1, chunk_size: int = 2000) -> List[Dict[str, str]]:
+    """
+    Parse many raw texts, e.g. stored results being re-scored.
+
+    Each chunk is joined with a separator and tokenized in one regex scan,
+    so per-call overhead is paid per chunk. With workers > 1, chunks are
+    parsed in a process pool. Results are in input order.
+    """
+    texts = list(texts)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        return [fields for chunk in chunks for fields in _parse_chunk(chunk)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        return [fields for parsed in pool.map(_parse_chunk, chunks) for fields in parsed]
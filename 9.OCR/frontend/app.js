@@ -184,7 +184,7 @@ class DLOCRApp {
     displayResults(result) {
         // Show image preview
         const previewImg = document.getElementById('previewImg');
-        previewImg.src = `data:image/jpeg;base64,${result.image_base64}`;
+        previewImg.src = `data:image/jpeg;base64,${result.thumbnail_base64}`;
         document.getElementById('imagePreview').style.display = 'block';
 
         // Display accuracy bars
@@ -207,7 +207,7 @@ class DLOCRApp {
 
         // Processing info
         document.getElementById('processingTime').textContent =
-            `${result.processing_time_ms}ms`;
+            `${result.processing_time_ms}ms${result.cache_hit ? ' (cached)' : ''}`;
         document.getElementById('resultId').textContent = `#${result.result_id}`;
     }
 
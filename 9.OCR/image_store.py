@@ -0,0 +1,52 @@
+"""
+Content-Addressed Image Store
+==============================
+Keeps the original upload bytes so stored results can be re-extracted
+later (see reprocess.py) without asking users to upload again.
+
+- Files are named by the SHA-256 of their bytes, so repeat uploads of the
+  same image are stored once: results/images/ab/abcdef...
+- Writes are atomic (temp file + rename) and write-once.
+- Disabled by default: set OCR_STORE_IMAGES=1 to keep uploads.
+"""
+
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+IMAGE_STORE_DIR = "./results/images"
+STORE_IMAGES = os.environ.get("OCR_STORE_IMAGES", "0") == "1"
+
+
+def image_path(sha256: str) -> Path:
+    return Path(IMAGE_STORE_DIR) / sha256[:2] / sha256
+
+
+def store_image(raw_bytes: bytes, sha256: Optional[str] = None) -> str:
+    """Store upload bytes (no-op if already stored). Returns the SHA-256 key."""
+    sha256 = sha256 or hashlib.sha256(raw_bytes).hexdigest()
+    path = image_path(sha256)
+    if path.exists():
+        return sha256
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw_bytes)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return sha256
+
+
+def load_image(sha256: str) -> Optional[bytes]:
+    """Stored bytes for a key, or None if the image was never stored."""
+    try:
+        return image_path(sha256).read_bytes()
+    except FileNotFoundError:
+        return None
@@ -3,19 +3,24 @@ DL OCR FastAPI Application - Main Entry Point
 """
 import os
 import time
+import asyncio
 from datetime import datetime
 from typing import Optional
 import json
-import base64
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, HTMLResponse
 import uvicorn
 
-from utils import ImagePreprocessor, AccuracyCalculator, validate_image, format_dl_fields
-from ocr_engines import get_traditional_engine, get_vlm_engine
-from database import save_result_async, get_all_results, get_result_by_id, get_accuracy_stats, ensure_directories
+from utils import ImagePreprocessor, AccuracyCalculator, load_and_validate_image, format_dl_fields
+from ocr_engines import get_traditional_engine, get_vlm_manager
+from database import (save_result_async, get_all_results, get_result_by_id, get_accuracy_stats, search_results,
+                      encode_cursor, ensure_directories, close_database)
+from result_cache import compute_image_hashes, lookup_cached_result, store_cached_result
+from image_store import STORE_IMAGES, store_image
+from reprocess import STAGES, ReprocessJob, get_job_status, get_result_versions
+from executor import get_executor, run_until_disconnected, BackpressureError, StageTimeoutError, ClientDisconnectedError
 
 # HF Inference API used for VLM - set token if available
 # set HF_TOKEN=your_huggingface_token  (in terminal before running)
@@ -25,6 +30,7 @@ app = FastAPI(title="DL OCR Comparison API", version="1.0.0")
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 app.mount("/frontend", StaticFiles(directory="frontend"), name="frontend")
 preprocessor = ImagePreprocessor()
+executor = get_executor()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -32,49 +38,105 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(),
+            "uploads_in_progress": executor.inflight, "max_inflight": executor.max_inflight,
+            "vlm": get_vlm_manager().status()}
+
+def _with_raw_text(extracted: dict):
+    # (formatted fields, raw OCR text, failed) - the raw text is stored so results can be re-parsed.
+    # Engines report failures in the result ('error', or the VLM's demo 'note') instead of raising
+    failed = bool(extracted.get('error') or extracted.get('note'))
+    return format_dl_fields(extracted), '' if failed else extracted.get('raw_text', ''), failed
+
+def _run_tesseract(preprocessed_img, original_img):
+    return _with_raw_text(get_traditional_engine().extract(preprocessed_img, original_img))
+
+def _run_vlm(image):
+    vlm_image = preprocessor.preprocess_for_vlm(image)
+    with get_vlm_manager().use() as engine:
+        return _with_raw_text(engine.extract(vlm_image))
+
+async def _process_upload(file_bytes: bytes, filename: str, ground_truth_dict: dict, use_vlm: bool, start_time: float):
+    image, error_msg = await executor.run("validate", load_and_validate_image, file_bytes)
+    if image is None:
+        raise HTTPException(status_code=400, detail=error_msg)
+    sha256, phash = await executor.run("hash", compute_image_hashes, image)
+    cached = await lookup_cached_result(sha256, phash, use_vlm)
+    approach2_fields = {k: '' for k in ['name','date_of_birth','issued_by','date_of_issue','date_of_expiry','license_number','address','blood_group','vehicle_class']}
+    raw_texts = {}
+    if cached:
+        approach1_fields = cached["approach1"]
+        raw_texts = cached["raw_texts"]
+        if use_vlm:
+            approach2_fields = cached["approach2"]
+    else:
+        preprocessed_img, original_img = await executor.run("preprocess", preprocessor.preprocess, image)
+        tesseract_task = asyncio.ensure_future(executor.run("tesseract", _run_tesseract, preprocessed_img, original_img))
+        vlm_ok = False
+        try:
+            if use_vlm:
+                try:
+                    approach2_fields, raw_texts["approach2"], vlm_failed = await executor.run("vlm", _run_vlm, image)
+                    vlm_ok = not vlm_failed
+                except Exception as e:
+                    approach2_fields['error'] = str(e)
+            approach1_fields, raw_texts["approach1"], tesseract_failed = await tesseract_task
+        finally:
+            tesseract_task.cancel()
+        # Only successful runs are cached: a failed VLM is stored as Tesseract-only,
+        # a failed Tesseract run is not stored at all
+        if not tesseract_failed:
+            await store_cached_result(sha256, phash, approach1_fields, approach2_fields if vlm_ok else None, raw_texts)
+    accuracy_result = {"approach1": {"accuracy_percent": 0}, "approach2": {"accuracy_percent": 0}, "comparison": {"winner": "No ground truth"}}
+    if ground_truth_dict:
+        accuracy_result = AccuracyCalculator.compare_approaches(approach1_fields, approach2_fields, ground_truth_dict)
+    processing_time_ms = int((time.time() - start_time) * 1000)
+    thumbnail_base64 = await executor.run("encode", image.thumbnail_base64)
+    image_sha256 = await executor.run("store", store_image, file_bytes, sha256) if STORE_IMAGES else None
+    result_id = await save_result_async(filename, approach1_fields, approach2_fields, accuracy_result, ground_truth_dict or None, processing_time_ms, len(file_bytes),
+                                        image_sha256=image_sha256, raw_texts=raw_texts)
+    return {"success": True, "result_id": result_id, "image_name": filename,
+            "thumbnail_base64": thumbnail_base64, "image_width": image.width, "image_height": image.height,
+            "approach1": {"name": "Pytesseract (Traditional)", "fields": approach1_fields},
+            "approach2": {"name": "VLM (HF API)", "fields": approach2_fields},
+            "accuracy": accuracy_result, "processing_time_ms": processing_time_ms,
+            "cache_hit": cached is not None, "cache_match": cached["match"] if cached else None}
 
 @app.post("/upload")
-async def upload_and_process(file: UploadFile = File(...), ground_truth: Optional[str] = Form(None), use_vlm: bool = Form(True)):
+async def upload_and_process(request: Request, file: UploadFile = File(...), ground_truth: Optional[str] = Form(None), use_vlm: bool = Form(True)):
     start_time = time.time()
     file_bytes = await file.read()
-    file_size = len(file_bytes)
-    is_valid, error_msg = validate_image(file_bytes)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error_msg)
     try:
         ground_truth_dict = json.loads(ground_truth) if ground_truth else {}
-        preprocessed_img, original_img = preprocessor.preprocess(file_bytes)
-        traditional_engine = get_traditional_engine()
-        approach1_raw = traditional_engine.extract(preprocessed_img, original_img)
-        approach1_fields = format_dl_fields(approach1_raw)
-        approach2_fields = {k: '' for k in ['name','date_of_birth','issued_by','date_of_issue','date_of_expiry','license_number','address','blood_group','vehicle_class']}
-        if use_vlm:
-            try:
-                vlm_image = preprocessor.preprocess_for_vlm(file_bytes)
-                vlm_engine = get_vlm_engine()
-                approach2_raw = vlm_engine.extract(vlm_image)
-                approach2_fields = format_dl_fields(approach2_raw)
-            except Exception as e:
-                approach2_fields['error'] = str(e)
-        accuracy_result = {"approach1": {"accuracy_percent": 0}, "approach2": {"accuracy_percent": 0}, "comparison": {"winner": "No ground truth"}}
-        if ground_truth_dict:
-            accuracy_result = AccuracyCalculator.compare_approaches(approach1_fields, approach2_fields, ground_truth_dict)
-        processing_time_ms = int((time.time() - start_time) * 1000)
-        import cv2
-        _, buffer = cv2.imencode('.jpg', original_img)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
-        result_id = await save_result_async(file.filename, approach1_fields, approach2_fields, accuracy_result, ground_truth_dict or None, processing_time_ms, file_size)
-        return {"success": True, "result_id": result_id, "image_name": file.filename, "image_base64": image_base64,
-                "approach1": {"name": "Pytesseract (Traditional)", "fields": approach1_fields},
-                "approach2": {"name": "VLM (HF API)", "fields": approach2_fields},
-                "accuracy": accuracy_result, "processing_time_ms": processing_time_ms}
+        async with executor.slot():
+            return await run_until_disconnected(
+                request.is_disconnected,
+                _process_upload(file_bytes, file.filename, ground_truth_dict, use_vlm, start_time))
+    except HTTPException:
+        raise
+    except BackpressureError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except StageTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=499, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/results")
-async def get_results(limit: int = Query(50), offset: int = Query(0)):
-    results = await get_all_results(limit, offset)
+async def get_results(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0),
+                      cursor: Optional[str] = Query(None), detail: bool = Query(False)):
+    try:
+        results = await get_all_results(limit, offset, cursor=cursor, detail=detail)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_cursor(results[-1]) if len(results) == limit else None
+    return {"success": True, "count": len(results), "results": results, "next_cursor": next_cursor}
+
+@app.get("/results/search")
+async def search(q: Optional[str] = Query(None), start_date: Optional[str] = Query(None), end_date: Optional[str] = Query(None),
+                 limit: int = Query(50, ge=1, le=500), detail: bool = Query(False)):
+    results = await search_results(q, start_date, end_date, limit=limit, detail=detail)
     return {"success": True, "count": len(results), "results": results}
 
 @app.get("/results/{result_id}")
@@ -92,10 +154,69 @@ async def delete_single_result(result_id: int):
         raise HTTPException(status_code=404, detail="Result not found or could not be deleted")
     return {"success": True, "message": f"Result {result_id} deleted successfully"}
 
+@app.get("/results/{result_id}/versions")
+async def get_versions(result_id: int):
+    versions = await get_result_versions(result_id)
+    return {"success": True, "count": len(versions), "versions": versions}
+
+# Running re-extraction jobs, by job_id (the task must be referenced to stay alive)
+running_jobs = {}
+
+def _start_job(job: ReprocessJob):
+    task = asyncio.ensure_future(job.run())
+    running_jobs[job.job_id] = (job, task)
+    task.add_done_callback(lambda _: running_jobs.pop(job.job_id, None))
+
+@app.post("/reprocess")
+async def start_reprocess(stages: str = Form("parse"), version: Optional[str] = Form(None)):
+    if stages not in STAGES:
+        raise HTTPException(status_code=400, detail=f"stages must be one of {', '.join(STAGES)}")
+    job = await ReprocessJob.create(stages, version)
+    _start_job(job)
+    return {"success": True, "job_id": job.job_id, "version": job.version}
+
+@app.get("/reprocess/{job_id}")
+async def reprocess_status(job_id: str):
+    status = await get_job_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": status}
+
+@app.post("/reprocess/{job_id}/resume")
+async def resume_reprocess(job_id: str):
+    if job_id in running_jobs:
+        raise HTTPException(status_code=409, detail="Job is already running")
+    job = await ReprocessJob.load(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    _start_job(job)
+    return {"success": True, "job_id": job.job_id, "checkpoint_id": job.checkpoint_id}
+
+@app.post("/reprocess/{job_id}/cancel")
+async def cancel_reprocess(job_id: str):
+    if job_id not in running_jobs:
+        raise HTTPException(status_code=404, detail="Job is not running")
+    running_jobs[job_id][0].cancel()
+    return {"success": True, "message": "Job stops after the current batch"}
+
 @app.get("/stats")
-async def get_statistics():
-    stats = await get_accuracy_stats()
+async def get_statistics(days: Optional[int] = Query(None, ge=1, le=3650)):
+    stats = await get_accuracy_stats(days)
     return {"success": True, "statistics": stats}
 
+@app.on_event("startup")
+async def preload_vlm():
+    # Florence-2 loads in the background; uploads are accepted meanwhile
+    if os.environ.get("OCR_VLM_PRELOAD", "1") == "1":
+        get_vlm_manager().start_loading()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    for job, task in list(running_jobs.values()):
+        job.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    executor.shutdown()
+    await close_database()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
@@ -2,11 +2,23 @@
 OCR Engines for DL Text Extraction
 ====================================
 Two approaches:
-1. Traditional: Pytesseract (local, offline)
-2. VLM: Vision model via Hugging Face API
+1. Traditional: Tesseract (local, offline)
+   - "pytesseract" backend: one tesseract process per image
+   - "tesserocr" backend: persistent API handles, model loaded once per worker
+2. VLM: Florence-2, run locally with transformers
+   - loaded in a background thread at startup (VLMEngineManager)
+   - int8 dynamic quantization of Linear layers on CPU
+   - unloaded after an idle timeout, reloaded on the next request
+
+Select the Tesseract backend with TESSERACT_BACKEND=pytesseract|tesserocr.
 """
 
 import os
+import gc
+import time
+import queue
+import threading
+from contextlib import contextmanager
 import cv2
 import numpy as np
 from PIL import Image
@@ -14,9 +26,10 @@ import re
 import json
 import base64
 import io
-from typing import Dict
+from typing import Dict, Optional
 import logging
 from dotenv import load_dotenv
+from field_parser import parse_fields
 import requests
 import torch
 
@@ -43,50 +56,24 @@ def get_pytesseract():
     return _pytesseract
 
 
+_tesserocr = None
+
+
+def get_tesserocr():
+    """Lazy load tesserocr (optional dependency)."""
+    global _tesserocr
+    if _tesserocr is None:
+        import tesserocr
+        _tesserocr = tesserocr
+    return _tesserocr
+
+
 def parse_from_raw_text(raw_text: str) -> Dict[str, str]:
     """
-    Common regex-based parsing logic for raw OCR text.
-    Extracts name, dates, license number, etc.
+    Common parsing logic for raw OCR text (both engines).
+    Extracts name, dates, license number, etc. - see field_parser.
     """
-    extracted_fields = {
-        'name': '', 'date_of_birth': '', 'issued_by': '',
-        'date_of_issue': '', 'date_of_expiry': '', 'license_number': '',
-        'address': '', 'blood_group': '', 'vehicle_class': ''
-    }
-    extracted_fields['raw_text'] = raw_text.strip()
-
-    # Find all dates (DD/MM/YYYY format and variants)
-    dates = re.findall(r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})', raw_text)
-    if dates:
-        extracted_fields['date_of_birth'] = dates[0]
-        if len(dates) > 1:
-            extracted_fields['date_of_issue'] = dates[1]
-        if len(dates) > 2:
-            extracted_fields['date_of_expiry'] = dates[2]
-
-    # Find license number (2 letters + digits pattern like PB02...)
-    # Updated pattern to be more flexible
-    license_match = re.search(r'([A-Z]{2}[\s\-]?[0-9]{2}[\s\-]?[0-9]{4,}[\d]*)', raw_text)
-    if license_match:
-        extracted_fields['license_number'] = license_match.group(1).strip()
-
-    # Find blood group
-    blood_match = re.search(r'\b([ABO]{1,2}[\+\-])', raw_text)
-    if blood_match:
-        extracted_fields['blood_group'] = blood_match.group(1)
-
-    # Find names - look for capitalized words (potential names)
-    # Names usually appear as all-caps words together
-    name_patterns = re.findall(r'([A-Z][A-Z\s]+[A-Z])', raw_text)
-    if name_patterns:
-        # Filter out short matches and common words
-        names = [n.strip() for n in name_patterns if len(n) > 5 and 'LICENCE' not in n and 'DATE' not in n and 'BLOOD' not in n and 'INDIA' not in n and 'TRANSPORT' not in n]
-        if names:
-            extracted_fields['name'] = names[0]
-            if len(names) > 1:
-                extracted_fields['issued_by'] = names[-1]  # Last name-like entry might be authority
-
-    return extracted_fields
+    return parse_fields(raw_text)
 
 
 class TraditionalOCREngine:
@@ -94,8 +81,17 @@ class TraditionalOCREngine:
     Approach 1: Pytesseract - Raw image, NO preprocessing
     """
     
-    def __init__(self):
+    def __init__(self, timeout: float = 0):
         self.pytesseract = None
+        # Seconds before the tesseract subprocess is killed (0 = no limit)
+        self.timeout = timeout
+    
+    def recognize(self, image: np.ndarray, single_line: bool = False) -> str:
+        """Return raw Tesseract text for an image or a single-line crop."""
+        if self.pytesseract is None:
+            self.pytesseract = get_pytesseract()
+        config = '--psm 7' if single_line else ''
+        return self.pytesseract.image_to_string(image, config=config, timeout=self.timeout)
     
     def extract(self, preprocessed_image: np.ndarray, original_image: np.ndarray) -> Dict[str, str]:
         """Extract ALL text using Pytesseract on raw image."""
@@ -110,7 +106,7 @@ class TraditionalOCREngine:
         
         try:
             # Just run Tesseract on raw image - no preprocessing
-            raw_text = self.pytesseract.image_to_string(original_image)
+            raw_text = self.recognize(original_image)
             logger.info(f"Tesseract raw output:\n{raw_text}")
             
             # Use common parsing logic
@@ -123,16 +119,108 @@ class TraditionalOCREngine:
         return extracted_fields
 
 
+class TesserocrOCREngine:
+    """
+    Approach 1 via tesserocr: a pool of long-lived Tesseract API handles.
+
+    pytesseract forks a tesseract process and writes a temp image for every
+    call, reloading the language model each time. Here each handle loads the
+    model once and images are passed as raw in-memory pixel buffers.
+    Handles are created on demand up to pool_size (default: CPU count), so
+    the pool matches the executor's CPU worker threads.
+    """
+
+    def __init__(self, pool_size: int = 0, lang: str = "eng"):
+        self.tesserocr = get_tesserocr()
+        self.pool_size = pool_size or os.cpu_count() or 1
+        self.lang = lang
+        self.tessdata_path = os.environ.get("TESSDATA_PREFIX")
+        self._handles = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_handle(self):
+        kwargs = {"lang": self.lang}
+        if self.tessdata_path:
+            kwargs["path"] = self.tessdata_path
+        logger.info(f"Creating Tesseract API handle ({self._created + 1}/{self.pool_size})")
+        return self.tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _acquire(self):
+        try:
+            return self._handles.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                handle = self._new_handle()
+                self._created += 1
+                return handle
+        return self._handles.get()
+
+    def _release(self, handle):
+        handle.Clear()
+        handle.SetPageSegMode(self.tesserocr.PSM.AUTO)
+        self._handles.put(handle)
+
+    def recognize(self, image: np.ndarray, single_line: bool = False) -> str:
+        """Run OCR on a BGR, RGB or grayscale array and return the raw text."""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+
+        handle = self._acquire()
+        try:
+            if single_line:
+                handle.SetPageSegMode(self.tesserocr.PSM.SINGLE_LINE)
+            handle.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, image.strides[0])
+            return handle.GetUTF8Text()
+        finally:
+            self._release(handle)
+
+    def extract(self, preprocessed_image: np.ndarray, original_image: np.ndarray) -> Dict[str, str]:
+        """Extract ALL text from the raw image (same contract as TraditionalOCREngine)."""
+        extracted_fields = {
+            'name': '', 'date_of_birth': '', 'issued_by': '',
+            'date_of_issue': '', 'date_of_expiry': '', 'license_number': '',
+            'address': '', 'blood_group': '', 'vehicle_class': ''
+        }
+
+        try:
+            raw_text = self.recognize(original_image)
+            logger.info(f"Tesseract raw output:\n{raw_text}")
+            extracted_fields = parse_from_raw_text(raw_text)
+        except Exception as e:
+            logger.error(f"Tesseract error: {e}")
+            extracted_fields['error'] = str(e)
+
+        return extracted_fields
+
+    def close(self):
+        """Release all API handles."""
+        while True:
+            try:
+                self._handles.get_nowait().End()
+            except queue.Empty:
+                break
+        self._created = 0
+
+
 class VLMOCREngine:
     """
     Approach 2: Local VLM using Microsoft Florence-2
     Native Transformer model - fixed for _supports_sdpa error.
     """
     
-    def __init__(self):
+    def __init__(self, model_id: str = "microsoft/Florence-2-base", quantize: bool = False):
         self.processor = None
         self.model = None
-        self.model_id = "microsoft/Florence-2-base" 
+        self.model_id = model_id
+        # int8 dynamic quantization of Linear layers (CPU only)
+        self.quantize = quantize
+        self.quantized = False
         logger.info("Initializing Florence-2 Engine...")
         self._load_model()
 
@@ -154,8 +242,20 @@ class VLMOCREngine:
                 dtype=dtype,
                 attn_implementation="eager"
             ).to(device)
+            self.model.eval()
             print("DEBUG: Model loaded.")
             
+            if self.quantize and device == "cpu":
+                # Weights of every nn.Linear become int8; activations are
+                # quantized on the fly. Done in place to avoid a second copy.
+                try:
+                    torch.ao.quantization.quantize_dynamic(
+                        self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+                    )
+                    self.quantized = True
+                except Exception as e:
+                    logger.warning(f"int8 quantization failed, keeping float32: {e}")
+            
             self.processor = AutoProcessor.from_pretrained(self.model_id, trust_remote_code=True)
             print("DEBUG: Processor loaded.")
             
@@ -187,15 +287,16 @@ class VLMOCREngine:
             inputs = self.processor(text=task_prompt, images=image, return_tensors="pt").to(device, dtype)
             
             # Config for generation
-            generated_ids = self.model.generate(
-                input_ids=inputs["input_ids"],
-                pixel_values=inputs["pixel_values"],
-                max_new_tokens=1024,
-                num_beams=1,
-                do_sample=False,
-                use_cache=False,
-                early_stopping=False
-            )
+            with torch.inference_mode():
+                generated_ids = self.model.generate(
+                    input_ids=inputs["input_ids"],
+                    pixel_values=inputs["pixel_values"],
+                    max_new_tokens=1024,
+                    num_beams=1,
+                    do_sample=False,
+                    use_cache=False,
+                    early_stopping=False
+                )
             
             # Decode output
             generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=False)[0]
@@ -229,20 +330,169 @@ class VLMOCREngine:
         }
 
 
+class VLMEngineManager:
+    """
+    Owns the Florence-2 engine: background loading, readiness and idle unload.
+
+    States: "unloaded" -> "loading" -> "ready" | "failed"; "ready" goes back
+    to "unloaded" after idle_timeout seconds without a request. A request
+    arriving while unloaded starts a new load and waits for it. A failed load
+    is retried by the first request (or preload) after retry_after seconds.
+    """
+
+    def __init__(self, quantize: bool = True, idle_timeout: float = 900.0, retry_after: float = 60.0):
+        self.quantize = quantize
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self.state = "unloaded"
+        self.error = None
+        self.failed_at = None
+        self.load_seconds = None
+        self.loads = 0
+
+        self._engine = None
+        self._in_use = 0
+        self._last_used = time.monotonic()
+        self._lock = threading.Condition()
+        self._watcher = None
+
+    @classmethod
+    def from_env(cls) -> "VLMEngineManager":
+        return cls(
+            quantize=os.environ.get("OCR_VLM_QUANTIZE", "1") == "1",
+            idle_timeout=float(os.environ.get("OCR_VLM_IDLE_UNLOAD_S", "900")),
+            retry_after=float(os.environ.get("OCR_VLM_RETRY_S", "60"))
+        )
+
+    def start_loading(self):
+        """Begin loading in a background thread (no-op if loading, loaded or failed within retry_after)."""
+        with self._lock:
+            if self.state in ("loading", "ready"):
+                return
+            if self.state == "failed" and time.monotonic() - self.failed_at < self.retry_after:
+                return
+            self.state = "loading"
+            self._engine = None
+            self.error = None
+        threading.Thread(target=self._load, name="vlm-loader", daemon=True).start()
+
+    def _load(self):
+        start = time.perf_counter()
+        engine = VLMOCREngine(quantize=self.quantize)
+        failed = engine.model == "ERROR" or engine.model is None
+        with self._lock:
+            self._engine = engine
+            self.load_seconds = round(time.perf_counter() - start, 2)
+            self.loads += 1
+            self.state = "failed" if failed else "ready"
+            self.error = "Model load failed" if failed else None
+            self.failed_at = time.monotonic() if failed else None
+            self._last_used = time.monotonic()
+            self._lock.notify_all()
+        if failed:
+            logger.warning(f"Florence-2 load failed after {self.load_seconds}s, retrying after {self.retry_after:g}s")
+        else:
+            logger.info(f"Florence-2 ready in {self.load_seconds}s (int8 quantized: {engine.quantized})")
+        if not failed and self.idle_timeout > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._unload_when_idle, name="vlm-idle", daemon=True)
+            self._watcher.start()
+
+    @contextmanager
+    def use(self, timeout: Optional[float] = None):
+        """
+        Borrow the engine, loading it first if needed.
+        The engine is never unloaded while borrowed.
+
+        Raises:
+            TimeoutError: If loading does not finish within ``timeout`` seconds.
+        """
+        self.start_loading()
+        with self._lock:
+            if not self._lock.wait_for(lambda: self.state in ("ready", "failed"), timeout=timeout):
+                raise TimeoutError("Florence-2 is still loading")
+            engine = self._engine
+            self._in_use += 1
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+
+    def _unload_when_idle(self):
+        while True:
+            time.sleep(min(self.idle_timeout, 30))
+            with self._lock:
+                idle = time.monotonic() - self._last_used
+                if self.state != "ready" or self._in_use or idle < self.idle_timeout:
+                    continue
+                logger.info(f"Florence-2 idle for {idle:.0f}s, unloading")
+                self._engine = None
+                self.state = "unloaded"
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def status(self) -> Dict:
+        """Readiness info for /health."""
+        with self._lock:
+            engine = self._engine
+            return {
+                "state": self.state,
+                "quantized": bool(engine and engine.quantized),
+                "load_seconds": self.load_seconds,
+                "loads": self.loads,
+                "idle_seconds": round(time.monotonic() - self._last_used, 1),
+                "idle_unload_s": self.idle_timeout,
+                "error": self.error
+            }
+
+
 # Singleton instances
 _traditional_engine = None
-_vlm_engine = None
+_vlm_manager = None
+
+
+def create_traditional_engine(backend: str = "pytesseract"):
+    """Build a Tesseract engine for the given backend ("pytesseract" or "tesserocr")."""
+    if backend == "tesserocr":
+        return TesserocrOCREngine(pool_size=int(os.environ.get("TESSERACT_POOL_SIZE", "0")))
+    if backend != "pytesseract":
+        raise ValueError(f"Unknown Tesseract backend: {backend}")
+    return TraditionalOCREngine(timeout=float(os.environ.get("TESSERACT_TIMEOUT_S", "0")))
 
 
-def get_traditional_engine() -> TraditionalOCREngine:
+def get_traditional_engine():
     global _traditional_engine
     if _traditional_engine is None:
-        _traditional_engine = TraditionalOCREngine()
+        backend = os.environ.get("TESSERACT_BACKEND", "pytesseract").lower()
+        try:
+            engine = create_traditional_engine(backend)
+        except ImportError as e:
+            logger.warning(f"Tesseract backend '{backend}' unavailable ({e}), using pytesseract")
+            engine = create_traditional_engine("pytesseract")
+        if os.environ.get("OCR_REGION_MODE", "0") == "1":
+            if isinstance(engine, TesserocrOCREngine):
+                from executor import get_executor
+                from layout import RegionOCREngine
+                # One line-recognition thread per CPU worker of the request executor,
+                # and never more than there are Tesseract handles
+                engine = RegionOCREngine(engine, workers=min(get_executor().cpu_workers, engine.pool_size))
+            else:
+                # pytesseract would start one tesseract process per detected line
+                logger.warning("OCR_REGION_MODE=1 needs TESSERACT_BACKEND=tesserocr, using full-image OCR")
+        _traditional_engine = engine
     return _traditional_engine
 
 
+def get_vlm_manager() -> VLMEngineManager:
+    global _vlm_manager
+    if _vlm_manager is None:
+        _vlm_manager = VLMEngineManager.from_env()
+    return _vlm_manager
+
+
 def get_vlm_engine() -> VLMOCREngine:
-    global _vlm_engine
-    if _vlm_engine is None:
-        _vlm_engine = VLMOCREngine()
-    return _vlm_engine
+    """Loaded engine, blocking until any load finishes. Prefer get_vlm_manager().use()."""
+    with get_vlm_manager().use() as engine:
+        return engine
@@ -0,0 +1,37 @@
+"""
+Re-parse Worker for Re-extraction Jobs
+=======================================
+The per-chunk work of the "parse" stage (see reprocess.py). It runs in
+spawned worker processes, so this module must stay free of import-time
+database work: it only needs the parser and the accuracy calculator.
+"""
+
+import json
+from typing import Dict, List
+
+from field_parser import parse_many
+from utils import AccuracyCalculator, format_dl_fields
+
+NO_GROUND_TRUTH = {"approach1": {"accuracy_percent": 0}, "approach2": {"accuracy_percent": 0},
+                   "comparison": {"winner": "No ground truth"}}
+
+
+def scored(row: Dict, approach1: Dict, approach2: Dict) -> Dict:
+    """Versioned result for a row: both approaches and their accuracy against the stored ground truth."""
+    ground_truth = json.loads(row['ground_truth_json']) if row.get('ground_truth_json') else None
+    accuracy = (AccuracyCalculator.compare_approaches(approach1, approach2, ground_truth)
+                if ground_truth else NO_GROUND_TRUTH)
+    return {"result_id": row['id'], "approach1": approach1, "approach2": approach2, "accuracy": accuracy}
+
+
+def reparse_rows(rows: List[Dict]) -> List[Dict]:
+    """Stage "parse" for a chunk: one parse_many call per approach."""
+    rows = [row for row in rows if row.get('approach1_raw_text')]
+    approach1 = parse_many([row['approach1_raw_text'] for row in rows])
+    approach2 = parse_many([row.get('approach2_raw_text') or '' for row in rows])
+    results = []
+    for row, fields1, fields2 in zip(rows, approach1, approach2):
+        stored2 = json.loads(row['approach2_raw_json']) if row.get('approach2_raw_json') else {}
+        fields2 = format_dl_fields(fields2) if row.get('approach2_raw_text') else stored2
+        results.append(scored(row, format_dl_fields(fields1), fields2))
+    return results
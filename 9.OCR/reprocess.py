@@ -0,0 +1,279 @@
+"""
+Re-extraction Jobs over Stored Results
+=======================================
+Re-runs part of the pipeline over every stored result after the parser or
+preprocessing changed, and records the outcome as a new *version* of each
+result. The original rows are never modified.
+
+Stages:
+- "parse": re-parse the stored raw OCR text of both approaches (cheap; rows
+  saved before raw text was kept are skipped)
+- "ocr":   preprocessing + Tesseract + parser from the stored image
+           (needs OCR_STORE_IMAGES=1 at upload time); approach 2 is kept
+- "full":  like "ocr", plus Florence-2 for approach 2
+
+Rows are processed in id order, in chunks that run in parallel (a process
+pool for parsing, threads for OCR). After each batch the versioned results
+and the job checkpoint are committed together, so an interrupted job
+resumes where it stopped.
+
+Usage:
+    python reprocess.py --stages parse --version parser-v2
+    python reprocess.py --resume <job_id>
+"""
+
+import os
+import json
+import zlib
+import uuid
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import get_store, close_database, pack_json_text, unpack_row
+from reparse import reparse_rows, scored
+from utils import format_dl_fields
+
+STAGES = ("parse", "ocr", "full")
+
+ROW_COLUMNS = ('id', 'image_sha256', 'approach1_raw_text', 'approach2_raw_text',
+               'approach2_raw_json', 'ground_truth_json')
+VERSION_JSON_COLUMNS = ('approach1_json', 'approach2_json', 'accuracy_details_json')
+
+
+# ---------- per-row work ("parse" runs reparse.reparse_rows in worker processes) ----------
+
+class _OCRRunner:
+    """Stages "ocr" / "full" for one row, run on a worker thread."""
+
+    def __init__(self, stages: str):
+        from ocr_engines import get_traditional_engine
+        from utils import ImagePreprocessor
+
+        self.stages = stages
+        self.preprocessor = ImagePreprocessor()
+        self.engine = get_traditional_engine()
+        # Florence-2 is not thread-safe; one VLM call at a time
+        self._vlm_lock = threading.Lock()
+
+    def __call__(self, row: Dict) -> Optional[Dict]:
+        from image_store import load_image
+        from utils import DecodedImage
+
+        raw_bytes = load_image(row['image_sha256']) if row.get('image_sha256') else None
+        if raw_bytes is None:
+            return None
+        image = DecodedImage.from_bytes(raw_bytes)
+        preprocessed, original = self.preprocessor.preprocess(image)
+        extracted = self.engine.extract(preprocessed, original)
+        if extracted.get('error'):
+            raise RuntimeError(extracted['error'])
+        approach1 = format_dl_fields(extracted)
+
+        if self.stages == "full":
+            from ocr_engines import get_vlm_manager
+            with self._vlm_lock, get_vlm_manager().use() as vlm:
+                approach2 = format_dl_fields(vlm.extract(self.preprocessor.preprocess_for_vlm(image)))
+        else:
+            approach2 = json.loads(row['approach2_raw_json']) if row.get('approach2_raw_json') else {}
+        return scored(row, approach1, approach2)
+
+
+# ---------- job ----------
+
+class ReprocessJob:
+    """
+    A resumable re-extraction run, persisted in reprocess_jobs.
+
+    Each batch is ``workers`` chunks of ``chunk_size`` rows processed in
+    parallel; results and the new checkpoint are committed in one transaction.
+    """
+
+    def __init__(self, job_id: str, version: str, stages: str, checkpoint_id: int = 0,
+                 chunk_size: int = 200, workers: Optional[int] = None):
+        if stages not in STAGES:
+            raise ValueError(f"Unknown stages '{stages}', expected one of {', '.join(STAGES)}")
+        self.job_id = job_id
+        self.version = version
+        self.stages = stages
+        self.checkpoint_id = checkpoint_id
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 2
+        self._cancelled = False
+
+    @classmethod
+    async def create(cls, stages: str, version: Optional[str] = None, **kwargs) -> "ReprocessJob":
+        """Register a new job (version defaults to "<stages>-<timestamp>")."""
+        now = datetime.now()
+        job = cls(uuid.uuid4().hex[:12], version or f"{stages}-{now:%Y%m%d-%H%M%S}", stages, **kwargs)
+        await get_store().run_write(lambda conn: conn.execute(
+            'INSERT INTO reprocess_jobs (job_id, version, stages, status, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (job.job_id, job.version, stages, 'pending', now.isoformat(), now.isoformat())
+        ))
+        return job
+
+    @classmethod
+    async def load(cls, job_id: str, **kwargs) -> Optional["ReprocessJob"]:
+        """Reload a job from its last checkpoint (to resume it)."""
+        status = await get_job_status(job_id)
+        if status is None:
+            return None
+        return cls(job_id, status['version'], status['stages'], status['checkpoint_id'], **kwargs)
+
+    def cancel(self):
+        """Stop after the current batch; the job can be resumed later."""
+        self._cancelled = True
+
+    async def _set_status(self, status: str, error: Optional[str] = None):
+        await get_store().run_write(lambda conn: conn.execute(
+            'UPDATE reprocess_jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?',
+            (status, error, datetime.now().isoformat(), self.job_id)
+        ))
+
+    async def _fetch_batch(self) -> List[Dict]:
+        async with get_store().read() as db:
+            cursor = await db.execute(
+                f'SELECT {", ".join(ROW_COLUMNS)} FROM ocr_results WHERE id > ? ORDER BY id LIMIT ?',
+                (self.checkpoint_id, self.chunk_size * self.workers)
+            )
+            return [unpack_row(row) for row in await cursor.fetchall()]
+
+    async def _process_batch(self, rows: List[Dict], pool) -> tuple:
+        loop = asyncio.get_running_loop()
+        if self.stages == "parse":
+            chunks = [rows[i:i + self.chunk_size] for i in range(0, len(rows), self.chunk_size)]
+            parsed = await asyncio.gather(*(loop.run_in_executor(pool, reparse_rows, chunk) for chunk in chunks))
+            results = [result for chunk in parsed for result in chunk]
+            return results, len(rows) - len(results), 0
+
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(pool, self._runner, row) for row in rows), return_exceptions=True
+        )
+        results = [o for o in outcomes if isinstance(o, dict)]
+        failed = sum(isinstance(o, Exception) for o in outcomes)
+        return results, len(rows) - len(results) - failed, failed
+
+    async def _commit(self, results: List[Dict], last_id: int, skipped: int, failed: int):
+        now = datetime.now().isoformat()
+        records = [(
+            r["result_id"], self.version, self.stages, now,
+            pack_json_text(json.dumps(r["approach1"])), pack_json_text(json.dumps(r["approach2"])),
+            r["accuracy"].get('approach1', {}).get('accuracy_percent', 0),
+            r["accuracy"].get('approach2', {}).get('accuracy_percent', 0),
+            r["accuracy"].get('comparison', {}).get('winner', 'Unknown'),
+            pack_json_text(json.dumps(r["accuracy"]))
+        ) for r in results]
+
+        def write(conn):
+            conn.executemany('''
+                INSERT OR REPLACE INTO ocr_result_versions (
+                    result_id, version, stages, created_at, approach1_json, approach2_json,
+                    approach1_accuracy, approach2_accuracy, winner, accuracy_details_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', records)
+            conn.execute('''
+                UPDATE reprocess_jobs SET checkpoint_id = ?, processed = processed + ?,
+                    skipped = skipped + ?, failed = failed + ?, updated_at = ?
+                WHERE job_id = ?
+            ''', (last_id, len(records), skipped, failed, now, self.job_id))
+
+        await get_store().run_write(write)
+        self.checkpoint_id = last_id
+
+    async def run(self) -> Dict:
+        """Process every row after the checkpoint. Returns the final job status."""
+        await self._set_status('running')
+        if self.stages == "parse":
+            # Spawn, not fork: the server process has event loop, executor and
+            # sqlite threads running, and a forked child can inherit their held locks
+            pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        else:
+            self._runner = _OCRRunner(self.stages)
+            pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr-reprocess")
+        try:
+            while not self._cancelled:
+                rows = await self._fetch_batch()
+                if not rows:
+                    break
+                results, skipped, failed = await self._process_batch(rows, pool)
+                await self._commit(results, rows[-1]['id'], skipped, failed)
+            await self._set_status('cancelled' if self._cancelled else 'completed')
+        except Exception as e:
+            await self._set_status('failed', str(e))
+            raise
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return await get_job_status(self.job_id)
+
+
+async def get_job_status(job_id: str) -> Optional[Dict]:
+    """Job row plus accuracy of the version written so far."""
+    async with get_store().read() as db:
+        cursor = await db.execute('SELECT * FROM reprocess_jobs WHERE job_id = ?', (job_id,))
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+        status = dict(row)
+        cursor = await db.execute('''
+            SELECT COUNT(*), AVG(approach1_accuracy), AVG(approach2_accuracy)
+            FROM ocr_result_versions WHERE version = ?
+        ''', (status['version'],))
+        count, avg1, avg2 = await cursor.fetchone()
+    status['version_results'] = count
+    status['average_accuracy'] = {"approach1": round(avg1 or 0, 2), "approach2": round(avg2 or 0, 2)}
+    return status
+
+
+async def get_result_versions(result_id: int) -> List[Dict]:
+    """All re-extracted versions of one result, newest first."""
+    async with get_store().read() as db:
+        cursor = await db.execute(
+            'SELECT * FROM ocr_result_versions WHERE result_id = ? ORDER BY created_at DESC',
+            (result_id,)
+        )
+        rows = await cursor.fetchall()
+    versions = []
+    for row in rows:
+        version = dict(row)
+        for column in VERSION_JSON_COLUMNS:
+            if isinstance(version[column], bytes):
+                version[column] = json.loads(zlib.decompress(version[column]).decode('utf-8'))
+        versions.append(version)
+    return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract stored OCR results")
+    parser.add_argument("--stages", choices=STAGES, default="parse")
+    parser.add_argument("--version", help="Label for the new results (default: <stages>-<timestamp>)")
+    parser.add_argument("--resume", metavar="JOB_ID", help="Continue an interrupted job")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    args = parser.parse_args()
+
+    async def run():
+        options = {"workers": args.workers, "chunk_size": args.chunk_size}
+        try:
+            if args.resume:
+                job = await ReprocessJob.load(args.resume, **options)
+                if job is None:
+                    print(f"No job {args.resume}")
+                    return
+            else:
+                job = await ReprocessJob.create(args.stages, args.version, **options)
+            print(f"Job {job.job_id}: stages={job.stages} version={job.version} from id>{job.checkpoint_id}")
+            status = await job.run()
+            print(json.dumps(status, indent=2))
+        finally:
+            await close_database()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
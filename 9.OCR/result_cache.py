@@ -0,0 +1,220 @@
+"""
+Content-Addressed OCR Result Cache
+===================================
+Repeat uploads of the same licence image skip Tesseract and Florence-2.
+
+Keys:
+- SHA-256 of the raw upload bytes (exact duplicates)
+- 64-bit DCT perceptual hash (near duplicates: re-saved / recompressed copies)
+
+Cached values are the formatted approach1/approach2 fields and the raw OCR
+text they were parsed from (so cache hits can be re-parsed later). Accuracy is NOT
+cached - it is recomputed against whatever ground truth comes with the upload.
+
+Entries are tagged with the pipeline version (a hash of the parser, preprocessing
+and engine code plus the engine settings); after any change to those, older
+entries no longer match and are replaced as uploads come in.
+
+Eviction (checked on every store):
+- entries older than OCR_CACHE_MAX_AGE_DAYS (default 30) are dropped
+- beyond OCR_CACHE_MAX_ENTRIES (default 1000), least recently hit go first
+
+Near-duplicate matching is opt-in: set OCR_CACHE_PHASH_DISTANCE (bits out
+of 64, e.g. 4). The default 0 matches exact bytes only, because two licences
+printed on the same template can hash within a few bits of each other and
+would be served each other's name, DOB and licence number.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import inspect
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+import field_parser
+import layout
+import ocr_engines
+import utils
+from database import DB_PATH, get_store
+from utils import DecodedImage
+
+CACHE_MAX_ENTRIES = int(os.environ.get("OCR_CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_AGE_DAYS = float(os.environ.get("OCR_CACHE_MAX_AGE_DAYS", "30"))
+PHASH_MAX_DISTANCE = int(os.environ.get("OCR_CACHE_PHASH_DISTANCE", "0"))
+
+# Code and settings that determine the cached fields
+PIPELINE_MODULES = (field_parser, utils, ocr_engines, layout)
+PIPELINE_SETTINGS = ("TESSERACT_BACKEND", "OCR_REGION_MODE", "OCR_VLM_QUANTIZE")
+
+
+def _pipeline_version() -> str:
+    digest = hashlib.sha256()
+    for module in PIPELINE_MODULES:
+        digest.update(inspect.getsource(module).encode())
+    for name in PIPELINE_SETTINGS:
+        digest.update(f"{name}={os.environ.get(name, '')}".encode())
+    return digest.hexdigest()[:16]
+
+
+PIPELINE_VERSION = _pipeline_version()
+
+
+def init_cache_table():
+    """Create the cache table if it does not exist."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_cache (
+            sha256 TEXT PRIMARY KEY,
+            phash TEXT NOT NULL,
+            approach1_json TEXT NOT NULL,
+            approach2_json TEXT,
+            has_vlm INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            last_hit_at TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(ocr_cache)")}
+    for column in ('approach1_raw_text', 'approach2_raw_text', 'pipeline_version'):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE ocr_cache ADD COLUMN {column} TEXT")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_last_hit ON ocr_cache(last_hit_at)')
+    conn.commit()
+    conn.close()
+
+
+def perceptual_hash(gray: np.ndarray) -> str:
+    """
+    DCT perceptual hash (pHash) of a grayscale image as 16 hex chars.
+    Robust to rescaling and JPEG recompression.
+    """
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    # Skip the DC term when picking the threshold, it dominates the median
+    bits = low > np.median(low[1:])
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return f"{value:016x}"
+
+
+def compute_image_hashes(image: Union[bytes, DecodedImage]) -> Tuple[str, str]:
+    """
+    Return (sha256, phash) for an upload.
+    Raw bytes are decoded at reduced resolution - the pHash only needs 32x32 pixels.
+    """
+    if isinstance(image, DecodedImage):
+        return hashlib.sha256(image.raw_bytes).hexdigest(), perceptual_hash(image.gray)
+    sha = hashlib.sha256(image).hexdigest()
+    gray = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        raise ValueError("Invalid image format - could not decode image")
+    return sha, perceptual_hash(gray)
+
+
+def _hamming(a: str, b: str) -> int:
+    # Also registered as the SQL function hamming() for near-duplicate lookups
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+async def lookup_cached_result(sha256: str, phash: str, use_vlm: bool) -> Optional[Dict]:
+    """
+    Find cached fields for an upload.
+
+    An entry without VLM output only satisfies requests with use_vlm=False;
+    entries from another PIPELINE_VERSION never match.
+
+    Returns:
+        Dict with approach1, approach2, raw_texts ({"approach1": ..., "approach2": ...})
+        and match ("exact" | "near"), or None
+    """
+    async with get_store().read() as db:
+        cursor = await db.execute(
+            'SELECT * FROM ocr_cache WHERE sha256 = ? AND pipeline_version = ? AND (? = 0 OR has_vlm = 1)',
+            (sha256, PIPELINE_VERSION, int(use_vlm))
+        )
+        row = await cursor.fetchone()
+        match = "exact"
+
+        if row is None and PHASH_MAX_DISTANCE > 0:
+            # Distance filter and ranking run inside SQLite; only the best row comes back
+            await db.create_function("hamming", 2, _hamming, deterministic=True)
+            cursor = await db.execute('''
+                SELECT *, hamming(phash, ?) AS distance FROM ocr_cache
+                WHERE pipeline_version = ? AND (? = 0 OR has_vlm = 1) AND distance <= ?
+                ORDER BY distance LIMIT 1
+            ''', (phash, PIPELINE_VERSION, int(use_vlm), PHASH_MAX_DISTANCE))
+            row = await cursor.fetchone()
+            match = "near"
+
+    if row is None:
+        return None
+
+    await get_store().run_write(lambda conn: conn.execute(
+        'UPDATE ocr_cache SET hits = hits + 1, last_hit_at = ? WHERE sha256 = ?',
+        (datetime.now().isoformat(), row["sha256"])
+    ))
+
+    return {
+        "approach1": json.loads(row["approach1_json"]),
+        "approach2": json.loads(row["approach2_json"]) if use_vlm else None,
+        "raw_texts": {
+            "approach1": row["approach1_raw_text"] or '',
+            **({"approach2": row["approach2_raw_text"] or ''} if use_vlm else {})
+        },
+        "match": match
+    }
+
+
+async def store_cached_result(
+    sha256: str,
+    phash: str,
+    approach1_fields: Dict[str, str],
+    approach2_fields: Optional[Dict[str, str]],
+    raw_texts: Optional[Dict[str, str]] = None
+):
+    """
+    Cache extracted fields for an upload and apply the eviction policy.
+    Pass approach2_fields=None when the VLM was skipped or failed.
+    raw_texts holds the raw OCR text per approach ("approach1" / "approach2").
+    """
+    raw_texts = raw_texts or {}
+    now = datetime.now()
+    cutoff = (now - timedelta(days=CACHE_MAX_AGE_DAYS)).isoformat()
+
+    def write(conn):
+        conn.execute('''
+            INSERT OR REPLACE INTO ocr_cache (
+                sha256, phash, approach1_json, approach2_json, has_vlm,
+                approach1_raw_text, approach2_raw_text, pipeline_version,
+                created_at, last_hit_at, hits
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+        ''', (
+            sha256, phash,
+            json.dumps(approach1_fields),
+            json.dumps(approach2_fields) if approach2_fields is not None else None,
+            1 if approach2_fields is not None else 0,
+            raw_texts.get('approach1'),
+            raw_texts.get('approach2') if approach2_fields is not None else None,
+            PIPELINE_VERSION,
+            now.isoformat(), now.isoformat()
+        ))
+        conn.execute('DELETE FROM ocr_cache WHERE created_at < ?', (cutoff,))
+        conn.execute('''
+            DELETE FROM ocr_cache WHERE sha256 IN (
+                SELECT sha256 FROM ocr_cache
+                ORDER BY last_hit_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        ''', (CACHE_MAX_ENTRIES,))
+
+    await get_store().run_write(write)
+
+
+# Initialize cache table on module import
+init_cache_table()
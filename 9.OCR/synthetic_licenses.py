@@ -0,0 +1,133 @@
+"""
+Synthetic Licence Corpus
+=========================
+Labeled licence images for offline benchmarks, without real (personal) scans.
+
+- render_synthetic_license: draws a licence-like card with a TrueType font
+  (DejaVu / Arial when available, Pillow's built-in font otherwise)
+- degrade: small rotation, sensor noise and JPEG recompression, so the
+  preprocessing and deskew stages have something to do
+- load_labeled_corpus: real images from a directory (file name = ground
+  truth key), falling back to rendered cards for every ground-truth entry
+"""
+
+import os
+import json
+import random
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+FONT_CANDIDATES = (
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+_fonts = {}
+
+
+def load_font(size: int, font_path: Optional[str] = None) -> ImageFont.ImageFont:
+    """TrueType font at the given size (cached); Pillow's default if none is found."""
+    key = (size, font_path)
+    if key not in _fonts:
+        font = None
+        for candidate in ((font_path,) if font_path else FONT_CANDIDATES):
+            try:
+                font = ImageFont.truetype(candidate, size)
+                break
+            except OSError:
+                continue
+        _fonts[key] = font or ImageFont.load_default(size)
+    return _fonts[key]
+
+
+def render_synthetic_license(
+    fields: Dict[str, str],
+    width: int = 1000,
+    height: int = 640,
+    font_path: Optional[str] = None
+) -> np.ndarray:
+    """Render a plain licence-like card with the given fields (BGR)."""
+    card = Image.new("RGB", (width, height), (245, 245, 240))
+    draw = ImageDraw.Draw(card)
+    title_font = load_font(int(height * 0.07), font_path)
+    font = load_font(int(height * 0.045), font_path)
+
+    draw.text((40, 25), "DRIVING LICENCE", fill=(20, 20, 20), font=title_font)
+    lines = [
+        f"DL No: {fields.get('license_number', '')}",
+        f"Name: {fields.get('name', '').upper()}",
+        f"DOB: {fields.get('date_of_birth', '')}   BG: {fields.get('blood_group', '')}",
+        f"Issue: {fields.get('date_of_issue', '')}   Valid Till: {fields.get('date_of_expiry', '')}",
+        f"COV: {fields.get('vehicle_class', '')}",
+        f"Issued By: {fields.get('issued_by', '').upper()}",
+    ]
+    if fields.get('address'):
+        lines.append(f"Address: {fields['address']}")
+    line_height = (height - 140) / max(len(lines), 1)
+    for i, line in enumerate(lines):
+        draw.text((40, 120 + i * line_height), line, fill=(30, 30, 30), font=font)
+
+    return cv2.cvtColor(np.asarray(card), cv2.COLOR_RGB2BGR)
+
+
+def degrade(image: np.ndarray, rng: random.Random, max_angle: float = 3.0,
+            noise: float = 6.0, jpeg_quality: int = 80) -> np.ndarray:
+    """Apply a random small rotation, Gaussian noise and JPEG recompression."""
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rng.uniform(-max_angle, max_angle), 1.0)
+    image = cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE)
+    if noise > 0:
+        noise_rng = np.random.default_rng(rng.getrandbits(32))
+        image = np.clip(image + noise_rng.normal(0, noise, image.shape), 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR) if ok else image
+
+
+def load_ground_truth(path: str = os.path.join("samples", "ground_truth.json")) -> Dict[str, Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_labeled_corpus(
+    images_dir: str = "samples",
+    ground_truth_path: str = os.path.join("samples", "ground_truth.json"),
+    synthetic_copies: int = 1,
+    seed: int = 0
+) -> Tuple[List[Tuple[str, bytes, Dict[str, str]]], str]:
+    """
+    Load (name, encoded image bytes, ground truth) triples.
+
+    Real images are matched to ground truth by file name without extension.
+    If none match, each ground-truth entry is rendered ``synthetic_copies``
+    times (the first copy clean, the rest degraded).
+
+    Returns:
+        (corpus, source) where source is "images" or "synthetic"
+    """
+    ground_truths = load_ground_truth(ground_truth_path)
+    corpus = []
+    if os.path.isdir(images_dir):
+        for name in sorted(os.listdir(images_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() in IMAGE_EXTENSIONS and stem in ground_truths:
+                with open(os.path.join(images_dir, name), "rb") as f:
+                    corpus.append((name, f.read(), ground_truths[stem]))
+    if corpus:
+        return corpus, "images"
+
+    rng = random.Random(seed)
+    for key, fields in ground_truths.items():
+        card = render_synthetic_license(fields)
+        for copy in range(synthetic_copies):
+            image = degrade(card, rng) if copy else card
+            ok, encoded = cv2.imencode(".png", image)
+            corpus.append((f"{key}_{copy}.png", encoded.tobytes(), fields))
+    return corpus, "synthetic"
@@ -0,0 +1,28 @@
+"""
+Offline tests for the licence field parser.
+
+    python -m pytest test_field_parser.py
+"""
+
+from field_parser import parse_fields, parse_many
+
+
+def test_surname_doe_is_not_an_expiry_anchor():
+    fields = parse_fields("Name\nJOHN DOE\nDOB 12/01/1990")
+    assert fields['name'] == "JOHN DOE"
+    assert fields['date_of_birth'] == "12/01/1990"
+    assert fields['date_of_expiry'] == ""
+
+
+def test_doe_followed_by_a_date_is_the_expiry():
+    fields = parse_fields("Name JOHN DOE\nDOB 12/01/1990\nDOE 11/01/2040")
+    assert fields['name'] == "JOHN DOE"
+    assert fields['date_of_expiry'] == "11/01/2040"
+
+    assert parse_fields("DOE:\n11/01/2040")['date_of_expiry'] == "11/01/2040"
+    assert parse_fields("D.O.E. 11/01/2040")['date_of_expiry'] == "11/01/2040"
+
+
+def test_parse_many_matches_parse_fields():
+    texts = ["Name\nJOHN DOE\nDOB 12/01/1990", None, "DL No MH12 20110012345\nBG O+"]
+    assert parse_many(texts) == [parse_fields(text or '') for text in texts]
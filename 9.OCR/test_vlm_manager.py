@@ -0,0 +1,42 @@
+"""
+Offline tests for VLMEngineManager (no model download).
+
+    python -m pytest test_vlm_manager.py
+"""
+
+import ocr_engines
+from ocr_engines import VLMEngineManager
+
+
+class FakeEngine:
+    """Stands in for VLMOCREngine; the first `failures` loads fail."""
+
+    loads = 0
+    failures = 1
+
+    def __init__(self, quantize: bool = True):
+        FakeEngine.loads += 1
+        self.model = "ERROR" if FakeEngine.loads <= FakeEngine.failures else object()
+        self.quantized = False
+
+
+def test_failed_load_is_retried_after_backoff(monkeypatch):
+    monkeypatch.setattr(ocr_engines, "VLMOCREngine", FakeEngine)
+    FakeEngine.loads = 0
+    manager = VLMEngineManager(idle_timeout=0, retry_after=0.05)
+
+    with manager.use(timeout=5) as engine:
+        assert engine.model == "ERROR"
+    assert manager.state == "failed"
+
+    # Within the backoff the failure is served without another load
+    with manager.use(timeout=5):
+        pass
+    assert FakeEngine.loads == 1
+
+    manager.failed_at -= 0.05
+    with manager.use(timeout=5) as engine:
+        assert engine.model != "ERROR"
+    assert manager.state == "ready"
+    assert manager.error is None
+    assert FakeEngine.loads == 2
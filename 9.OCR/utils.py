@@ -4,6 +4,7 @@ Utility functions for DL OCR Project
 Contains image preprocessing, accuracy calculation, and helper functions.
 
 Preprocessing Pipeline:
+0. Resolution planning (rescale so characters are ~30 px tall)
 1. Grayscale conversion
 2. Noise reduction (Gaussian blur)
 3. Adaptive thresholding
@@ -14,16 +15,209 @@ Preprocessing Pipeline:
 import cv2
 import numpy as np
 from PIL import Image
-import io
-import difflib
-from typing import Dict, Tuple, Optional
-import Levenshtein
+import base64
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Tuple, Optional, Union
+from rapidfuzz.distance import Indel, Levenshtein
 import math
 import warnings
 
 warnings.filterwarnings("ignore")
 
 
+class DecodedImage:
+    """
+    An uploaded image decoded exactly once.
+
+    The same object flows through validation, hashing, both OCR engines and
+    thumbnailing. Derived views (RGB, PIL) are computed lazily and cached;
+    the PIL view shares memory with the NumPy RGB array via frombuffer.
+    """
+
+    def __init__(self, raw_bytes: bytes, bgr: np.ndarray):
+        self.raw_bytes = raw_bytes
+        self.bgr = bgr
+        self._rgb = None
+        self._gray = None
+        self._text_height = None
+
+    @classmethod
+    def from_bytes(cls, image_bytes: bytes) -> "DecodedImage":
+        """Decode raw upload bytes (zero-copy view of the buffer)."""
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        bgr = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError("Invalid image format - could not decode image")
+        return cls(image_bytes, bgr)
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """Contiguous RGB copy (converted once)."""
+        if self._rgb is None:
+            self._rgb = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale copy (converted once)."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def text_height(self) -> float:
+        """Median character height in pixels, 0 if no text was found (estimated once)."""
+        if self._text_height is None:
+            self._text_height = estimate_text_height(self.bgr)
+        return self._text_height
+
+    def to_pil(self, max_size: Optional[int] = None) -> Image.Image:
+        """
+        PIL view of the image, optionally downscaled so the longest side is max_size.
+        Without resizing no pixels are copied - the PIL image wraps the RGB array.
+        """
+        rgb = self.rgb
+        if max_size and max(self.width, self.height) > max_size:
+            ratio = max_size / max(self.width, self.height)
+            new_size = (int(self.width * ratio), int(self.height * ratio))
+            rgb = cv2.resize(rgb, new_size, interpolation=cv2.INTER_AREA)
+        h, w = rgb.shape[:2]
+        return Image.frombuffer("RGB", (w, h), rgb, "raw", "RGB", 0, 1)
+
+    def thumbnail_base64(self, max_size: int = 640, quality: int = 80) -> str:
+        """Downscaled JPEG thumbnail for API responses, base64 encoded."""
+        thumb = self.bgr
+        if max(self.width, self.height) > max_size:
+            ratio = max_size / max(self.width, self.height)
+            new_size = (int(self.width * ratio), int(self.height * ratio))
+            thumb = cv2.resize(thumb, new_size, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', thumb, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return base64.b64encode(buffer).decode('utf-8')
+
+
+def estimate_text_height(image: np.ndarray, work_width: int = 800, min_glyphs: int = 20) -> float:
+    """
+    Estimate the character height of an image from connected components.
+    
+    The image is binarized on a thumbnail; components shaped like glyphs
+    (not specks, rules, photos or merged blobs) vote with their height, and
+    the median is scaled back to full resolution.
+    
+    Returns:
+        Median glyph height in full-resolution pixels, or 0.0 if fewer than
+        min_glyphs were found (e.g. no text, or text too small to resolve)
+    """
+    h, w = image.shape[:2]
+    scale = min(1.0, work_width / w)
+    # INTER_LINEAR: an order of magnitude faster than INTER_AREA on large scans
+    # and gives the same median height
+    small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_LINEAR) if scale < 1 else image
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    
+    # Text pixels white on black, whatever the original polarity
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+    
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    fill = stats[1:, cv2.CC_STAT_AREA] / np.maximum(widths * heights, 1)
+    glyphs = (
+        (heights >= 4) & (heights <= small.shape[0] // 6)
+        & (widths * 8 >= heights) & (widths <= heights * 2)
+        & (fill > 0.1) & (fill < 0.95)
+    )
+    if glyphs.sum() < min_glyphs:
+        return 0.0
+    return float(np.median(heights[glyphs])) / scale
+
+
+def _projection_profile_angle(binary: np.ndarray, max_angle: float) -> Tuple[float, float]:
+    """
+    Skew search by projection profiles: the correcting rotation makes text
+    rows sharpest, i.e. maximizes the squared differences between row sums.
+    Coarse 1 degree search, then 0.1 degree refinement.
+    """
+    h, w = binary.shape[:2]
+    center = (w / 2, h / 2)
+    
+    def sharpness(angle: float) -> float:
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = cv2.warpAffine(binary, M, (w, h), flags=cv2.INTER_NEAREST)
+        rows = rotated.sum(axis=1, dtype=np.float64)
+        return float(np.sum(np.diff(rows) ** 2))
+    
+    coarse = np.arange(-max_angle, max_angle + 0.5, 1.0)
+    coarse_scores = [sharpness(a) for a in coarse]
+    best = coarse[int(np.argmax(coarse_scores))]
+    
+    fine = np.arange(best - 1.0, best + 1.05, 0.1)
+    fine_scores = [sharpness(a) for a in fine]
+    best_score = max(fine_scores)
+    if best_score <= 0:
+        return 0.0, 0.0
+    
+    confidence = 1.0 - float(np.median(coarse_scores)) / best_score
+    return round(float(fine[int(np.argmax(fine_scores))]), 2), confidence
+
+
+def estimate_skew_angle(gray: np.ndarray, max_angle: float = 15.0, work_width: int = 800) -> Tuple[float, float]:
+    """
+    Estimate document skew on a downscaled, binarized copy of the image.
+    
+    Text is smeared horizontally into line blobs; Hough line segments on the
+    blob edges vote for the angle (length-weighted median). If too few
+    segments are found, a projection-profile search is used instead.
+    
+    Returns:
+        Tuple of (rotation angle in degrees for cv2.getRotationMatrix2D, confidence 0-1)
+    """
+    h, w = gray.shape[:2]
+    scale = min(1.0, work_width / w)
+    small = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    
+    # Text pixels white on black, whatever the original polarity
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+    
+    small_w = small.shape[1]
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, small_w // 40), 1))
+    blobs = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+    edges = cv2.Canny(blobs, 50, 150)
+    segments = cv2.HoughLinesP(edges, 1, np.pi / 720, threshold=60,
+                               minLineLength=small_w // 8, maxLineGap=max(small_w // 80, 2))
+    
+    if segments is not None:
+        x1, y1, x2, y2 = segments.reshape(-1, 4).T.astype(np.float64)
+        angles = np.degrees(np.arctan2(y2 - y1, x2 - x1))
+        angles = np.where(angles > 90, angles - 180, angles)
+        angles = np.where(angles < -90, angles + 180, angles)
+        lengths = np.hypot(x2 - x1, y2 - y1)
+        keep = np.abs(angles) <= max_angle
+        
+        if keep.sum() >= 4:
+            angles, lengths = angles[keep], lengths[keep]
+            order = np.argsort(angles)
+            cumulative = np.cumsum(lengths[order])
+            angle = float(angles[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+            confidence = float(lengths[np.abs(angles - angle) <= 1.0].sum() / lengths.sum())
+            return angle, confidence
+    
+    return _projection_profile_angle(binary, max_angle)
+
+
 class ImagePreprocessor:
     """
     Handles all image preprocessing for DL images.
@@ -33,32 +227,39 @@ class ImagePreprocessor:
     def __init__(self):
         # CLAHE for contrast enhancement
         self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        # Skew estimates below this confidence (0-1) leave the image unrotated
+        self.min_deskew_confidence = 0.5
+        # Resolution planning: rescale so characters are about this many pixels
+        # tall (Tesseract's LSTM works on ~30-36 px text lines; larger text is
+        # only slower, smaller text loses strokes)
+        self.target_text_height = 30
+        self.max_upscale = 3.0
+        self.max_side = 4096
+        # Florence-2 resizes its input to 768 px; never plan below that
+        self.vlm_min_size = 768
+        self.vlm_max_size = 1024
     
-    def preprocess(self, image_bytes: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    def preprocess(self, image: Union[bytes, DecodedImage]) -> Tuple[np.ndarray, np.ndarray]:
         """
         Main preprocessing pipeline.
         
         Args:
-            image_bytes: Raw image bytes from upload
+            image: Raw image bytes from upload, or an already decoded image
             
         Returns:
-            Tuple of (preprocessed_image, original_image) as numpy arrays
+            Tuple of (preprocessed_image, original_image) as numpy arrays;
+            both at the planned resolution, original_image otherwise untouched
         """
-        # Convert bytes to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        original = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if original is None:
-            raise ValueError("Invalid image format - could not decode image")
+        if not isinstance(image, DecodedImage):
+            image = DecodedImage.from_bytes(image)
         
-        # Create a copy for processing
-        processed = original.copy()
-        
-        # Step 1: Resize if too large (for speed optimization)
-        processed = self._resize_if_needed(processed)
+        # Step 1: Rescale so characters reach the target height (see plan_scale).
+        # Tesseract reads this image; the steps below all allocate new arrays,
+        # so it is never modified
+        original = self.rescale(image)
         
         # Step 2: Convert to grayscale
-        gray = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
         
         # Step 3: Noise reduction
         denoised = cv2.GaussianBlur(gray, (3, 3), 0)
@@ -79,6 +280,32 @@ class ImagePreprocessor:
         
         return cleaned, original
     
+    def plan_scale(self, image: DecodedImage) -> float:
+        """
+        Scale factor that brings the estimated character height to
+        target_text_height, bounded by max_upscale and max_side.
+        Falls back to _resize_if_needed's width cap when no text was found.
+        """
+        longest = max(image.width, image.height)
+        if not image.text_height:
+            return min(1.0, 1920 / image.width)
+        
+        scale = self.target_text_height / image.text_height
+        if 0.9 <= scale <= 1.1:
+            return 1.0  # not worth a resample
+        # Never shrink below the VLM input size, never grow past max_side
+        scale = max(scale, min(1.0, self.vlm_min_size / longest))
+        return min(scale, self.max_upscale, self.max_side / longest)
+    
+    def rescale(self, image: DecodedImage) -> np.ndarray:
+        """BGR image at the planned resolution (no copy when the scale is 1)."""
+        scale = self.plan_scale(image)
+        if scale == 1.0:
+            return image.bgr
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        return cv2.resize(image.bgr, size, interpolation=interpolation)
+    
     def _resize_if_needed(self, image: np.ndarray, max_width: int = 1920) -> np.ndarray:
         """
         Resize image if width exceeds max_width to improve processing speed.
@@ -95,26 +322,15 @@ class ImagePreprocessor:
         """
         Correct skew in scanned/photographed DL images.
         Critical for noisy photos taken at angles.
+        
+        The angle is estimated on a small binarized copy (see estimate_skew_angle);
+        the rotation is applied once, and skipped when the estimate is unreliable.
         """
         try:
-            # Find all white pixels (text regions)
-            coords = np.column_stack(np.where(image > 0))
+            angle, confidence = estimate_skew_angle(image)
             
-            if len(coords) < 100:  # Not enough points to determine angle
-                return image
-            
-            # Get minimum area rectangle
-            rect = cv2.minAreaRect(coords)
-            angle = rect[-1]
-            
-            # Adjust angle
-            if angle < -45:
-                angle = 90 + angle
-            elif angle > 45:
-                angle = angle - 90
-                
-            # Only deskew if angle is significant
-            if abs(angle) < 0.5:
+            # Only deskew if angle is significant and the estimate trustworthy
+            if abs(angle) < 0.5 or confidence < self.min_deskew_confidence:
                 return image
             
             # Rotate image
@@ -131,25 +347,19 @@ class ImagePreprocessor:
             # If deskewing fails, return original
             return image
     
-    def preprocess_for_vlm(self, image_bytes: bytes) -> Image.Image:
+    def preprocess_for_vlm(self, image: Union[bytes, DecodedImage]) -> Image.Image:
         """
         Lighter preprocessing for VLM models (OlmOCR).
         VLMs handle preprocessing internally, so we just ensure proper format.
-        """
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
         
-        # Resize if too large (VLM memory optimization)
-        max_size = 1024
-        if max(image.size) > max_size:
-            ratio = max_size / max(image.size)
-            new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        return image
+        Images whose text is already large are shrunk further than the
+        1024 px cap (down to the model's 768 px input), using the same
+        resolution plan as preprocess().
+        """
+        if not isinstance(image, DecodedImage):
+            image = DecodedImage.from_bytes(image)
+        planned = int(max(image.width, image.height) * self.plan_scale(image))
+        return image.to_pil(max_size=max(self.vlm_min_size, min(self.vlm_max_size, planned)))
 
 
 class AccuracyCalculator:
@@ -164,47 +374,57 @@ class AccuracyCalculator:
     """
     
     @staticmethod
-    def calculate_cer(prediction: str, ground_truth: str) -> float:
-        """
-        Calculate Character Error Rate.
-        CER = (Substitutions + Insertions + Deletions) / Total Characters
+    def score_field(prediction: str, ground_truth: str) -> Dict[str, float]:
         """
-        if not ground_truth:
-            return 1.0 if prediction else 0.0
+        All metrics for one field, normalizing both strings once.
         
+        Two rapidfuzz C calls per field: the Levenshtein distance gives both
+        the edit distance and the CER, and the Indel ratio (2 * LCS / total
+        length, the measure difflib.SequenceMatcher.ratio approximates) gives
+        the similarity. The LCS cannot be read exactly from a Levenshtein
+        alignment, which may substitute where the LCS would match.
+        """
         pred = prediction.lower().strip()
         truth = ground_truth.lower().strip()
         
         distance = Levenshtein.distance(pred, truth)
-        cer = distance / max(len(truth), 1)
         
-        return min(cer, 1.0)  # Cap at 1.0
+        if not ground_truth:
+            cer = 1.0 if prediction else 0.0
+        else:
+            cer = min(distance / max(len(truth), 1), 1.0)  # Cap at 1.0
+        
+        if not ground_truth and not prediction:
+            similarity = 1.0
+        elif not ground_truth or not prediction:
+            similarity = 0.0
+        else:
+            similarity = Indel.normalized_similarity(pred, truth)
+        
+        return {"similarity": similarity, "cer": cer, "levenshtein": distance}
     
-    @staticmethod
-    def calculate_similarity(prediction: str, ground_truth: str) -> float:
+    @classmethod
+    def calculate_cer(cls, prediction: str, ground_truth: str) -> float:
         """
-        Calculate similarity score using difflib.
+        Calculate Character Error Rate.
+        CER = (Substitutions + Insertions + Deletions) / Total Characters
+        """
+        return cls.score_field(prediction, ground_truth)["cer"]
+    
+    @classmethod
+    def calculate_similarity(cls, prediction: str, ground_truth: str) -> float:
+        """
+        Calculate similarity score (Indel ratio).
         Returns value between 0 and 1 (1 = identical).
         """
-        if not ground_truth and not prediction:
-            return 1.0
-        if not ground_truth or not prediction:
-            return 0.0
-        
-        pred = prediction.lower().strip()
-        truth = ground_truth.lower().strip()
-        
-        return difflib.SequenceMatcher(None, pred, truth).ratio()
+        return cls.score_field(prediction, ground_truth)["similarity"]
     
     @staticmethod
     def calculate_levenshtein(prediction: str, ground_truth: str) -> int:
         """
         Calculate Levenshtein distance (edit distance).
         """
-        pred = prediction.lower().strip()
-        truth = ground_truth.lower().strip()
-        
-        return Levenshtein.distance(pred, truth)
+        return Levenshtein.distance(prediction.lower().strip(), ground_truth.lower().strip())
     
     @classmethod
     def calculate_field_accuracy(
@@ -225,27 +445,21 @@ class AccuracyCalculator:
         similarities = []
         cers = []
         
-        # Get all field names from ground truth
-        all_fields = set(ground_truth_fields.keys())
-        
-        for field in all_fields:
+        for field, truth in ground_truth_fields.items():
             pred = predicted_fields.get(field, "")
-            truth = ground_truth_fields.get(field, "")
-            
-            similarity = cls.calculate_similarity(pred, truth)
-            cer = cls.calculate_cer(pred, truth)
+            scores = cls.score_field(pred, truth)
             
             per_field[field] = {
                 "predicted": pred,
                 "ground_truth": truth,
-                "similarity": round(similarity, 4),
-                "cer": round(cer, 4),
-                "levenshtein": cls.calculate_levenshtein(pred, truth)
+                "similarity": round(scores["similarity"], 4),
+                "cer": round(scores["cer"], 4),
+                "levenshtein": scores["levenshtein"]
             }
             
             if truth:  # Only count fields that have ground truth
-                similarities.append(similarity)
-                cers.append(cer)
+                similarities.append(scores["similarity"])
+                cers.append(scores["cer"])
         
         return {
             "per_field": per_field,
@@ -292,9 +506,37 @@ class AccuracyCalculator:
         }
 
 
-def validate_image(file_bytes: bytes, max_size_mb: int = 5) -> Tuple[bool, str]:
+def _score_chunk(pairs: List[Tuple[Dict[str, str], Dict[str, str]]]) -> List[Dict]:
+    return [AccuracyCalculator.calculate_field_accuracy(pred, truth) for pred, truth in pairs]
+
+
+def calculate_accuracy_bulk(
+    pairs: Iterable[Tuple[Dict[str, str], Dict[str, str]]],
+    workers: Optional[int] = None,
+    chunk_size: int = 256
+) -> List[Dict]:
     """
-    Validate uploaded image file.
+    Score many (predicted_fields, ground_truth_fields) pairs for offline evaluation.
+    
+    Pairs are sent to a process pool in chunks, so pickling overhead is paid
+    once per chunk rather than per record. A single chunk or workers=1 is
+    scored in-process.
+    
+    Returns:
+        calculate_field_accuracy() results, in input order
+    """
+    pairs = list(pairs)
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return [result for chunk in chunks for result in _score_chunk(chunk)]
+    
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        return [result for scored in pool.map(_score_chunk, chunks) for result in scored]
+
+
+def load_and_validate_image(file_bytes: bytes, max_size_mb: int = 5) -> Tuple[Optional[DecodedImage], str]:
+    """
+    Validate uploaded image file, decoding it once for the rest of the pipeline.
     
     Checks:
     - File size (max 5MB)
@@ -302,33 +544,40 @@ def validate_image(file_bytes: bytes, max_size_mb: int = 5) -> Tuple[bool, str]:
     - Minimum dimensions
     
     Returns:
-        Tuple of (is_valid, error_message)
+        Tuple of (decoded_image or None if invalid, message)
     """
     # Check file size
     size_mb = len(file_bytes) / (1024 * 1024)
     if size_mb > max_size_mb:
-        return False, f"File size ({size_mb:.2f}MB) exceeds maximum allowed ({max_size_mb}MB)"
+        return None, f"File size ({size_mb:.2f}MB) exceeds maximum allowed ({max_size_mb}MB)"
     
     if size_mb < 0.001:  # Less than 1KB
-        return False, "File appears to be empty or too small"
+        return None, "File appears to be empty or too small"
     
     # Try to decode image
     try:
-        nparr = np.frombuffer(file_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return False, "Invalid image format - could not decode image"
-        
-        # Check minimum dimensions
-        height, width = image.shape[:2]
-        if width < 100 or height < 100:
-            return False, f"Image dimensions ({width}x{height}) too small"
-        
-        return True, "Valid image"
-        
+        image = DecodedImage.from_bytes(file_bytes)
+    except ValueError as e:
+        return None, str(e)
     except Exception as e:
-        return False, f"Image validation error: {str(e)}"
+        return None, f"Image validation error: {str(e)}"
+    
+    # Check minimum dimensions
+    if image.width < 100 or image.height < 100:
+        return None, f"Image dimensions ({image.width}x{image.height}) too small"
+    
+    return image, "Valid image"
+
+
+def validate_image(file_bytes: bytes, max_size_mb: int = 5) -> Tuple[bool, str]:
+    """
+    Validate uploaded image file.
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    image, message = load_and_validate_image(file_bytes, max_size_mb)
+    return image is not None, message
 
 
 def format_dl_fields(extracted: Dict) -> Dict[str, str]: